@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,12 +11,90 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     jwt_expirations_minutes: int = 30
 
-    # DB
+    # DB: "mysql" (aiomysql) o "sqlite" (aiosqlite, archivo local; para benchmarks sin servidor)
+    db_backend: Literal["mysql", "sqlite"] = "mysql"
+    sqlite_path: str = "./docsflow.sqlite3"
     db_user: str
     db_password: str
     db_host: str
     db_port: int
     db_name: str
+    db_pool_size: int = 10
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: float = 10.0
+    db_pool_pre_ping: bool = True
+    # Filas por INSERT multi-fila al guardar extracciones (celdas/postings y páginas de texto)
+    db_insert_batch_size: int = 1000
+    db_page_insert_batch_size: int = 100
+
+    # Instrumentación de consultas: histogramas por origen y log de consultas lentas
+    query_stats_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0
+    slow_query_explain: bool = False
+    slow_query_log_path: str | None = None
+
+    # Cola de extracción y worker (python -m app.worker)
+    worker_concurrency: int = 2
+    worker_poll_interval_seconds: float = 1.0
+    worker_shutdown_timeout_seconds: float = 60.0
+    worker_max_tasks_per_child: int = 50
+    # Procesos de extracción nuevos cada N documentos (contiene fragmentación y fugas)
+    worker_recycle_after_documents: int = 20
+    job_max_attempts: int = 3
+    job_retry_backoff_seconds: float = 30.0
+    job_lease_seconds: int = 1800
+    # Eventos de progreso (SSE): eventos en cola por conexión (los más antiguos se descartan) y
+    # endpoint de ingesta de la API al que el worker los reenvía (vacío = no reenviar)
+    progress_events_queue_size: int = 100
+    progress_events_url: str = ""
+    progress_events_token: str = ""
+    sse_ping_seconds: int = 15
+
+    # Extracción por páginas en paralelo (0 = núcleos disponibles; 1 = siempre secuencial)
+    pdf_parallel_workers: int = 0
+    pdf_parallel_min_pages: int = 40
+    pdf_parallel_chunk_pages: int = 0  # 0 = automático (~4 bloques por proceso)
+    # Páginas por lote guardado (y checkpoint) durante la extracción en el worker
+    pdf_checkpoint_pages: int = 25
+    # Al reprocesar, conservar las páginas guardadas y volver a extraer solo las que cambiaron
+    # (huella o versión del extractor) o fallaron; false = descartarlo todo y extraer de cero
+    pdf_incremental_reprocessing: bool = True
+    # Backend de texto ("pdfplumber" o "pypdfium2", nativo y más rápido); las tablas siempre con pdfplumber.
+    # Por tipo de documento en JSON, p. ej. PDF_TEXT_BACKEND_BY_TYPE='{"factura": "pypdfium2"}'
+    pdf_text_backend: Literal["pdfplumber", "pypdfium2"] = "pdfplumber"
+    pdf_text_backend_by_type: dict[str, Literal["pdfplumber", "pypdfium2"]] = {}
+    # Límites de cada extracción (0 = sin límite): tiempo total, RSS de sus procesos (vigilado
+    # desde el padre), espacio de direcciones por proceso (RLIMIT_AS) y páginas del PDF
+    pdf_sandbox_timeout_seconds: float = 900.0
+    pdf_sandbox_max_rss_mb: int = 2048
+    pdf_sandbox_max_address_space_mb: int = 0
+    pdf_max_pages: int = 5000
+    # Saltar extract_tables en páginas sin bordes que puedan formar celdas (clasificación previa)
+    pdf_table_triage: bool = True
+    # Soltar tras cada página los objetos del PDF que pdfminer cachea hasta cerrarlo (imágenes
+    # incluidas): la memoria de una extracción deja de crecer con el número de páginas
+    pdf_memory_bounded: bool = True
+
+    # Procesamiento por defecto de POST /process: "full" o "text_first" (tablas diferidas por página)
+    pdf_processing_mode: Literal["full", "text_first"] = "full"
+    # text_first: job 'tables' en segundo plano tras el texto, y páginas extraídas por request como mucho
+    pdf_background_tables: bool = True
+    pdf_background_tables_delay_seconds: float = 10.0
+    pdf_lazy_tables_max_pages: int = 20
+    pdf_lazy_tables_workers: int = 1
+
+    # Caché de extracción por contenido (SHA-256 del PDF + versión del extractor)
+    extraction_cache_enabled: bool = True
+    extraction_cache_max_mb: int = 512
+    # Formato de los payloads nuevos: "msgpack-zstd" o "json-zlib" (los dos se leen siempre)
+    extraction_storage_format: Literal["msgpack-zstd", "json-zlib"] = "msgpack-zstd"
+    extraction_zstd_level: int = 3
+
+    # Paginación: TTL del conteo aproximado (total=approx)
+    count_cache_ttl_seconds: int = 60
+
+    # Búsqueda por nombre de archivo: debe coincidir con ngram_token_size del servidor MySQL
+    search_ngram_token_size: int = 2
 
     # Uploads
     upload_directory: str = "./uploads"
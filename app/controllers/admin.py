@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from app.utils.authz import require_admin
+from app.repositories import extraction_cache_repo
+from app.services.extraction_cache import cache_stats
+from app.utils.db import async_pool_stats
+from app.utils.query_stats import query_stats, recent_slow_queries, reset_query_stats
+from app.utils.uow import get_uow
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/db/stats")
+async def get_db_stats(admin=Depends(require_admin)):
+    """Estado del pool, histogramas de latencia por origen de consulta y últimas consultas lentas."""
+    return {"pool": async_pool_stats(), "queries": query_stats(), "slow_queries": recent_slow_queries()}
+
+
+@router.delete("/db/stats")
+async def clear_db_stats(admin=Depends(require_admin)):
+    reset_query_stats()
+    return {"message": "Estadísticas reiniciadas"}
+
+
+@router.get("/extraction-cache")
+async def get_extraction_cache_stats(admin=Depends(require_admin), uow=Depends(get_uow)):
+    """Tamaño y aciertos acumulados de la caché de extracción, y contadores de este proceso."""
+    return {**await extraction_cache_repo.summary(uow), "process": cache_stats()}
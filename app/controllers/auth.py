@@ -7,10 +7,12 @@ from datetime import datetime, timedelta
 from app.schemas.user import UserCreate, UserOut
 from jose import JWTError, jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
 from app.services.auth_service import login_user
 from app.utils.security import get_password_hash
-from app.utils.db import get_db_connection
+from app.repositories import user_repo
 from app.utils.authz import require_admin
+from app.utils.uow import get_uow
 from app.repositories.password_reset_repo import create_token, get_valid_token, mark_used
 from app.utils.email import send_email
 
@@ -35,31 +37,21 @@ security = HTTPBearer()
 
 @router.post("/login", response_model=TokenResponse, summary="Iniciar sesión", description="Autenticación con email y contraseña. Devuelve un JWT (30 min). Bloquea operador a 5 intentos fallidos.")
 
-def login(user: UserLogin, request: Request):
-    result = login_user(user.email, user.password)
+async def login(user: UserLogin, request: Request, uow=Depends(get_uow)):
+    result = await login_user(uow, user.email, user.password)
     return TokenResponse(access_token=result["access_token"], expires_in=settings.jwt_expirations_minutes * 60)
 
 @router.post("/refresh", response_model=TokenResponse)
 
-def refresh_token(data: RefreshTokenRequest):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM password_reset_tokens WHERE token = %s AND used = FALSE AND expires_at > NOW()", (data.refresh_token,))
-    db_token = cursor.fetchone()
+async def refresh_token(data: RefreshTokenRequest, uow=Depends(get_uow)):
+    db_token = await get_valid_token(uow, data.refresh_token)
     if not db_token:
-        cursor.close()
-        conn.close()
         raise HTTPException(status_code=401, detail="Refresh token inválido o expirado")
-    cursor.execute("SELECT * FROM users WHERE id = %s", (db_token["user_id"],))
-    db_user = cursor.fetchone()
+    db_user = await user_repo.get_user_by_id(uow, db_token["user_id"])
     if not db_user or db_user["is_blocked"]:
-        cursor.close()
-        conn.close()
         raise HTTPException(status_code=403, detail="Usuario bloqueado o no encontrado")
-    cursor.execute("UPDATE password_reset_tokens SET used = TRUE WHERE id = %s", (db_token["id"],))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    await mark_used(uow, db_token["id"])
+    await uow.commit()
     expire = datetime.utcnow() + timedelta(minutes=settings.jwt_expirations_minutes)
     payload = {
         "sub": str(db_user["id"]),
@@ -72,26 +64,15 @@ def refresh_token(data: RefreshTokenRequest):
 
 @router.post("/register", response_model=UserOut)
 
-def register(user: UserCreate, admin=Depends(require_admin)):
-    password_hash = get_password_hash(user.password)
+async def register(user: UserCreate, admin=Depends(require_admin), uow=Depends(get_uow)):
+    password_hash = await run_in_threadpool(get_password_hash, user.password)
     # Normalizar role por defecto
     role = (user.role or "operador").lower()
     if role not in ("admin", "operador"):
         role = "operador"
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute(
-            """
-            INSERT INTO users (email, password_hash, role, department_id, is_blocked, failed_attempts)
-            VALUES (%s, %s, %s, %s, FALSE, 0)
-            """,
-            (user.email, password_hash, role, user.department_id)
-        )
-        conn.commit()
-        user_id = cursor.lastrowid
-        cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-        db_user = cursor.fetchone()
+        db_user = await user_repo.create_user(uow, user.email, password_hash, role, user.department_id)
+        await uow.commit()
         return UserOut(
             id=db_user["id"],
             email=db_user["email"],
@@ -105,21 +86,20 @@ def register(user: UserCreate, admin=Depends(require_admin)):
             unblocked_at=db_user["unblocked_at"]
         )
     except Exception as e:
-        conn.rollback()
+        await uow.rollback()
         raise HTTPException(status_code=400, detail=f"Error al registrar usuario: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
 
 @router.post("/forgot-password", summary="Solicitar recuperación de contraseña", description="Genera un token temporal (15 min) y envía un enlace al correo si el email existe.")
 
-def forgot_password(data: ForgotPasswordRequest):
-    from app.repositories.user_repo import get_user_by_email
-    user = get_user_by_email(data.email)
+async def forgot_password(data: ForgotPasswordRequest, uow=Depends(get_uow)):
+    user = await user_repo.get_user_by_email(uow, data.email)
     # Responder siempre 200
     if not user:
         return {"message": "Si el email existe, se envió un token"}
-    token = create_token(user_id=user["id"], exp_minutes=15)
+    token = await create_token(uow, user_id=user["id"], exp_minutes=15)
+    # Confirmar (y soltar la conexión) antes del envío SMTP, que puede tardar
+    await uow.commit()
+    await uow.release()
     base = settings.frontend_base_url or "https://your-frontend"
     reset_link = f"{base}/reset-password?token={token}"
     subject = "Recuperación de contraseña - DocsFlow"
@@ -129,27 +109,19 @@ def forgot_password(data: ForgotPasswordRequest):
     <p><a href='{reset_link}'>Restablecer contraseña</a></p>
     <p>Si no solicitaste este cambio, ignora este mensaje.</p>
     """
-    # Envío con manejo de errores explícito
-    send_email(to_email=user["email"], subject=subject, html_body=html)
+    # Envío con manejo de errores explícito (SMTP bloqueante: en threadpool)
+    await run_in_threadpool(send_email, to_email=user["email"], subject=subject, html_body=html)
     return {"message": "Si el email existe, se envió un token"}
 
 @router.post("/reset-password", summary="Restablecer contraseña", description="Valida el token y actualiza la contraseña del usuario.")
 
-def reset_password(data: ResetPasswordRequest):
-    valid = get_valid_token(data.token)
+async def reset_password(data: ResetPasswordRequest, uow=Depends(get_uow)):
+    valid = await get_valid_token(uow, data.token)
     if not valid:
         raise HTTPException(status_code=400, detail="Token inválido o expirado")
-    from app.repositories.user_repo import get_user_by_email
-    from app.utils.db import get_db_connection
-    from app.utils.security import get_password_hash
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        password_hash = get_password_hash(data.new_password)
-        cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, valid["user_id"]))
-        mark_used(valid["id"]) 
-        conn.commit()
-        return {"message": "Contraseña actualizada"}
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+    password_hash = await run_in_threadpool(get_password_hash, data.new_password)
+    # Contraseña y token en la misma transacción
+    await user_repo.update_password(uow, valid["user_id"], password_hash)
+    await mark_used(uow, valid["id"])
+    await uow.commit()
+    return {"message": "Contraseña actualizada"}
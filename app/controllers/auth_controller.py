@@ -1,8 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.services.auth_service import login_user
+from app.utils.uow import get_uow
 
 router = APIRouter()
 
 @router.post("/login")
-def login(username: str, password: str):
-    return login_user(username, password)
\ No newline at end of file
+async def login(username: str, password: str, uow=Depends(get_uow)):
+    return await login_user(uow, username, password)
\ No newline at end of file
@@ -1,14 +1,24 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Form
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Form, Body, Header
+from typing import Any, Dict, List, Literal, Optional
+import asyncio
+import hmac
+import json
 import os
+import time
 from datetime import datetime
-from app.middlewares.auth import get_current_user
-from app.repositories import document_repo, table_repo, department_repo
-import json
-from app.utils.db import get_db_connection
-from app.utils.files import build_upload_path, write_bytes
+from sse_starlette.sse import EventSourceResponse
+from app.middlewares.auth import get_current_user, get_current_user_sse
+from app.config.settings import settings
+from app.repositories import document_repo, department_repo, job_repo, page_repo
+from app.services import progress_events
+from app.services.extraction_cache import apply_cached
+from app.services.extraction_store import clear_extraction
+from fastapi.concurrency import run_in_threadpool
+from app.utils.files import build_upload_path, content_hash, write_bytes
 from app.utils.authz import ensure_user_can_access_document
-from fastapi.responses import FileResponse
+from app.utils.uow import UnitOfWork, get_uow
+from app.utils.pagination import decode_cursor, split_page, resolve_total
+from fastapi.responses import FileResponse, Response
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
@@ -17,15 +27,16 @@ MAX_SIZE_MB = 15
 
 @router.post("/upload", summary="Subir PDF", description="Valida PDF, guarda en disco por departamento, inserta metadata y deja el documento en estado 'pending'.")
 
-def upload_document(
+async def upload_document(
     file: UploadFile = File(..., description="Archivo PDF a subir"),
     current_user=Depends(get_current_user),
     department_id: Optional[int] = Form(None, description="Obligatorio para admin; operadores usan su propio departamento"),
-    document_type: Optional[str] = Form(None, description="Tipo de documento para filtros (ej. 'factura', 'reporte')")
+    document_type: Optional[str] = Form(None, description="Tipo de documento para filtros (ej. 'factura', 'reporte')"),
+    uow=Depends(get_uow)
 ):
     if file.content_type not in ALLOWED_MIME:
         raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
-    contents = file.file.read()
+    contents = await file.read()
     size_mb = len(contents) / (1024 * 1024)
     if size_mb > MAX_SIZE_MB:
         raise HTTPException(status_code=400, detail=f"El archivo excede el tamaño máximo de {MAX_SIZE_MB}MB")
@@ -39,32 +50,131 @@ def upload_document(
             raise HTTPException(status_code=400, detail="Debe indicar department_id para subir documentos")
         effective_department_id = department_id
 
-    if not department_repo.exists(int(effective_department_id)):
+    if not await department_repo.exists(uow, int(effective_department_id)):
         raise HTTPException(status_code=400, detail="El department_id indicado no existe")
 
     filepath = build_upload_path(int(effective_department_id), file.filename)
-    write_bytes(filepath, contents)
+    await run_in_threadpool(write_bytes, filepath, contents)
+    digest = await run_in_threadpool(content_hash, contents)
 
-    doc_id = document_repo.insert_document(file.filename, current_user["id"], int(effective_department_id), filepath, document_type=document_type)
+    doc_id = await document_repo.insert_document(uow, file.filename, current_user["id"], int(effective_department_id), filepath, document_type=document_type, content_hash=digest)
+    await uow.commit()
+    progress_events.publish_status({"id": doc_id, "department_id": int(effective_department_id)}, "pending")
     return {"message": "Archivo subido", "document_id": doc_id}
 
 @router.get("/")
-def list_documents(
+async def list_documents(
     current_user=Depends(get_current_user),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la página anterior); si se envía, se ignora offset"),
+    total: Optional[str] = Query(None, pattern="^(exact|approx)$", description="Incluir total: 'exact' (COUNT) o 'approx' (COUNT cacheado)"),
     department_id: Optional[int] = None,
-    document_type: Optional[str] = None
+    document_type: Optional[str] = None,
+    uow=Depends(get_uow)
 ):
     if current_user["role"] == "operador":
         department_id = current_user["department_id"]
-    rows = document_repo.list_documents(limit=limit, offset=offset, department_id=department_id, document_type=document_type)
-    return {"items": rows, "limit": limit, "offset": offset}
+    after = decode_cursor(cursor) if cursor else None
+    rows = await document_repo.list_documents(uow, limit=limit + 1, offset=offset, department_id=department_id, document_type=document_type, cursor=after)
+    items, next_cursor = split_page(rows, limit, "uploaded_at")
+    count = await resolve_total(
+        total,
+        ("documents", department_id, document_type, None),
+        lambda: document_repo.count_documents(uow, department_id=department_id, document_type=document_type),
+    )
+    return {"items": items, "limit": limit, "offset": offset, "next_cursor": next_cursor, "total": count}
+
+@router.get("/search")
+
+async def search_documents(
+    q: Optional[str] = Query(None, description="Texto a buscar en el nombre del archivo (resultados ordenados por relevancia)"),
+    department_id: Optional[int] = Query(None, description="Filtrar por departamento"),
+    document_type: Optional[str] = Query(None, description="Filtrar por tipo de documento"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la página anterior); si se envía, se ignora offset"),
+    total: Optional[str] = Query(None, pattern="^(exact|approx)$", description="Incluir total: 'exact' (COUNT) o 'approx' (COUNT cacheado)"),
+    current_user=Depends(get_current_user),
+    uow=Depends(get_uow),
+):
+    if current_user["role"] == "operador":
+        department_id = current_user["department_id"]
+    after = decode_cursor(cursor) if cursor else None
+    rows = await document_repo.search_documents(uow, q=q, department_id=department_id, limit=limit + 1, offset=offset, document_type=document_type, cursor=after)
+    items, next_cursor = split_page(rows, limit, *document_repo.search_sort_keys(q))
+    count = await resolve_total(
+        total,
+        ("documents", department_id, document_type, q),
+        lambda: document_repo.count_documents(uow, department_id=department_id, document_type=document_type, q=q),
+    )
+    return {"items": items, "limit": limit, "offset": offset, "next_cursor": next_cursor, "total": count}
+
+def _sse(event: Dict[str, Any]) -> Dict[str, str]:
+    return {"event": event["type"], "data": json.dumps(event, default=str)}
+
+
+async def _event_stream(document_id: Optional[int] = None, department_id: Optional[int] = None, expires_at: Optional[float] = None):
+    """
+    Eventos de progress_events mientras la conexión siga abierta. Para un documento empieza
+    con su estado actual, leído después de suscribirse para no perder ningún cambio.
+    Al vencer el JWT (`expires_at`) envía `event: expired` y cierra: el cliente reconecta con un token nuevo.
+    """
+    async with progress_events.subscribe(document_id, department_id) as subscription:
+        if document_id is not None:
+            async with UnitOfWork() as uow:
+                doc = await document_repo.get_document(uow, document_id)
+            if doc is None:
+                yield _sse(progress_events.status_event({"id": document_id, "department_id": department_id}, "deleted"))
+                return
+            snapshot = progress_events.status_event(doc, doc.get("status"), doc.get("error_message"))
+            yield _sse({**snapshot, "page_count": doc.get("page_count"), "extracted_pages": doc.get("extracted_pages")})
+        while True:
+            remaining = None if expires_at is None else expires_at - time.time()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError
+                event = await asyncio.wait_for(subscription.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                yield _sse({"type": "expired", "at": datetime.utcnow().isoformat()})
+                return
+            yield _sse(event)
+
+@router.get("/events", summary="Eventos de procesamiento (SSE)", description="Stream `text/event-stream` con los cambios de estado (`event: status`) y el progreso por lotes (`event: progress`: páginas hechas/total y tablas encontradas) de los documentos del departamento del operador; otros roles reciben todos o los de `department_id`. Acepta el token en `?token=` para EventSource; al vencer el token envía `event: expired` y cierra. Los eventos del worker llegan si se configura PROGRESS_EVENTS_URL. Pub/sub en memoria: requiere un único proceso de API (ver docs/pdf_processing.md).")
+
+async def document_events(
+    department_id: Optional[int] = Query(None, description="Filtrar por departamento (los operadores siempre reciben el suyo)"),
+    current_user=Depends(get_current_user_sse),
+):
+    if current_user.get("role") == "operador":
+        department_id = current_user.get("department_id")
+        if not department_id:
+            raise HTTPException(status_code=400, detail="Operador sin departamento asignado")
+    return EventSourceResponse(_event_stream(department_id=department_id, expires_at=current_user.get("exp")), ping=settings.sse_ping_seconds)
+
+@router.post("/events/ingest", include_in_schema=False)
+
+async def ingest_document_events(
+    events: List[Dict[str, Any]] = Body(..., embed=True),
+    x_progress_token: Optional[str] = Header(None),
+):
+    """
+    Eventos reenviados por el worker (progress_events.start_forwarding), publicados solo en este
+    proceso: los streams abiertos en otros workers de uvicorn o réplicas no los reciben.
+    """
+    if not settings.progress_events_token or not hmac.compare_digest(x_progress_token or "", settings.progress_events_token):
+        raise HTTPException(status_code=403, detail="No autorizado")
+    published = 0
+    for event in events:
+        if event.get("type") in ("status", "progress") and isinstance(event.get("document_id"), int):
+            progress_events.publish(event, forward=False)
+            published += 1
+    return {"published": published}
 
 @router.get("/{document_id}")
 
-def get_document(document_id: int, current_user=Depends(get_current_user)):
-    doc = document_repo.get_document(document_id)
+async def get_document(document_id: int, current_user=Depends(get_current_user), uow=Depends(get_uow)):
+    doc = await document_repo.get_document(uow, document_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     ensure_user_can_access_document(current_user, doc)
@@ -72,8 +182,8 @@ def get_document(document_id: int, current_user=Depends(get_current_user)):
 
 @router.delete("/{document_id}")
 
-def delete_document(document_id: int, current_user=Depends(get_current_user)):
-    doc = document_repo.get_document(document_id)
+async def delete_document(document_id: int, current_user=Depends(get_current_user), uow=Depends(get_uow)):
+    doc = await document_repo.get_document(uow, document_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     ensure_user_can_access_document(current_user, doc)
@@ -83,83 +193,116 @@ def delete_document(document_id: int, current_user=Depends(get_current_user)):
             os.remove(filepath)
     except Exception:
         pass
-    document_repo.delete_document(document_id)
+    await clear_extraction(uow, document_id)
+    await document_repo.delete_document(uow, document_id)
+    await uow.commit()
+    progress_events.publish_status(doc, "deleted")
     return {"message": "Documento eliminado"}
 
-@router.post("/{document_id}/process")
+def _job_summary(job: Optional[dict]) -> Optional[dict]:
+    if job is None:
+        return None
+    return {
+        "id": job["id"],
+        "document_id": job["document_id"],
+        "mode": job["mode"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "run_after": job["run_after"],
+        "last_error": job["last_error"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+    }
 
-def process_document(document_id: int, current_user=Depends(get_current_user)):
-    from app.services.pdf_processing import extract_pdf_content
-    from app.utils.db import get_db_connection
-    doc = document_repo.get_document(document_id)
+
+@router.post("/{document_id}/process", status_code=202, summary="Encolar procesamiento", description="Encola la extracción (la ejecuta `python -m app.worker`) y devuelve el job; si ya hay uno en cola o en curso, devuelve ese. Si un PDF con el mismo contenido ya se extrajo con la versión actual del extractor, reutiliza ese resultado y responde 200 sin encolar. Con `mode=text_first` solo extrae el texto: las tablas se extraen por página al consultarlas o en un job de fondo posterior.")
+
+async def process_document(
+    document_id: int,
+    response: Response,
+    mode: Literal["full", "text_first"] = Query(settings.pdf_processing_mode, description="'full' extrae texto y tablas; 'text_first' solo texto y deja las tablas en diferido"),
+    current_user=Depends(get_current_user),
+    uow=Depends(get_uow),
+):
+    doc = await document_repo.get_document(uow, document_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     ensure_user_can_access_document(current_user, doc)
-    # Marcar processing y timestamp intento
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("UPDATE documents SET status='processing', last_attempt_at = NOW(), error_message = NULL WHERE id = %s", (document_id,))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
-    # Ejecutar extracción
-    try:
-        content = extract_pdf_content(doc["filepath"])
-        table_repo.insert_extracted_table(document_id, 0, json.dumps(content))
-        document_repo.mark_processed(document_id)
-        return {"message": "Documento procesado"}
-    except Exception as e:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        try:
-            cur.execute("UPDATE documents SET status='error', error_message=%s WHERE id=%s", (str(e)[:500], document_id))
-            conn.commit()
-        finally:
-            cur.close()
-            conn.close()
-        raise HTTPException(status_code=500, detail="Error procesando el documento")
-
-@router.post("/{document_id}/reprocess")
-
-def reprocess_document(document_id: int, current_user=Depends(get_current_user)):
-    doc = document_repo.get_document(document_id)
-    if not doc:
-        raise HTTPException(status_code=404, detail="Documento no encontrado")
+    # Serializa con otros /process y /reprocess del documento: como mucho un job activo
+    await document_repo.lock_document(uow, document_id)
+    job = await job_repo.get_active_job(uow, document_id)
+    if job is None and await apply_cached(uow, doc):
+        await uow.commit()
+        progress_events.publish_status(doc, "processed")
+        response.status_code = 200
+        return {"message": "Documento procesado desde caché", "job": None, "cached": True}
+    if job is None:
+        job_id = await job_repo.enqueue(uow, document_id, settings.job_max_attempts, mode)
+        await uow.commit()
+        job = await job_repo.get_job(uow, job_id)
+    return {"message": "Documento en cola de procesamiento", "job": _job_summary(job)}
+
+@router.get("/jobs/{job_id}", summary="Estado de un job de procesamiento")
+
+async def get_processing_job(job_id: int, current_user=Depends(get_current_user), uow=Depends(get_uow)):
+    job = await job_repo.get_job(uow, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    doc = await document_repo.get_document(uow, job["document_id"])
     ensure_user_can_access_document(current_user, doc)
-    # Limpiar tablas extraídas y marcar pending
-    table_repo.delete_by_document(document_id)
-    from app.utils.db import get_db_connection
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("UPDATE documents SET status = 'pending', processed_at = NULL WHERE id = %s", (document_id,))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
-    return {"message": "Documento marcado para reprocesar"}
+    return _job_summary(job)
 
-@router.get("/search")
+@router.post("/{document_id}/reprocess", summary="Marcar para reprocesar", description="Deja el documento en 'pending' para volver a extraerlo. Si quedó a medias (error o interrumpido) conserva lo guardado para que el siguiente procesamiento retome desde el checkpoint. Si no, y el contenido está en la caché de extracción, lo reutiliza y deja el documento 'processed'; sin caché conserva las páginas guardadas y el siguiente procesamiento solo vuelve a extraer las que cambiaron (huella de la página o versión del extractor) o fallaron (PDF_INCREMENTAL_REPROCESSING). Con `full=true` lo descarta todo y extrae desde la primera página.")
 
-def search_documents(
-    q: Optional[str] = Query(None, description="Texto a buscar en el nombre del archivo"),
-    department_id: Optional[int] = Query(None, description="Filtrar por departamento"),
-    document_type: Optional[str] = Query(None, description="Filtrar por tipo de documento"),
-    limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+async def reprocess_document(
+    document_id: int,
+    full: bool = Query(False, description="Extraer de nuevo desde la primera página, sin checkpoint ni caché"),
     current_user=Depends(get_current_user),
+    uow=Depends(get_uow),
 ):
-    if current_user["role"] == "operador":
-        department_id = current_user["department_id"]
-    rows = document_repo.search_documents(q=q, department_id=department_id, limit=limit, offset=offset, document_type=document_type)
-    return {"items": rows, "limit": limit, "offset": offset, "total": len(rows)}
+    doc = await document_repo.get_document(uow, document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Documento no encontrado")
+    ensure_user_can_access_document(current_user, doc)
+    await document_repo.lock_document(uow, document_id)
+    if await job_repo.get_active_job(uow, document_id):
+        raise HTTPException(status_code=409, detail="El documento tiene un procesamiento en cola o en curso")
+    resume = not full and doc.get("status") != "processed" and doc.get("extracted_pages", 0) > 0
+    incremental = not full and not resume and settings.pdf_incremental_reprocessing
+    if not resume:
+        if not full and await apply_cached(uow, doc):
+            await uow.commit()
+            progress_events.publish_status(doc, "processed")
+            return {"message": "Documento reprocesado desde caché", "cached": True}
+        if incremental:
+            # Sin checkpoint y con páginas guardadas: stream_extraction compara huellas
+            await document_repo.set_extracted_pages(uow, document_id, 0)
+        else:
+            # Limpiar tablas, celdas, páginas e índice (y el checkpoint)
+            await clear_extraction(uow, document_id)
+    await document_repo.mark_pending(uow, document_id)
+    await uow.commit()
+    progress_events.publish_status(doc, "pending")
+    if resume:
+        return {"message": "Documento marcado para reprocesar", "resume_from_page": doc["extracted_pages"] + 1}
+    return {"message": "Documento marcado para reprocesar", "incremental": incremental}
+
+@router.get("/{document_id}/events", summary="Eventos de procesamiento de un documento (SSE)", description="Stream `text/event-stream` que empieza con el estado actual del documento y sigue con sus cambios de estado y su progreso por lotes (páginas hechas/total y tablas encontradas), sin consultar la base. Sustituye al polling de `/status`. Acepta el token en `?token=` para EventSource; al vencer el token envía `event: expired` y cierra. Pub/sub en memoria: requiere un único proceso de API (ver docs/pdf_processing.md).")
+
+async def document_progress_events(document_id: int, current_user=Depends(get_current_user_sse), uow=Depends(get_uow)):
+    doc = await document_repo.get_document(uow, document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Documento no encontrado")
+    ensure_user_can_access_document(current_user, doc)
+    # La conexión no se retiene mientras dure el stream
+    await uow.release()
+    return EventSourceResponse(_event_stream(document_id=document_id, expires_at=current_user.get("exp")), ping=settings.sse_ping_seconds)
 
 @router.get("/{document_id}/download")
 
-def download_document(document_id: int, current_user=Depends(get_current_user)):
-    doc = document_repo.get_document(document_id)
+async def download_document(document_id: int, current_user=Depends(get_current_user), uow=Depends(get_uow)):
+    doc = await document_repo.get_document(uow, document_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     ensure_user_can_access_document(current_user, doc)
@@ -170,8 +313,8 @@ def download_document(document_id: int, current_user=Depends(get_current_user)):
 
 @router.get("/{document_id}/status", summary="Estado de procesamiento", description="Devuelve estado actual, último intento y error si lo hay.")
 
-def get_document_status(document_id: int, current_user=Depends(get_current_user)):
-    doc = document_repo.get_document(document_id)
+async def get_document_status(document_id: int, current_user=Depends(get_current_user), uow=Depends(get_uow)):
+    doc = await document_repo.get_document(uow, document_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     ensure_user_can_access_document(current_user, doc)
@@ -181,6 +324,26 @@ def get_document_status(document_id: int, current_user=Depends(get_current_user)
         "processed_at": doc.get("processed_at"),
         "last_attempt_at": doc.get("last_attempt_at"),
         "error_message": doc.get("error_message"),
+        "page_count": doc.get("page_count"),
+        "extracted_pages": doc.get("extracted_pages"),
+        "tables_pending_pages": await page_repo.count_pending_table_pages(uow, document_id),
+        "job": _job_summary(await job_repo.get_latest_job(uow, document_id)),
     }
 
 
+
+@router.get("/{document_id}/pages", summary="Texto por página", description="Devuelve el texto extraído de un rango de páginas sin cargar el resto del documento.")
+
+async def get_document_pages(
+    document_id: int,
+    page_from: Optional[int] = Query(None, ge=1),
+    page_to: Optional[int] = Query(None, ge=1),
+    current_user=Depends(get_current_user),
+    uow=Depends(get_uow),
+):
+    doc = await document_repo.get_document(uow, document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Documento no encontrado")
+    ensure_user_can_access_document(current_user, doc)
+    rows = await page_repo.list_pages(uow, document_id, page_from=page_from, page_to=page_to)
+    return {"items": rows}
@@ -1,27 +1,47 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import Optional
 from app.middlewares.auth import get_current_user
-from app.repositories import table_repo, document_repo
+from app.config.settings import settings
+from app.repositories import table_repo, document_repo, page_repo
+from app.services.extraction_sandbox import ExtractionLimitExceeded
+from app.services.extraction_store import extract_pending_tables, lazy_tables_sandbox
 from app.utils.authz import ensure_user_can_access_document
+from app.utils.uow import get_uow
 from fastapi.responses import StreamingResponse
 import io
 import csv
-import json
 
 router = APIRouter(prefix="/tables", tags=["tables"])
 
-@router.get("/search", summary="Buscar en tablas extraídas", description="Busca texto dentro del JSON de tablas extraídas (JOIN con documents). Operadores: limitado a su departamento.")
 
-def search_tables(
+async def _extract_on_demand(uow, doc: dict, page_from: Optional[int], page_to: Optional[int]) -> int:
+    """Documentos text_first: extrae las tablas pendientes del rango pedido (hasta PDF_LAZY_TABLES_MAX_PAGES)."""
+    # Documentos full o con el rango ya extraído: sin esperar turno ni levantar un sandbox
+    if not await page_repo.list_pending_table_pages(uow, doc["id"], page_from, page_to, limit=1):
+        return 0
+    # La conexión no se retiene mientras se espera un turno de extracción
+    await uow.release()
+    try:
+        async with lazy_tables_sandbox() as sandbox:
+            return await sandbox.run(extract_pending_tables(
+                uow, doc, page_from, page_to, max_pages=settings.pdf_lazy_tables_max_pages, executor=sandbox.executor,
+            ))
+    except ExtractionLimitExceeded as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/search", summary="Buscar en tablas extraídas", description="Busca celdas de tablas extraídas que contengan todas las palabras del texto (la última como prefijo), usando el índice invertido de celdas. Solo cubre páginas cuyas tablas ya se extrajeron (en documentos text_first, las consultadas o las del job de fondo). Devuelve las coordenadas de cada celda. Operadores: limitado a su departamento.")
+
+async def search_tables(
     q: str = Query(..., description="Texto a buscar"),
     department_id: Optional[int] = None,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    current_user=Depends(get_current_user)
+    current_user=Depends(get_current_user),
+    uow=Depends(get_uow)
 ):
     if current_user["role"] == "operador":
         department_id = current_user["department_id"]
-    rows = table_repo.search(q=q, department_id=department_id, limit=limit, offset=offset)
+    rows = await table_repo.search(uow, q=q, department_id=department_id, limit=limit, offset=offset)
     items = []
     for r in rows:
         items.append({
@@ -33,48 +53,62 @@ def search_tables(
                 "status": r["document_status"],
             },
             "table": {
-                "id": r["table_id"],
                 "index": r["table_index"],
-                "created_at": r["created_at"],
-                "content": r["content"],
+                "page": r["page"],
+            },
+            # row = -1 corresponde a la fila de headers
+            "cell": {
+                "row": r["row_index"],
+                "col": r["col_index"],
+                "value": r["value"],
             }
         })
     return {"items": items, "limit": limit, "offset": offset}
 
-@router.get("/{document_id}")
+@router.get("/{document_id}", summary="Tablas del documento", description="Devuelve las tablas extraídas (headers y filas). Se puede pedir una sola tabla o un rango de páginas; solo se leen esas celdas. En documentos procesados en modo text_first extrae antes las tablas pendientes del rango (hasta PDF_LAZY_TABLES_MAX_PAGES páginas por petición) y devuelve cuántas páginas siguen pendientes.")
 
-def list_tables_by_document(document_id: int, current_user=Depends(get_current_user)):
-    doc = document_repo.get_document(document_id)
+async def list_tables_by_document(
+    document_id: int,
+    table_index: Optional[int] = Query(None, ge=0),
+    page_from: Optional[int] = Query(None, ge=1),
+    page_to: Optional[int] = Query(None, ge=1),
+    current_user=Depends(get_current_user),
+    uow=Depends(get_uow)
+):
+    doc = await document_repo.get_document(uow, document_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     ensure_user_can_access_document(current_user, doc)
-    rows = table_repo.list_by_document(document_id)
-    return {"items": rows}
+    pending = await _extract_on_demand(uow, doc, page_from, page_to)
+    tables = await table_repo.get_tables(uow, document_id, table_index=table_index, page_from=page_from, page_to=page_to)
+    return {"items": tables, "tables_pending_pages": pending}
 
-@router.get("/{document_id}/export", summary="Exportar tablas a CSV", description="Exporta todas las tablas del documento a un CSV plano (una fila por celda).")
+@router.get("/{document_id}/export", summary="Exportar tablas a CSV", description="Exporta las tablas del documento (o una tabla / rango de páginas) a un CSV plano (una fila por celda). Como en el listado, extrae antes las tablas pendientes del rango; la cabecera X-Tables-Pending-Pages indica las páginas que quedaron sin extraer.")
 
-def export_tables_csv(document_id: int, current_user=Depends(get_current_user), format: str = Query("csv")):
+async def export_tables_csv(
+    document_id: int,
+    current_user=Depends(get_current_user),
+    format: str = Query("csv"),
+    table_index: Optional[int] = Query(None, ge=0),
+    page_from: Optional[int] = Query(None, ge=1),
+    page_to: Optional[int] = Query(None, ge=1),
+    uow=Depends(get_uow)
+):
     if format != "csv":
         raise HTTPException(status_code=400, detail="Formato no soportado")
-    doc = document_repo.get_document(document_id)
+    doc = await document_repo.get_document(uow, document_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     ensure_user_can_access_document(current_user, doc)
-    rows = table_repo.list_by_document(document_id)
+    pending = await _extract_on_demand(uow, doc, page_from, page_to)
+    tables = await table_repo.get_tables(uow, document_id, table_index=table_index, page_from=page_from, page_to=page_to)
     output = io.StringIO()
     writer = csv.writer(output)
     writer.writerow(["table_index", "row_index", "col_index", "value"])  # header
-    for item in rows:
-        content = item.get("content")
-        try:
-            data = content if isinstance(content, dict) else json.loads(content)
-        except Exception:
-            data = {}
-        tables = data.get("tables", []) if isinstance(data, dict) else []
-        for t_idx, tbl in enumerate(tables):
-            for r_idx, row in enumerate(tbl.get("rows", [])):
-                for c_idx, val in enumerate(row):
-                    writer.writerow([t_idx, r_idx, c_idx, val])
+    for tbl in tables:
+        for r_idx, row in enumerate(tbl["rows"]):
+            for c_idx, val in enumerate(row):
+                writer.writerow([tbl["table_index"], r_idx, c_idx, val])
     output.seek(0)
     filename = f"document_{document_id}_tables.csv"
-    return StreamingResponse(iter([output.getvalue()]), media_type="text/csv", headers={"Content-Disposition": f"attachment; filename={filename}"})
+    return StreamingResponse(iter([output.getvalue()]), media_type="text/csv", headers={"Content-Disposition": f"attachment; filename={filename}", "X-Tables-Pending-Pages": str(pending)})
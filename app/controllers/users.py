@@ -1,25 +1,37 @@
 from fastapi import APIRouter, Depends, Query
 from typing import Optional
 from app.utils.authz import require_admin
-from app.repositories.user_repo import list_users
+from app.repositories.user_repo import list_users, count_users
 from app.middlewares.auth import get_current_user
+from app.utils.uow import get_uow
+from app.utils.pagination import decode_cursor, split_page, resolve_total
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/")
 
-def get_users(
+async def get_users(
     admin=Depends(require_admin),
-    limit: Optional[int] = Query(None, ge=1, le=100),
-    offset: Optional[int] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la página anterior); si se envía, se ignora offset"),
+    total: Optional[str] = Query(None, pattern="^(exact|approx)$", description="Incluir total: 'exact' (COUNT) o 'approx' (COUNT cacheado)"),
     role: Optional[str] = Query(None),
-    department_id: Optional[int] = Query(None)
+    department_id: Optional[int] = Query(None),
+    uow=Depends(get_uow)
 ):
     effective_role = role if role is not None else "operador"
-    rows = list_users(limit=limit, offset=offset, role=effective_role, department_id=department_id)
-    return {"items": rows, "limit": limit, "offset": offset, "role": effective_role}
+    after = decode_cursor(cursor) if cursor else None
+    rows = await list_users(uow, limit=limit + 1, offset=offset, role=effective_role, department_id=department_id, cursor=after)
+    items, next_cursor = split_page(rows, limit, "created_at")
+    count = await resolve_total(
+        total,
+        ("users", effective_role, department_id),
+        lambda: count_users(uow, role=effective_role, department_id=department_id),
+    )
+    return {"items": items, "limit": limit, "offset": offset, "next_cursor": next_cursor, "total": count, "role": effective_role}
 
 @router.get("/me")
 
-def get_me(current_user=Depends(get_current_user)):
+async def get_me(current_user=Depends(get_current_user)):
     return current_user
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from app.config.settings import settings
-from app.utils.db import get_db_connection
+from app.utils.db import init_async_pool, close_async_pool
+from app.utils.query_stats import configure_slow_query_log
+from app.controllers.admin import router as admin_router
 from app.controllers.auth import router as auth_router
 from app.controllers.documents import router as documents_router
 # Importar test_router si existe
@@ -26,23 +28,20 @@ application.add_middleware(
 )
 
 @application.on_event("startup")
-def startup_event():
-    connection = get_db_connection()
-    if connection:
-        application.state.db_connection = connection
-    else:
-        application.state.db_connection = None
+async def startup_event():
+    # Calienta el pool compartido por todos los repositorios
+    configure_slow_query_log()
+    await init_async_pool()
 
 @application.on_event("shutdown")
-def shutdown_event():
-    connection = getattr(application.state, "db_connection", None)
-    if connection:
-        connection.close()
+async def shutdown_event():
+    await close_async_pool()
 
 application.include_router(auth_router)
 application.include_router(tables_router)
 application.include_router(users_router)
 application.include_router(documents_router)
+application.include_router(admin_router)
 # Router de test sin autenticación (necesario para funcionalidad)
 if HAS_TEST_ROUTER and test_router:
     application.include_router(test_router)
@@ -1,17 +1,42 @@
-from fastapi import HTTPException, Depends
+from typing import Optional
+from fastapi import HTTPException, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from app.config.settings import settings
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+
+def _decode_user(token: str, expiry: bool = False) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        return {
+        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        user = {
             "id": int(payload.get("sub")),
             "role": payload.get("role"),
             "department_id": payload.get("department_id")
         }
+        if expiry:
+            user["exp"] = payload.get("exp")
+        return user
     except JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return _decode_user(credentials.credentials)
+
+
+async def get_current_user_sse(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = Query(None, description="JWT, para EventSource del navegador (no envía cabeceras)"),
+):
+    """
+    Como get_current_user, pero acepta también el token en la query. El JWT se valida una vez
+    por conexión: `exp` (epoch) va en el usuario para que el stream se cierre cuando venza.
+    """
+    if credentials is not None:
+        return _decode_user(credentials.credentials, expiry=True)
+    if token:
+        return _decode_user(token, expiry=True)
+    raise HTTPException(status_code=401, detail="No autenticado")
@@ -1,12 +1,7 @@
-from app.utils.db import get_db_connection
+from app.utils.uow import UnitOfWork
 
 
-def exists(department_id: int) -> bool:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT 1 FROM departments WHERE id = %s", (department_id,))
-        return cursor.fetchone() is not None
-    finally:
-        cursor.close()
-        conn.close()
+async def exists(uow: UnitOfWork, department_id: int) -> bool:
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT 1 FROM departments WHERE id = %s", (department_id,))
+        return await cursor.fetchone() is not None
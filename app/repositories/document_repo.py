@@ -1,100 +1,154 @@
-from typing import Optional, Tuple
-from app.utils.db import get_db_connection
-from app.utils.query import build_where
+from typing import Any, List, Optional, Tuple
+from app.utils.pagination import keyset_condition
+from app.utils.query import build_where, for_update, fulltext_match, fulltext_min_length, fulltext_ranked
+from app.utils.uow import UnitOfWork
 
 
-def insert_document(filename: str, uploaded_by: int, department_id: int, filepath: str, document_type: Optional[str] = None) -> int:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
+async def insert_document(uow: UnitOfWork, filename: str, uploaded_by: int, department_id: int, filepath: str, document_type: Optional[str] = None, content_hash: Optional[str] = None) -> int:
+    async with uow.cursor() as cursor:
+        await cursor.execute(
             """
-            INSERT INTO documents (filename, uploaded_by, department_id, filepath, document_type, status)
-            VALUES (%s, %s, %s, %s, %s, 'pending')
+            INSERT INTO documents (filename, uploaded_by, department_id, filepath, document_type, status, content_hash)
+            VALUES (%s, %s, %s, %s, %s, 'pending', %s)
             """,
-            (filename, uploaded_by, department_id, filepath, document_type)
+            (filename, uploaded_by, department_id, filepath, document_type, content_hash)
         )
-        conn.commit()
         return cursor.lastrowid
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def get_document(document_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute("SELECT * FROM documents WHERE id = %s", (document_id,))
-        return cursor.fetchone()
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def list_documents(limit: int, offset: int, department_id: Optional[int] = None, document_type: Optional[str] = None):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        filters = []
-        params = []
-        if department_id is not None:
-            filters.append("department_id = %s")
-            params.append(department_id)
-        if document_type:
-            filters.append("document_type = %s")
-            params.append(document_type)
-        query = "SELECT * FROM documents" + build_where(filters) + " ORDER BY uploaded_at DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def search_documents(q: Optional[str], department_id: Optional[int], limit: int, offset: int, document_type: Optional[str] = None):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        filters = []
-        params = []
-        if department_id is not None:
-            filters.append("department_id = %s")
-            params.append(department_id)
-        if document_type:
-            filters.append("document_type = %s")
-            params.append(document_type)
-        if q:
-            filters.append("filename LIKE %s")
-            params.append(f"%{q}%")
-        query = "SELECT * FROM documents" + build_where(filters) + " ORDER BY uploaded_at DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def delete_document(document_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("DELETE FROM documents WHERE id = %s", (document_id,))
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def mark_processed(document_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("UPDATE documents SET status = 'processed', processed_at = NOW() WHERE id = %s", (document_id,))
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
 
+
+async def get_document(uow: UnitOfWork, document_id: int):
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute("SELECT * FROM documents WHERE id = %s", (document_id,))
+        return await cursor.fetchone()
+
+
+def _filters(department_id: Optional[int], document_type: Optional[str]) -> Tuple[List[str], List[Any]]:
+    filters = []
+    params = []
+    if department_id is not None:
+        filters.append("department_id = %s")
+        params.append(department_id)
+    if document_type:
+        filters.append("document_type = %s")
+        params.append(document_type)
+    return filters, params
+
+
+def _uses_fulltext(q: Optional[str]) -> bool:
+    # El índice ngram/trigram no tiene tokens más cortos que su tamaño: esos q van por LIKE
+    return bool(q) and len(q.strip()) >= fulltext_min_length()
+
+
+def _fulltext_phrase(q: str) -> str:
+    # Frase en modo booleano: con el parser ngram equivale a buscar la subcadena
+    return '"' + q.strip().replace('"', " ") + '"'
+
+
+def _search_filters(q: Optional[str], department_id: Optional[int], document_type: Optional[str]) -> Tuple[List[str], List[Any]]:
+    filters, params = _filters(department_id, document_type)
+    if q:
+        if _uses_fulltext(q):
+            filters.append(fulltext_match("documents", "filename"))
+            params.append(_fulltext_phrase(q))
+        # Re-chequeo exacto (solo sobre las filas que devuelve el índice FULLTEXT)
+        filters.append("filename LIKE %s")
+        params.append(f"%{q}%")
+    return filters, params
+
+
+def search_sort_keys(q: Optional[str]) -> Tuple[str, ...]:
+    """Claves de orden (sin el id) de search_documents, para construir el cursor."""
+    return ("relevance", "uploaded_at") if _uses_fulltext(q) else ("uploaded_at",)
+
+
+async def _fetch_page(uow: UnitOfWork, base_query: str, filters: List[str], params: List[Any], sort_keys: Tuple[str, ...], limit: int, offset: int, cursor: Optional[Tuple]):
+    # Keyset sobre (sort_keys..., id); el offset solo se usa sin cursor (compatibilidad)
+    filters = list(filters)
+    params = list(params)
+    if cursor is not None:
+        condition, condition_params = keyset_condition(cursor, *sort_keys, "id")
+        filters.append(condition)
+        params.extend(condition_params)
+        offset = 0
+    order = ", ".join(f"{k} DESC" for k in sort_keys + ("id",))
+    query = base_query + build_where(filters) + f" ORDER BY {order} LIMIT %s OFFSET %s"
+    async with uow.cursor(dictionary=True) as cur:
+        await cur.execute(query, tuple(params + [limit, offset]))
+        return await cur.fetchall()
+
+
+async def list_documents(uow: UnitOfWork, limit: int, offset: int = 0, department_id: Optional[int] = None, document_type: Optional[str] = None, cursor: Optional[Tuple] = None):
+    filters, params = _filters(department_id, document_type)
+    return await _fetch_page(uow, "SELECT * FROM documents", filters, params, ("uploaded_at",), limit, offset, cursor)
+
+
+async def search_documents(uow: UnitOfWork, q: Optional[str], department_id: Optional[int], limit: int, offset: int = 0, document_type: Optional[str] = None, cursor: Optional[Tuple] = None):
+    """
+    Con q de longitud suficiente usa el índice FULLTEXT ngram sobre filename y ordena por
+    relevancia (luego fecha); si no, mismo orden que list_documents.
+    """
+    filters, params = _search_filters(q, department_id, document_type)
+    if not _uses_fulltext(q):
+        return await _fetch_page(uow, "SELECT * FROM documents", filters, params, ("uploaded_at",), limit, offset, cursor)
+    relevance, source = fulltext_ranked("documents", "filename")
+    ranked = f"SELECT documents.*, {relevance} AS relevance FROM {source}" + build_where(filters)
+    # relevance es un alias: el keyset se aplica sobre la tabla derivada
+    return await _fetch_page(uow, f"SELECT * FROM ({ranked}) ranked", [], [_fulltext_phrase(q)] + params, search_sort_keys(q), limit, offset, cursor)
+
+
+async def count_documents(uow: UnitOfWork, department_id: Optional[int] = None, document_type: Optional[str] = None, q: Optional[str] = None) -> int:
+    filters, params = _search_filters(q, department_id, document_type)
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT COUNT(*) FROM documents" + build_where(filters), tuple(params))
+        return (await cursor.fetchone())[0]
+
+
+async def delete_document(uow: UnitOfWork, document_id: int):
+    async with uow.cursor() as cursor:
+        await cursor.execute("DELETE FROM documents WHERE id = %s", (document_id,))
+
+
+async def mark_processing(uow: UnitOfWork, document_id: int):
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE documents SET status='processing', last_attempt_at = NOW(), error_message = NULL WHERE id = %s", (document_id,))
+
+
+async def mark_processed(uow: UnitOfWork, document_id: int):
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE documents SET status = 'processed', processed_at = NOW() WHERE id = %s", (document_id,))
+
+
+async def mark_error(uow: UnitOfWork, document_id: int, error_message: str):
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE documents SET status='error', error_message=%s WHERE id=%s", (error_message[:500], document_id))
+
+
+async def mark_pending(uow: UnitOfWork, document_id: int):
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE documents SET status = 'pending', processed_at = NULL WHERE id = %s", (document_id,))
+
+
+async def set_page_count(uow: UnitOfWork, document_id: int, page_count: int):
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE documents SET page_count = %s WHERE id = %s", (page_count, document_id))
+
+
+async def set_extracted_pages(uow: UnitOfWork, document_id: int, extracted_pages: int):
+    """Checkpoint: páginas 1..extracted_pages ya guardadas (se confirma junto con ese bloque)."""
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE documents SET extracted_pages = %s WHERE id = %s", (extracted_pages, document_id))
+
+
+async def set_content_hash(uow: UnitOfWork, document_id: int, content_hash: str):
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE documents SET content_hash = %s WHERE id = %s", (content_hash, document_id))
+
+
+async def lock_document(uow: UnitOfWork, document_id: int) -> None:
+    """
+    Bloquea la fila del documento hasta el commit: numeración de tablas en extracción diferida
+    y comprobación de job activo antes de encolar (/process, /reprocess).
+    """
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT id FROM documents WHERE id = %s" + for_update(), (document_id,))
+        await cursor.fetchone()
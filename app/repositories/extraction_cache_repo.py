@@ -0,0 +1,79 @@
+from typing import Sequence
+from app.utils.uow import UnitOfWork
+
+
+async def get_entry(uow: UnitOfWork, content_hash: str, extractor_version: str):
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            "SELECT content_hash, extractor_version, page_count, payload, size_bytes, hits FROM extraction_cache "
+            "WHERE content_hash = %s AND extractor_version = %s",
+            (content_hash, extractor_version)
+        )
+        return await cursor.fetchone()
+
+
+async def touch(uow: UnitOfWork, content_hash: str, extractor_version: str) -> None:
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "UPDATE extraction_cache SET hits = hits + 1, last_used_at = NOW() WHERE content_hash = %s AND extractor_version = %s",
+            (content_hash, extractor_version)
+        )
+
+
+async def put_entry(uow: UnitOfWork, content_hash: str, extractor_version: str, page_count: int, payload: bytes) -> None:
+    """Reemplaza la entrada (DELETE + INSERT: igual en MySQL y SQLite). No hace commit."""
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "DELETE FROM extraction_cache WHERE content_hash = %s AND extractor_version = %s",
+            (content_hash, extractor_version)
+        )
+        await cursor.execute(
+            "INSERT INTO extraction_cache (content_hash, extractor_version, page_count, payload, size_bytes, hits, created_at, last_used_at) "
+            "VALUES (%s, %s, %s, %s, %s, 0, NOW(), NOW())",
+            (content_hash, extractor_version, page_count, payload, len(payload))
+        )
+
+
+async def delete_other_versions(uow: UnitOfWork, extractor_versions: Sequence[str]) -> int:
+    """Entradas de versiones anteriores del extractor (una vigente por backend de texto): ya no pueden acertar."""
+    placeholders = ", ".join(["%s"] * len(extractor_versions))
+    async with uow.cursor() as cursor:
+        await cursor.execute(f"DELETE FROM extraction_cache WHERE extractor_version NOT IN ({placeholders})", tuple(extractor_versions))
+        return cursor.rowcount
+
+
+async def total_size(uow: UnitOfWork) -> int:
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM extraction_cache")
+        row = await cursor.fetchone()
+        return int(row[0])
+
+
+async def evict_lru(uow: UnitOfWork, max_bytes: int) -> int:
+    """
+    Borra las entradas menos usadas recientemente (a igual last_used_at, las de menos aciertos)
+    hasta que el total quepa en `max_bytes`.
+    """
+    excess = await total_size(uow) - max_bytes
+    if excess <= 0:
+        return 0
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT content_hash, extractor_version, size_bytes FROM extraction_cache ORDER BY last_used_at, hits")
+        victims = []
+        for content_hash, extractor_version, size_bytes in await cursor.fetchall():
+            if excess <= 0:
+                break
+            victims.append((content_hash, extractor_version))
+            excess -= size_bytes
+        for key in victims:
+            await cursor.execute("DELETE FROM extraction_cache WHERE content_hash = %s AND extractor_version = %s", key)
+    return len(victims)
+
+
+async def summary(uow: UnitOfWork) -> dict:
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size_bytes, COALESCE(SUM(hits), 0) AS hits FROM extraction_cache"
+        )
+        row = await cursor.fetchone()
+    return {"entries": int(row["entries"]), "size_bytes": int(row["size_bytes"]), "hits": int(row["hits"])}
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+from typing import List
+from app.utils.uow import UnitOfWork
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow().replace(microsecond=0)
+
+
+async def enqueue(uow: UnitOfWork, document_id: int, max_attempts: int, mode: str = "full", delay_seconds: float = 0) -> int:
+    """
+    mode: 'full' (texto y tablas), 'text_first' (solo texto; tablas diferidas) o 'tables'
+    (tablas pendientes de un documento ya procesado en modo text_first).
+    """
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "INSERT INTO processing_jobs (document_id, mode, status, attempts, max_attempts, run_after) VALUES (%s, %s, 'queued', 0, %s, %s)",
+            (document_id, mode, max_attempts, _utcnow() + timedelta(seconds=delay_seconds))
+        )
+        return cursor.lastrowid
+
+
+async def get_job(uow: UnitOfWork, job_id: int):
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute("SELECT * FROM processing_jobs WHERE id = %s", (job_id,))
+        return await cursor.fetchone()
+
+
+async def get_active_job(uow: UnitOfWork, document_id: int):
+    """
+    Job en cola o en curso del documento. Como mucho uno: quien encola bloquea antes el
+    documento (document_repo.lock_document) y no encola si ya existe.
+    """
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            "SELECT * FROM processing_jobs WHERE document_id = %s AND status IN (%s, %s) ORDER BY id DESC LIMIT 1",
+            (document_id, *ACTIVE_STATUSES)
+        )
+        return await cursor.fetchone()
+
+
+async def get_latest_job(uow: UnitOfWork, document_id: int):
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute("SELECT * FROM processing_jobs WHERE document_id = %s ORDER BY id DESC LIMIT 1", (document_id,))
+        return await cursor.fetchone()
+
+
+async def claim(uow: UnitOfWork, worker_id: str, limit: int) -> List[dict]:
+    """
+    Toma hasta `limit` jobs listos (queued y run_after vencido), en orden de llegada.
+    El UPDATE condicionado a status = 'queued' hace la toma atómica: si otro worker ganó
+    la carrera, rowcount es 0 y el job se omite. No hace commit.
+    """
+    now = _utcnow()
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            "SELECT id FROM processing_jobs WHERE status = 'queued' AND run_after <= %s ORDER BY run_after, id LIMIT %s",
+            (now, limit)
+        )
+        candidates = [row["id"] for row in await cursor.fetchall()]
+    claimed = []
+    for job_id in candidates:
+        async with uow.cursor() as cursor:
+            await cursor.execute(
+                "UPDATE processing_jobs SET status = 'running', attempts = attempts + 1, locked_by = %s, locked_at = %s "
+                "WHERE id = %s AND status = 'queued'",
+                (worker_id, now, job_id)
+            )
+            won = cursor.rowcount == 1
+        if won:
+            claimed.append(await get_job(uow, job_id))
+    return claimed
+
+
+async def heartbeat(uow: UnitOfWork, job_id: int) -> None:
+    """Renueva el lease de un job en curso (el worker lo llama tras cada lote guardado)."""
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE processing_jobs SET locked_at = %s WHERE id = %s AND status = 'running'", (_utcnow(), job_id))
+
+
+async def mark_done(uow: UnitOfWork, job_id: int) -> None:
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "UPDATE processing_jobs SET status = 'done', locked_by = NULL, last_error = NULL, finished_at = %s WHERE id = %s",
+            (_utcnow(), job_id)
+        )
+
+
+async def mark_failed(uow: UnitOfWork, job: dict, error_message: str, backoff_seconds: float) -> bool:
+    """
+    Reencola con espera exponencial (backoff * 2^(intentos-1)) mientras queden intentos;
+    si no, lo deja en 'failed'. Devuelve True si se reintentará.
+    """
+    retry = job["attempts"] < job["max_attempts"]
+    async with uow.cursor() as cursor:
+        if retry:
+            delay = backoff_seconds * (2 ** (job["attempts"] - 1))
+            await cursor.execute(
+                "UPDATE processing_jobs SET status = 'queued', locked_by = NULL, locked_at = NULL, last_error = %s, run_after = %s WHERE id = %s",
+                (error_message[:500], _utcnow() + timedelta(seconds=delay), job["id"])
+            )
+        else:
+            await cursor.execute(
+                "UPDATE processing_jobs SET status = 'failed', locked_by = NULL, last_error = %s, finished_at = %s WHERE id = %s",
+                (error_message[:500], _utcnow(), job["id"])
+            )
+    return retry
+
+
+async def release(uow: UnitOfWork, job_id: int) -> None:
+    """Devuelve a la cola un job interrumpido (apagado forzado) sin contarlo como intento."""
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "UPDATE processing_jobs SET status = 'queued', attempts = attempts - 1, locked_by = NULL, locked_at = NULL "
+            "WHERE id = %s AND status = 'running'",
+            (job_id,)
+        )
+
+
+async def requeue_stale(uow: UnitOfWork, lease_seconds: float) -> List[dict]:
+    """
+    Jobs 'running' cuyo worker murió (locked_at más viejo que el lease) vuelven a la cola,
+    salvo que ya hayan agotado sus intentos (un PDF que tumba al worker no se reintenta sin fin):
+    esos quedan 'failed'. Devuelve los jobs recuperados, con `failed`, para que quien llama
+    actualice sus documentos en la misma transacción. No hace commit.
+    """
+    now = _utcnow()
+    expired = now - timedelta(seconds=lease_seconds)
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            "SELECT id, document_id, mode, attempts, max_attempts FROM processing_jobs WHERE status = 'running' AND locked_at < %s",
+            (expired,)
+        )
+        stale = await cursor.fetchall()
+    recovered = []
+    for job in stale:
+        failed = job["attempts"] >= job["max_attempts"]
+        async with uow.cursor() as cursor:
+            # Condicionado como claim(): si otro worker ya lo recuperó, rowcount es 0
+            if failed:
+                await cursor.execute(
+                    "UPDATE processing_jobs SET status = 'failed', locked_by = NULL, last_error = 'lease vencido', finished_at = %s "
+                    "WHERE id = %s AND status = 'running' AND locked_at < %s",
+                    (now, job["id"], expired)
+                )
+            else:
+                await cursor.execute(
+                    "UPDATE processing_jobs SET status = 'queued', locked_by = NULL, locked_at = NULL, last_error = 'lease vencido', run_after = %s "
+                    "WHERE id = %s AND status = 'running' AND locked_at < %s",
+                    (now, job["id"], expired)
+                )
+            if cursor.rowcount == 1:
+                recovered.append({**job, "failed": failed})
+    return recovered
+
+
+async def count_by_status(uow: UnitOfWork) -> dict:
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT status, COUNT(*) FROM processing_jobs GROUP BY status")
+        return {status: count for status, count in await cursor.fetchall()}
+
+
+async def has_pending(uow: UnitOfWork) -> bool:
+    """True si queda algún job en cola o en curso (listo o esperando su reintento)."""
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT 1 FROM processing_jobs WHERE status IN (%s, %s) LIMIT 1", ACTIVE_STATUSES)
+        return await cursor.fetchone() is not None
@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.utils.query import build_where, bulk_insert
+from app.utils.uow import UnitOfWork
+
+
+PAGE_COLUMNS = ("document_id", "page", "text", "fingerprint", "extractor_version", "tables_extracted", "extraction_error")
+
+
+async def insert_pages(uow: UnitOfWork, document_id: int, pages: List[Tuple[int, str, Optional[str], Optional[str]]], batch_size: Optional[int] = None, tables_extracted: bool = True, extractor_version: Optional[str] = None) -> int:
+    """
+    Texto por página (page, text, fingerprint, extraction_error), separado de las tablas para
+    poder leer un rango sin cargar el resto. Bloques más pequeños que los de celdas: cada fila
+    puede llevar varios KB de texto. Con `tables_extracted=False` las tablas de esas páginas
+    quedan para la extracción diferida.
+    """
+    rows = [(document_id, page, text, fingerprint, extractor_version, tables_extracted, error) for page, text, fingerprint, error in pages]
+    async with uow.cursor() as cursor:
+        return await bulk_insert(cursor, "document_pages", PAGE_COLUMNS, rows, batch_size or settings.db_page_insert_batch_size)
+
+
+async def list_pages(uow: UnitOfWork, document_id: int, page_from: Optional[int] = None, page_to: Optional[int] = None):
+    filters = ["document_id = %s"]
+    params = [document_id]
+    if page_from is not None:
+        filters.append("page >= %s")
+        params.append(page_from)
+    if page_to is not None:
+        filters.append("page <= %s")
+        params.append(page_to)
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute("SELECT page, text FROM document_pages" + build_where(filters) + " ORDER BY page", tuple(params))
+        return await cursor.fetchall()
+
+
+async def list_page_states(uow: UnitOfWork, document_id: int) -> Dict[int, Dict[str, Any]]:
+    """Huella, versión del extractor, tablas y error de cada página guardada, por número de página."""
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            "SELECT page, fingerprint, extractor_version, tables_extracted, extraction_error FROM document_pages WHERE document_id = %s",
+            (document_id,)
+        )
+        return {row["page"]: row for row in await cursor.fetchall()}
+
+
+def _pending_filters(document_id: int, page_from: Optional[int], page_to: Optional[int]) -> Tuple[List[str], List]:
+    filters = ["document_id = %s", "tables_extracted = FALSE"]
+    params: List = [document_id]
+    if page_from is not None:
+        filters.append("page >= %s")
+        params.append(page_from)
+    if page_to is not None:
+        filters.append("page <= %s")
+        params.append(page_to)
+    return filters, params
+
+
+async def list_pending_table_pages(uow: UnitOfWork, document_id: int, page_from: Optional[int] = None, page_to: Optional[int] = None, limit: int = 100) -> List[int]:
+    """Páginas (en orden) cuyas tablas aún no se extrajeron."""
+    filters, params = _pending_filters(document_id, page_from, page_to)
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT page FROM document_pages" + build_where(filters) + " ORDER BY page LIMIT %s", (*params, limit))
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def count_pending_table_pages(uow: UnitOfWork, document_id: int, page_from: Optional[int] = None, page_to: Optional[int] = None) -> int:
+    filters, params = _pending_filters(document_id, page_from, page_to)
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT COUNT(*) FROM document_pages" + build_where(filters), tuple(params))
+        row = await cursor.fetchone()
+        return row[0]
+
+
+async def claim_page_tables(uow: UnitOfWork, document_id: int, page: int) -> bool:
+    """
+    Marca las tablas de la página como extraídas (y borra el error de un intento anterior). El
+    UPDATE condicionado decide quién las guarda si dos extracciones diferidas coinciden: False
+    si otra ya lo hizo. No hace commit.
+    """
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "UPDATE document_pages SET tables_extracted = TRUE, extraction_error = NULL WHERE document_id = %s AND page = %s AND tables_extracted = FALSE",
+            (document_id, page)
+        )
+        return cursor.rowcount == 1
+
+
+async def set_page_error(uow: UnitOfWork, document_id: int, page: int, error: str) -> None:
+    """Error de la extracción diferida de tablas de una página, que sigue pendiente. No hace commit."""
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "UPDATE document_pages SET extraction_error = %s WHERE document_id = %s AND page = %s AND tables_extracted = FALSE",
+            (error, document_id, page)
+        )
+
+
+async def delete_pages(uow: UnitOfWork, document_id: int, pages: List[int]) -> None:
+    if not pages:
+        return
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            f"DELETE FROM document_pages WHERE document_id = %s AND page IN ({', '.join(['%s'] * len(pages))})",
+            (document_id, *pages)
+        )
+
+
+async def delete_by_document(uow: UnitOfWork, document_id: int) -> None:
+    async with uow.cursor() as cursor:
+        await cursor.execute("DELETE FROM document_pages WHERE document_id = %s", (document_id,))
@@ -1,46 +1,29 @@
 from datetime import datetime, timedelta
 import secrets
-from app.utils.db import get_db_connection
+from app.utils.uow import UnitOfWork
 
 DEFAULT_EXP_MINUTES = 15
 
 
-def create_token(user_id: int, exp_minutes: int = DEFAULT_EXP_MINUTES) -> str:
+async def create_token(uow: UnitOfWork, user_id: int, exp_minutes: int = DEFAULT_EXP_MINUTES) -> str:
     token = secrets.token_urlsafe(32)
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
+    async with uow.cursor() as cursor:
+        await cursor.execute(
             "INSERT INTO password_reset_tokens (user_id, token, expires_at, used) VALUES (%s, %s, %s, FALSE)",
             (user_id, token, datetime.utcnow() + timedelta(minutes=exp_minutes))
         )
-        conn.commit()
         return token
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def get_valid_token(token: str):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute(
+async def get_valid_token(uow: UnitOfWork, token: str):
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
             "SELECT * FROM password_reset_tokens WHERE token = %s AND used = FALSE AND expires_at > NOW()",
             (token,)
         )
-        return cursor.fetchone()
-    finally:
-        cursor.close()
-        conn.close()
+        return await cursor.fetchone()
 
 
-def mark_used(token_id: int) -> None:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("UPDATE password_reset_tokens SET used = TRUE WHERE id = %s", (token_id,))
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
+async def mark_used(uow: UnitOfWork, token_id: int) -> None:
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE password_reset_tokens SET used = TRUE WHERE id = %s", (token_id,))
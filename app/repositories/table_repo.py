@@ -1,71 +1,204 @@
-from typing import Optional, List, Dict, Any
-from app.utils.db import get_db_connection
+from typing import Optional, List, Dict, Any, Tuple
+from app.services.cell_index import HEADER_ROW, MAX_QUERY_TOKENS, Posting, tokenize
+from app.config.settings import settings
+from app.utils.query import build_where, bulk_insert
+from app.utils.uow import UnitOfWork
 
+TABLE_COLUMNS = ("document_id", "table_index", "page", "row_count", "col_count", "has_headers", "column_types")
+CELL_COLUMNS = ("document_id", "table_index", "row_index", "col_index", "value", "value_num", "value_date")
+POSTING_COLUMNS = ("token", "department_id", "document_id", "table_index", "row_index", "col_index", "page")
 
-def insert_extracted_table(document_id: int, table_index: int, content_json: str) -> int:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO extracted_tables (document_id, table_index, content) VALUES (%s, %s, %s)",
-            (document_id, table_index, content_json)
+
+def _table_filters(document_id: int, table_index: Optional[int], page_from: Optional[int], page_to: Optional[int], alias: str = "") -> Tuple[List[str], List[Any]]:
+    filters = [f"{alias}document_id = %s"]
+    params: List[Any] = [document_id]
+    if table_index is not None:
+        filters.append(f"{alias}table_index = %s")
+        params.append(table_index)
+    if page_from is not None:
+        filters.append(f"{alias}page >= %s")
+        params.append(page_from)
+    if page_to is not None:
+        filters.append(f"{alias}page <= %s")
+        params.append(page_to)
+    return filters, params
+
+
+def _table_rows(document_id: int, tables: List[Dict[str, Any]], first_index: int = 0) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Filas de extracted_tables y de extracted_table_cells (solo no vacías; headers en HEADER_ROW).
+    El valor tipado de cada celda (`values` de normalize_table) va a value_num o value_date
+    según el tipo de su columna.
+    """
+    table_rows, cells = [], []
+    for t_idx, tbl in enumerate(tables, start=first_index):
+        headers = tbl.get("headers")
+        rows = tbl.get("rows") or []
+        types = tbl.get("column_types") or []
+        typed_rows = tbl.get("values") or []
+        col_count = max([len(headers or [])] + [len(r) for r in rows])
+        table_rows.append((document_id, t_idx, tbl.get("page"), len(rows), col_count, headers is not None, ",".join(types) or None))
+        for c_idx, value in enumerate(headers or []):
+            cells.append((document_id, t_idx, HEADER_ROW, c_idx, value, None, None))
+        for r_idx, row in enumerate(rows):
+            typed_row = typed_rows[r_idx] if r_idx < len(typed_rows) else []
+            for c_idx, value in enumerate(row):
+                if value != "":
+                    typed = typed_row[c_idx] if c_idx < len(typed_row) else None
+                    is_date = c_idx < len(types) and types[c_idx] == "date"
+                    cells.append((document_id, t_idx, r_idx, c_idx, value, None if is_date else typed, typed if is_date else None))
+    return table_rows, cells
+
+
+async def insert_tables(uow: UnitOfWork, document_id: int, tables: List[Dict[str, Any]], batch_size: Optional[int] = None, first_index: int = 0) -> int:
+    """
+    Tablas del documento (table_index = first_index + posición en la lista) con INSERTs
+    multi-fila de `batch_size` filas. Devuelve el número de filas insertadas. No hace commit.
+    """
+    batch_size = batch_size or settings.db_insert_batch_size
+    table_rows, cells = _table_rows(document_id, tables, first_index)
+    async with uow.cursor() as cursor:
+        inserted = await bulk_insert(cursor, "extracted_tables", TABLE_COLUMNS, table_rows, batch_size)
+        inserted += await bulk_insert(cursor, "extracted_table_cells", CELL_COLUMNS, cells, batch_size)
+    return inserted
+
+
+async def next_table_index(uow: UnitOfWork, document_id: int) -> int:
+    """table_index que sigue a las tablas ya guardadas (al reanudar una extracción por bloques)."""
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT COALESCE(MAX(table_index) + 1, 0) FROM extracted_tables WHERE document_id = %s", (document_id,))
+        row = await cursor.fetchone()
+        return row[0]
+
+
+async def list_tables(uow: UnitOfWork, document_id: int, table_index: Optional[int] = None, page_from: Optional[int] = None, page_to: Optional[int] = None):
+    """
+    Metadatos (sin celdas) de las tablas del documento, en orden de página. Con extracción
+    diferida table_index sigue el orden en que se extrajo cada página, no el del documento.
+    """
+    filters, params = _table_filters(document_id, table_index, page_from, page_to)
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            "SELECT id, table_index, page, row_count, col_count, has_headers, column_types, created_at FROM extracted_tables"
+            + build_where(filters) + " ORDER BY page, table_index",
+            tuple(params)
         )
-        conn.commit()
-        return cursor.lastrowid
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def list_by_document(document_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute(
-            "SELECT id, table_index, content, created_at FROM extracted_tables WHERE document_id = %s ORDER BY id",
-            (document_id,)
+        return await cursor.fetchall()
+
+
+async def list_cells(uow: UnitOfWork, document_id: int, table_index: Optional[int] = None, page_from: Optional[int] = None, page_to: Optional[int] = None):
+    filters, params = _table_filters(document_id, table_index, page_from, page_to, alias="et.")
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            "SELECT c.table_index, c.row_index, c.col_index, c.value, c.value_num, c.value_date FROM extracted_tables et "
+            "JOIN extracted_table_cells c ON c.document_id = et.document_id AND c.table_index = et.table_index"
+            + build_where(filters) + " ORDER BY c.table_index, c.row_index, c.col_index",
+            tuple(params)
         )
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def search(q: str, department_id: Optional[int] = None, limit: int = 20, offset: int = 0):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        params = []
-        query = (
-            "SELECT et.id AS table_id, et.document_id, et.table_index, et.content, et.created_at, "
-            "d.filename AS document_filename, d.department_id AS document_department_id, d.uploaded_at AS document_uploaded_at, d.status AS document_status "
-            "FROM extracted_tables et JOIN documents d ON d.id = et.document_id"
+        return await cursor.fetchall()
+
+
+async def get_tables(uow: UnitOfWork, document_id: int, table_index: Optional[int] = None, page_from: Optional[int] = None, page_to: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Tablas reconstruidas ({headers, rows, column_types, values}) solo para la tabla / rango de
+    páginas pedido. `values` tiene la forma de `rows`: números, fechas ISO o None.
+    """
+    tables = await list_tables(uow, document_id, table_index, page_from, page_to)
+    if not tables:
+        return []
+    assembled: Dict[int, Dict[str, Any]] = {}
+    for t in tables:
+        cols = t["col_count"]
+        assembled[t["table_index"]] = {
+            "id": t["id"],
+            "table_index": t["table_index"],
+            "page": t["page"],
+            "headers": [""] * cols if t["has_headers"] else None,
+            "rows": [[""] * cols for _ in range(t["row_count"])],
+            # Tablas guardadas antes de la inferencia de tipos: todo text
+            "column_types": t["column_types"].split(",") if t["column_types"] else ["text"] * cols,
+            "values": [[None] * cols for _ in range(t["row_count"])],
+            "created_at": t["created_at"],
+        }
+    for c in await list_cells(uow, document_id, table_index, page_from, page_to):
+        tbl = assembled[c["table_index"]]
+        if c["row_index"] == HEADER_ROW:
+            tbl["headers"][c["col_index"]] = c["value"]
+            continue
+        tbl["rows"][c["row_index"]][c["col_index"]] = c["value"]
+        if c["value_date"] is not None:
+            tbl["values"][c["row_index"]][c["col_index"]] = str(c["value_date"])
+        elif c["value_num"] is not None:
+            num = float(c["value_num"])
+            tbl["values"][c["row_index"]][c["col_index"]] = int(num) if tbl["column_types"][c["col_index"]] == "integer" else num
+    return list(assembled.values())
+
+
+async def insert_postings(uow: UnitOfWork, document_id: int, department_id: int, postings: List[Posting], batch_size: Optional[int] = None) -> int:
+    """Índice invertido token -> celda para /tables/search."""
+    rows = [(token, department_id, document_id, t_idx, r_idx, c_idx, page) for token, t_idx, r_idx, c_idx, page in postings]
+    async with uow.cursor() as cursor:
+        return await bulk_insert(cursor, "table_cell_tokens", POSTING_COLUMNS, rows, batch_size or settings.db_insert_batch_size)
+
+
+async def search(uow: UnitOfWork, q: str, department_id: Optional[int] = None, limit: int = 20, offset: int = 0):
+    """
+    Celdas que contienen todos los tokens de q (el último como prefijo), resueltas sobre
+    table_cell_tokens. El token prefijo recorre el índice por rango y los demás se cruzan
+    por clave primaria completa sobre la misma celda.
+    """
+    tokens = tokenize(q)[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return []
+    *exact, prefix = tokens
+    params: List[Any] = []
+    joins = []
+    for i, token in enumerate(exact, start=1):
+        joins.append(
+            f"JOIN table_cell_tokens t{i} ON t{i}.token = %s AND t{i}.department_id = t0.department_id "
+            f"AND t{i}.document_id = t0.document_id AND t{i}.table_index = t0.table_index "
+            f"AND t{i}.row_index = t0.row_index AND t{i}.col_index = t0.col_index"
         )
-        filters = []
-        if department_id is not None:
-            filters.append("d.department_id = %s")
-            params.append(department_id)
-        # Búsqueda parcial (case-insensitive según collation de la columna)
-        filters.append("JSON_SEARCH(JSON_EXTRACT(et.content, '$'), 'one', %s) IS NOT NULL")
-        params.append(f"%{q}%")
-        if filters:
-            query += " WHERE " + " AND ".join(filters)
-        query += " ORDER BY et.id DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def delete_by_document(document_id: int) -> None:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("DELETE FROM extracted_tables WHERE document_id = %s", (document_id,))
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
+        params.append(token)
+    filters = ["t0.token LIKE %s"]
+    params.append(prefix + "%")
+    if department_id is not None:
+        filters.append("t0.department_id = %s")
+        params.append(department_id)
+    query = (
+        "SELECT DISTINCT t0.document_id, t0.table_index, t0.row_index, t0.col_index, t0.page, c.value, "
+        "d.filename AS document_filename, d.department_id AS document_department_id, d.uploaded_at AS document_uploaded_at, d.status AS document_status "
+        "FROM table_cell_tokens t0 " + " ".join(joins) + " JOIN documents d ON d.id = t0.document_id "
+        "LEFT JOIN extracted_table_cells c ON c.document_id = t0.document_id AND c.table_index = t0.table_index "
+        "AND c.row_index = t0.row_index AND c.col_index = t0.col_index"
+        + build_where(filters)
+        + " ORDER BY t0.document_id DESC, t0.table_index, t0.row_index, t0.col_index LIMIT %s OFFSET %s"
+    )
+    params.extend([limit, offset])
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(query, tuple(params))
+        return await cursor.fetchall()
+
+
+async def delete_by_pages(uow: UnitOfWork, document_id: int, pages: List[int]) -> None:
+    """Tablas de esas páginas, con sus celdas y su índice (al volver a extraerlas). No hace commit."""
+    if not pages:
+        return
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            f"SELECT table_index FROM extracted_tables WHERE document_id = %s AND page IN ({', '.join(['%s'] * len(pages))})",
+            (document_id, *pages)
+        )
+        indexes = [row[0] for row in await cursor.fetchall()]
+        if not indexes:
+            return
+        placeholders = ", ".join(["%s"] * len(indexes))
+        for table in ("table_cell_tokens", "extracted_table_cells", "extracted_tables"):
+            await cursor.execute(f"DELETE FROM {table} WHERE document_id = %s AND table_index IN ({placeholders})", (document_id, *indexes))
+
 
+async def delete_by_document(uow: UnitOfWork, document_id: int) -> None:
+    async with uow.cursor() as cursor:
+        await cursor.execute("DELETE FROM table_cell_tokens WHERE document_id = %s", (document_id,))
+        await cursor.execute("DELETE FROM extracted_table_cells WHERE document_id = %s", (document_id,))
+        await cursor.execute("DELETE FROM extracted_tables WHERE document_id = %s", (document_id,))
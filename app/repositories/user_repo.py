@@ -1,35 +1,44 @@
-from app.utils.db import get_db_connection
+from app.utils.pagination import keyset_condition
+from app.utils.query import build_where
+from app.utils.uow import UnitOfWork
 
 
-def get_user_by_email(email: str):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
+async def get_user_by_email(uow: UnitOfWork, email: str):
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
+        user = await cursor.fetchone()
         return user
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def get_user_by_id(user_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-        user = cursor.fetchone()
+async def get_user_by_id(uow: UnitOfWork, user_id: int):
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+        user = await cursor.fetchone()
         return user
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def update_failed_attempts(user_id: int, failed_attempts: int, is_blocked: bool = False):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
+async def create_user(uow: UnitOfWork, email: str, password_hash: str, role: str, department_id: int | None):
+    async with uow.cursor(dictionary=True) as cursor:
+        await cursor.execute(
+            """
+            INSERT INTO users (email, password_hash, role, department_id, is_blocked, failed_attempts)
+            VALUES (%s, %s, %s, %s, FALSE, 0)
+            """,
+            (email, password_hash, role, department_id)
+        )
+        user_id = cursor.lastrowid
+        await cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+        return await cursor.fetchone()
+
+
+async def update_password(uow: UnitOfWork, user_id: int, password_hash: str):
+    async with uow.cursor() as cursor:
+        await cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, user_id))
+
+
+async def update_failed_attempts(uow: UnitOfWork, user_id: int, failed_attempts: int, is_blocked: bool = False):
+    async with uow.cursor() as cursor:
+        await cursor.execute(
             """
             UPDATE users
             SET failed_attempts = %s,
@@ -40,17 +49,11 @@ def update_failed_attempts(user_id: int, failed_attempts: int, is_blocked: bool
             """,
             (failed_attempts, is_blocked, is_blocked, is_blocked, user_id),
         )
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
 
 
-def reset_failed_attempts(user_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
+async def reset_failed_attempts(uow: UnitOfWork, user_id: int):
+    async with uow.cursor() as cursor:
+        await cursor.execute(
             """
             UPDATE users
             SET failed_attempts = 0,
@@ -61,34 +64,40 @@ def reset_failed_attempts(user_id: int):
             """,
             (user_id,),
         )
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
-
-
-def list_users(limit: int | None = None, offset: int | None = None, role: str | None = None, department_id: int | None = None):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        filters = []
-        params = []
-        if role:
-            filters.append("role = %s")
-            params.append(role)
-        if department_id is not None:
-            filters.append("department_id = %s")
-            params.append(department_id)
-        query = "SELECT id, email, role, department_id, is_blocked, failed_attempts, created_at, updated_at FROM users"
-        if filters:
-            query += " WHERE " + " AND ".join(filters)
-        query += " ORDER BY created_at DESC"
-        if limit is not None and offset is not None:
-            query += " LIMIT %s OFFSET %s"
-            params.extend([limit, offset])
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
+
+
+def _filters(role: str | None, department_id: int | None):
+    filters = []
+    params = []
+    if role:
+        filters.append("role = %s")
+        params.append(role)
+    if department_id is not None:
+        filters.append("department_id = %s")
+        params.append(department_id)
+    return filters, params
+
+
+async def list_users(uow: UnitOfWork, limit: int = 20, offset: int = 0, role: str | None = None, department_id: int | None = None, cursor: tuple | None = None):
+    filters, params = _filters(role, department_id)
+    # Keyset sobre (created_at, id); el offset solo se usa sin cursor (compatibilidad)
+    if cursor is not None:
+        condition, condition_params = keyset_condition(cursor, "created_at", "id")
+        filters.append(condition)
+        params.extend(condition_params)
+        offset = 0
+    query = "SELECT id, email, role, department_id, is_blocked, failed_attempts, created_at, updated_at FROM users"
+    query += build_where(filters)
+    query += " ORDER BY created_at DESC, id DESC LIMIT %s OFFSET %s"
+    params.extend([limit, offset])
+    async with uow.cursor(dictionary=True) as cur:
+        await cur.execute(query, tuple(params))
+        rows = await cur.fetchall()
         return rows
-    finally:
-        cursor.close()
-        conn.close()
+
+
+async def count_users(uow: UnitOfWork, role: str | None = None, department_id: int | None = None) -> int:
+    filters, params = _filters(role, department_id)
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT COUNT(*) FROM users" + build_where(filters), tuple(params))
+        return (await cursor.fetchone())[0]
@@ -1,5 +1,7 @@
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.repositories import user_repo
+from app.utils.uow import UnitOfWork
 from app.utils.security import verify_password, create_access_token
 from datetime import timedelta
 import hashlib
@@ -7,8 +9,8 @@ import hashlib
 MAX_ATTEMPTS = 5
 
 
-def login_user(email: str, password: str):
-    user = user_repo.get_user_by_email(email)
+async def login_user(uow: UnitOfWork, email: str, password: str):
+    user = await user_repo.get_user_by_email(uow, email)
 
     if not user:
         # No revelar existencia
@@ -18,17 +20,19 @@ def login_user(email: str, password: str):
     if user["role"] == "operador" and user.get("is_blocked"):
         raise HTTPException(status_code=403, detail="Usuario bloqueado, contacte al admin")
 
-    # Validar password
-    if not verify_password(password, user["password_hash"]):
+    # Validar password (bcrypt es CPU-bound: fuera del event loop)
+    if not await run_in_threadpool(verify_password, password, user["password_hash"]):
         attempts = (user.get("failed_attempts") or 0) + 1
         will_block = user["role"] == "operador" and attempts >= MAX_ATTEMPTS
-        user_repo.update_failed_attempts(user["id"], attempts, will_block)
+        await user_repo.update_failed_attempts(uow, user["id"], attempts, will_block)
+        await uow.commit()
         msg = "Usuario bloqueado" if will_block else "Credenciales inválidas"
         raise HTTPException(status_code=401, detail=msg)
 
     # Login exitoso: resetea intentos para operadores
     if user["role"] == "operador":
-        user_repo.reset_failed_attempts(user["id"])
+        await user_repo.reset_failed_attempts(uow, user["id"])
+        await uow.commit()
 
     # Emitir token con claims útiles
     payload = {
@@ -0,0 +1,42 @@
+import re
+import unicodedata
+from typing import Any, Dict, Iterator, List, Tuple
+
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TOKENS = 5
+HEADER_ROW = -1
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# (token, table_index, row_index, col_index, page)
+Posting = Tuple[str, int, int, int, int | None]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Minúsculas, sin tildes y partido en secuencias alfanuméricas: "Señor $4,750.00" ->
+    ["senor", "4", "750", "00"]. Se usa igual al indexar y al consultar.
+    """
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", str(text))
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch)).lower()
+    return [tok[:MAX_TOKEN_LENGTH] for tok in _TOKEN_RE.findall(folded)]
+
+
+def _cell_postings(value: Any, table_index: int, row_index: int, col_index: int, page) -> Iterator[Posting]:
+    for token in set(tokenize(value)):
+        yield (token, table_index, row_index, col_index, page)
+
+
+def build_postings(tables: List[Dict[str, Any]], first_index: int = 0) -> List[Posting]:
+    """Postings de todas las celdas (headers en la fila HEADER_ROW) de las tablas extraídas."""
+    postings: List[Posting] = []
+    for t_idx, tbl in enumerate(tables, start=first_index):
+        page = tbl.get("page")
+        for c_idx, header in enumerate(tbl.get("headers") or []):
+            postings.extend(_cell_postings(header, t_idx, HEADER_ROW, c_idx, page))
+        for r_idx, row in enumerate(tbl.get("rows") or []):
+            for c_idx, value in enumerate(row):
+                postings.extend(_cell_postings(value, t_idx, r_idx, c_idx, page))
+    return postings
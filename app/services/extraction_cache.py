@@ -0,0 +1,142 @@
+"""
+Caché de extracción por contenido: el resultado de un PDF se guarda comprimido bajo
+(SHA-256 del archivo, versión del extractor) y otro documento con el mismo contenido lo
+reutiliza sin volver a parsear. La versión combina EXTRACTOR_VERSION y el backend de texto
+(extractor_version): cambiar EXTRACTOR_VERSION invalida lo anterior. El total se acota a
+EXTRACTION_CACHE_MAX_MB desalojando lo menos usado recientemente.
+
+Formato del payload (EXTRACTION_STORAGE_FORMAT): "msgpack-zstd" (ormsgpack + zstandard, con
+una cabecera de formato y versión) o "json-zlib" (JSON comprimido con zlib, sin cabecera: el de
+las entradas anteriores). decode_pages reconoce los dos, así que cambiar el formato no invalida
+lo guardado.
+"""
+import json
+import zlib
+from typing import Any, Dict, List, Optional
+
+import ormsgpack
+import zstandard
+from fastapi.concurrency import run_in_threadpool
+from app.config.settings import settings
+from app.repositories import document_repo, extraction_cache_repo
+from app.services.extraction_store import clear_extraction, load_pages, persist_pages
+from app.services.pdf_processing import EXTRACTOR_VERSION, TEXT_BACKENDS, extractor_version, resolve_text_backend
+from app.utils.uow import UnitOfWork
+
+# Contadores de este proceso (API o worker); los aciertos por entrada quedan en extraction_cache.hits
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+STORAGE_FORMATS = ("msgpack-zstd", "json-zlib")
+# Cabecera de los payloads con formato: magia + versión del formato. Un stream zlib empieza por 0x78 ("x")
+_MSGPACK_ZSTD_HEADER = b"DFX\x01"
+
+
+def _encode_json_zlib(pages: List[Dict[str, Any]]) -> bytes:
+    """Mismo JSON que json.dumps(pages), comprimido página a página: el documento serializado entero no llega a estar en memoria."""
+    compressor = zlib.compressobj(6)
+    chunks = []
+    for i, page in enumerate(pages):
+        text = ("[" if i == 0 else ",") + json.dumps(page, ensure_ascii=False, separators=(",", ":"))
+        chunks.append(compressor.compress(text.encode("utf-8")))
+    chunks.append(compressor.compress(b"]" if pages else b"[]"))
+    chunks.append(compressor.flush())
+    return b"".join(chunks)
+
+
+def _msgpack_array_header(length: int) -> bytes:
+    if length < 16:
+        return bytes([0x90 | length])
+    if length < 2 ** 16:
+        return b"\xdc" + length.to_bytes(2, "big")
+    return b"\xdd" + length.to_bytes(4, "big")
+
+
+def _encode_msgpack_zstd(pages: List[Dict[str, Any]], level: int) -> bytes:
+    """Un array msgpack de páginas, empaquetado y comprimido página a página (igual que el JSON)."""
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    chunks = [_MSGPACK_ZSTD_HEADER, compressor.compress(_msgpack_array_header(len(pages)))]
+    for page in pages:
+        chunks.append(compressor.compress(ormsgpack.packb(page)))
+    chunks.append(compressor.flush())
+    return b"".join(chunks)
+
+
+def encode_pages(pages: List[Dict[str, Any]], storage_format: Optional[str] = None) -> bytes:
+    """Payload de las páginas en `storage_format` (por defecto EXTRACTION_STORAGE_FORMAT)."""
+    storage_format = storage_format or settings.extraction_storage_format
+    if storage_format == "msgpack-zstd":
+        return _encode_msgpack_zstd(pages, settings.extraction_zstd_level)
+    return _encode_json_zlib(pages)
+
+
+def payload_format(payload: bytes) -> str:
+    return "msgpack-zstd" if payload.startswith(_MSGPACK_ZSTD_HEADER) else "json-zlib"
+
+
+def decode_pages(payload: bytes) -> List[Dict[str, Any]]:
+    if payload_format(payload) == "msgpack-zstd":
+        # Comprimido por fragmentos: el frame no lleva el tamaño, hay que descomprimir en streaming
+        packed = zstandard.ZstdDecompressor().decompressobj().decompress(payload[len(_MSGPACK_ZSTD_HEADER):])
+        return ormsgpack.unpackb(packed)
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+def _max_bytes() -> int:
+    return settings.extraction_cache_max_mb * 1024 * 1024
+
+
+async def lookup(uow: UnitOfWork, content_hash: Optional[str], text_backend: str = "pdfplumber") -> Optional[List[Dict[str, Any]]]:
+    """Páginas en caché para ese contenido y la versión actual del extractor, o None."""
+    if not settings.extraction_cache_enabled or not content_hash:
+        return None
+    version = extractor_version(text_backend)
+    entry = await extraction_cache_repo.get_entry(uow, content_hash, version)
+    if entry is None:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    await extraction_cache_repo.touch(uow, content_hash, version)
+    return await run_in_threadpool(decode_pages, bytes(entry["payload"]))
+
+
+async def store(uow: UnitOfWork, content_hash: Optional[str], pages: List[Dict[str, Any]], text_backend: str = "pdfplumber") -> bool:
+    """Guarda el resultado y desaloja lo que sobre. No hace commit. False si no se guardó."""
+    if not settings.extraction_cache_enabled or not content_hash:
+        return False
+    payload = await run_in_threadpool(encode_pages, pages)
+    if len(payload) > _max_bytes():
+        return False
+    await extraction_cache_repo.put_entry(uow, content_hash, extractor_version(text_backend), len(pages), payload)
+    evicted = await extraction_cache_repo.delete_other_versions(uow, [extractor_version(b) for b in TEXT_BACKENDS])
+    evicted += await extraction_cache_repo.evict_lru(uow, _max_bytes())
+    _stats["stores"] += 1
+    _stats["evictions"] += evicted
+    return True
+
+
+async def apply_cached(uow: UnitOfWork, document: Dict[str, Any]) -> bool:
+    """
+    Si el contenido del documento está en caché, reemplaza su extracción por la cacheada y lo
+    marca procesado sin parsear el PDF. No hace commit. True si hubo acierto.
+    """
+    text_backend = resolve_text_backend(document.get("document_type"))
+    pages = await lookup(uow, document.get("content_hash"), text_backend)
+    if pages is None:
+        return False
+    await clear_extraction(uow, document["id"])
+    await persist_pages(uow, document["id"], document["department_id"], pages, version=extractor_version(text_backend))
+    await document_repo.set_page_count(uow, document["id"], len(pages))
+    await document_repo.set_extracted_pages(uow, document["id"], len(pages))
+    await document_repo.mark_processed(uow, document["id"])
+    return True
+
+
+async def store_document(uow: UnitOfWork, document: Dict[str, Any]) -> bool:
+    """Cachea la extracción ya guardada del documento (leída de las tablas normalizadas)."""
+    if not settings.extraction_cache_enabled or not document.get("content_hash"):
+        return False
+    return await store(uow, document["content_hash"], await load_pages(uow, document["id"]), resolve_text_backend(document.get("document_type")))
+
+
+def cache_stats() -> dict:
+    return {"extractor_version": EXTRACTOR_VERSION, "storage_format": settings.extraction_storage_format, "max_bytes": _max_bytes(), **_stats}
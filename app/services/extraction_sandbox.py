@@ -0,0 +1,182 @@
+"""
+Procesos aislados para extraer PDFs. Un PDF malformado o enorme puede dejar a pdfplumber
+girando minutos o creciendo hasta gigas: cada extracción corre en un pool de procesos propio
+(ExtractionSandbox) con límite de tiempo total (PDF_SANDBOX_TIMEOUT_SECONDS), de memoria
+residente (PDF_SANDBOX_MAX_RSS_MB, vigilada desde el proceso padre) y, opcionalmente, de
+espacio de direcciones (PDF_SANDBOX_MAX_ADDRESS_SPACE_MB, RLIMIT_AS en cada hijo). Al pasarse
+se matan los procesos del sandbox y se lanza ExtractionLimitExceeded con el motivo; el límite
+de páginas (PDF_MAX_PAGES) lo comprueba stream_extraction.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Dict, List, Optional, TypeVar
+
+import psutil
+
+from app.config.settings import settings
+
+logger = logging.getLogger("docsflow.sandbox")
+
+T = TypeVar("T")
+
+_POLL_SECONDS = 0.5
+
+
+class ExtractionLimitExceeded(Exception):
+    """La extracción superó un límite del sandbox (tiempo, memoria o páginas). No se reintenta."""
+
+
+def _init_child(max_address_space_mb: int, pids: multiprocessing.SimpleQueue) -> None:
+    # Ctrl+C llega a todo el grupo de procesos: el apagado lo coordina el proceso principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # El sandbox vigila sus procesos por pid (ProcessPoolExecutor no los expone)
+    pids.put(os.getpid())
+    if max_address_space_mb:
+        import resource
+        limit = max_address_space_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """
+    forkserver: los procesos nacen de un servidor de un solo hilo que ya importó la extracción
+    (arrancan en milisegundos, no reimportan pdfplumber como con spawn) y, a diferencia de fork,
+    es seguro desde la API con hilos y admite max_tasks_per_child.
+    """
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["app.services.pdf_processing"])
+    return context
+
+
+class ExtractionSandbox:
+    """
+    Pool de procesos para las extracciones de un job a la vez (el worker tiene uno por unidad de
+    concurrencia y la API uno por petición de tablas diferidas, así que matar uno no afecta a los
+    demás). Se recicla, con procesos nuevos, cada `max_documents` documentos
+    (WORKER_RECYCLE_AFTER_DOCUMENTS) y tras cada límite superado.
+    """
+
+    def __init__(self, max_workers: int = 1, max_documents: Optional[int] = None):
+        self.max_workers = max_workers
+        self.max_documents = max_documents
+        self.documents = 0
+        self._context = _mp_context()
+        self._pid_queue = self._context.SimpleQueue()
+        self._pool_processes: Dict[int, psutil.Process] = {}
+        self.executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self._context,
+            initializer=_init_child,
+            initargs=(settings.pdf_sandbox_max_address_space_mb, self._pid_queue),
+            max_tasks_per_child=settings.worker_max_tasks_per_child or None,
+        )
+
+    def _processes(self) -> List[psutil.Process]:
+        """Procesos del sandbox (los que registró _init_child al arrancar) y sus descendientes."""
+        while not self._pid_queue.empty():
+            pid = self._pid_queue.get()
+            try:
+                self._pool_processes[pid] = psutil.Process(pid)
+            except psutil.NoSuchProcess:
+                pass
+        found = []
+        for pid, process in list(self._pool_processes.items()):
+            # is_running compara además la hora de creación: un pid reutilizado no cuenta
+            if not process.is_running():
+                del self._pool_processes[pid]
+                continue
+            found.append(process)
+            try:
+                found.extend(process.children(recursive=True))
+            except psutil.NoSuchProcess:
+                pass
+        return found
+
+    def rss_mb(self) -> float:
+        total = 0
+        for process in self._processes():
+            try:
+                total += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total / (1024 * 1024)
+
+    def recycle(self, kill: bool = False, executor: Optional[ProcessPoolExecutor] = None) -> None:
+        """
+        Reemplaza el pool por uno nuevo; con `kill`, mata antes los procesos (y sus hijos). Sin
+        `kill`, lo que esté en curso termina en los procesos viejos. Con `executor`, solo si ese
+        sigue siendo el pool actual (otra extracción concurrente pudo reciclarlo ya).
+        """
+        if executor is not None and executor is not self.executor:
+            return
+        if kill:
+            for process in self._processes():
+                try:
+                    process.kill()
+                except psutil.NoSuchProcess:
+                    pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._new_executor()
+        self.documents = 0
+
+    def _limit_reason(self, started: float, timeout: float) -> Optional[str]:
+        if timeout and time.monotonic() - started > timeout:
+            return f"superó el tiempo máximo de extracción ({timeout:g}s)"
+        if settings.pdf_sandbox_max_rss_mb:
+            rss = self.rss_mb()
+            if rss > settings.pdf_sandbox_max_rss_mb:
+                return f"superó el límite de memoria ({rss:.0f} MB > {settings.pdf_sandbox_max_rss_mb} MB)"
+        return None
+
+    async def run(self, work: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        Espera `work` (una extracción que usa self.executor) vigilando tiempo y memoria. Si se
+        pasa de algún límite, o un proceso muere (p. ej. por RLIMIT_AS), cancela `work`, recicla
+        el pool y lanza ExtractionLimitExceeded. Cuenta un documento al terminar.
+        """
+        timeout = settings.pdf_sandbox_timeout_seconds if timeout is None else timeout
+        executor = self.executor
+        task = asyncio.ensure_future(work)
+        started = time.monotonic()
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=_POLL_SECONDS)
+                if done:
+                    break
+                reason = self._limit_reason(started, timeout)
+                if reason is not None:
+                    self.recycle(kill=True, executor=executor)
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    raise ExtractionLimitExceeded(f"Extracción cancelada: {reason}")
+            try:
+                return task.result()
+            except MemoryError:
+                self.recycle(kill=True, executor=executor)
+                raise ExtractionLimitExceeded("Extracción cancelada: superó el límite de espacio de direcciones "
+                                              f"({settings.pdf_sandbox_max_address_space_mb} MB)")
+            except BrokenProcessPool:
+                self.recycle(kill=True, executor=executor)
+                raise ExtractionLimitExceeded("Extracción cancelada: el proceso de extracción terminó de forma abrupta "
+                                              "(posible límite de memoria)")
+        except asyncio.CancelledError:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+        finally:
+            self.documents += 1
+            if self.max_documents and self.documents >= self.max_documents:
+                logger.info("sandbox: reciclando procesos tras %s documentos", self.documents)
+                self.recycle(executor=executor)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,285 @@
+import asyncio
+from collections import defaultdict
+from contextlib import aclosing, asynccontextmanager
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.config.settings import settings
+from app.repositories import document_repo, page_repo, table_repo
+from app.services.cell_index import build_postings
+from app.services.extraction_sandbox import ExtractionLimitExceeded, ExtractionSandbox
+from app.services import progress_events
+from app.services.pdf_processing import batch_chunks, extract_page_range, extract_page_tables, extractor_version, page_fingerprints, page_workers_for, pdf_page_count, resolve_text_backend
+from app.utils.uow import UnitOfWork
+
+_lazy_slots: Optional[asyncio.Semaphore] = None
+
+
+async def _persist_tables(uow: UnitOfWork, document_id: int, department_id: int, tables: List[Dict[str, Any]], first_table_index: int) -> None:
+    await table_repo.insert_tables(uow, document_id, tables, first_index=first_table_index)
+    postings = await run_in_threadpool(build_postings, tables, first_table_index)
+    await table_repo.insert_postings(uow, document_id, department_id, postings)
+
+
+async def persist_pages(uow: UnitOfWork, document_id: int, department_id: int, pages: List[Dict[str, Any]], first_table_index: int = 0, tables_extracted: bool = True, version: Optional[str] = None) -> int:
+    """
+    Guarda páginas de extract_pdf_content / iter_pages en formato normalizado: una fila por
+    tabla, una por celda, el texto de cada página (con su huella, el error si lo hubo y la
+    versión del extractor `version`) y el índice invertido de celdas, con INSERTs multi-fila
+    en la transacción del `uow`. Las tablas se numeran desde `first_table_index`; con
+    `tables_extracted=False` (solo texto) las páginas quedan para la extracción diferida.
+    Devuelve cuántas tablas guardó. No hace commit.
+    """
+    tables = [tbl for p in pages for tbl in p.get("tables") or []]
+    rows = [(p["page"], "\n".join(p.get("text_blocks") or []), p.get("fingerprint"), p.get("error")) for p in pages]
+    await page_repo.insert_pages(uow, document_id, rows, tables_extracted=tables_extracted, extractor_version=version)
+    await _persist_tables(uow, document_id, department_id, tables, first_table_index)
+    return len(tables)
+
+
+async def persist_extraction(uow: UnitOfWork, document_id: int, department_id: int, content: Dict[str, Any]) -> None:
+    """Documento completo en una transacción; quien llama confirma una vez por documento."""
+    await persist_pages(uow, document_id, department_id, content.get("pages", []))
+    await document_repo.set_extracted_pages(uow, document_id, len(content.get("pages", [])))
+
+
+async def load_pages(uow: UnitOfWork, document_id: int) -> List[Dict[str, Any]]:
+    """
+    Páginas guardadas con la forma de iter_pages (texto, huella y tablas por página). Volver a
+    guardarlas con persist_pages produce las mismas filas.
+    """
+    tables_by_page: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for t in await table_repo.get_tables(uow, document_id):
+        tables_by_page[t["page"]].append({k: t[k] for k in ("page", "headers", "rows", "column_types", "values")})
+    states = await page_repo.list_page_states(uow, document_id)
+    pages = []
+    for p in await page_repo.list_pages(uow, document_id):
+        state = states[p["page"]]
+        page = {"page": p["page"], "fingerprint": state["fingerprint"], "text_blocks": [p["text"]] if p["text"] else [], "tables": tables_by_page.get(p["page"], [])}
+        if state["extraction_error"] is not None:
+            page["error"] = state["extraction_error"]
+        pages.append(page)
+    return pages
+
+
+async def clear_extraction(uow: UnitOfWork, document_id: int) -> None:
+    await table_repo.delete_by_document(uow, document_id)
+    await page_repo.delete_by_document(uow, document_id)
+    await document_repo.set_extracted_pages(uow, document_id, 0)
+
+
+def _page_ranges(pages: List[int], batch_pages: int) -> List[Tuple[int, int]]:
+    """Rangos [first, last) (base 0) de páginas consecutivas de `pages` (base 1, en orden), de como mucho `batch_pages`."""
+    ranges: List[Tuple[int, int]] = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page - 1 and ranges[-1][1] - ranges[-1][0] < batch_pages:
+            ranges[-1] = (ranges[-1][0], page)
+        else:
+            ranges.append((page - 1, page))
+    return ranges
+
+
+def _page_outdated(state: Optional[Dict[str, Any]], fingerprint: str, version: str, tables: bool) -> bool:
+    """La página guardada no vale para esta extracción: otra huella o versión, un error o le faltan las tablas."""
+    return (
+        state is None
+        or state["fingerprint"] != fingerprint
+        or state["extractor_version"] != version
+        or state["extraction_error"] is not None
+        or (tables and not state["tables_extracted"])
+    )
+
+
+async def iter_page_batches(executor: Optional[Executor], file_path: str, ranges: List[Tuple[int, int]], page_count: int, workers: int = 1, tables: bool = True, text_backend: str = "pdfplumber") -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Lotes de páginas, uno por rango [first, last) (base 0) de `ranges`, extraídos en `executor`.
+    Con `workers` > 1 cada lote se reparte en bloques (batch_chunks) que el pool extrae a la vez,
+    así que `executor` debe tener al menos `workers` procesos; el resultado es el mismo que el
+    secuencial. El lote siguiente se extrae mientras quien consume guarda el actual: como mucho
+    dos en memoria.
+    """
+    loop = asyncio.get_running_loop()
+
+    def submit(first: int, last: int) -> List[asyncio.Future]:
+        return [
+            loop.run_in_executor(executor, extract_page_range, file_path, start, stop, 1, tables, text_backend, page_count)
+            for start, stop in batch_chunks(first, last, workers)
+        ]
+
+    current: List[asyncio.Future] = []
+    pending = submit(*ranges[0]) if ranges else []
+    try:
+        for i in range(len(ranges)):
+            current, pending = pending, submit(*ranges[i + 1]) if i + 1 < len(ranges) else []
+            pages: List[Dict[str, Any]] = []
+            for future in current:
+                pages.extend(await future)
+            yield pages
+    finally:
+        for future in current + pending:
+            future.cancel()
+
+
+async def stream_extraction(
+    uow: UnitOfWork,
+    document: Dict[str, Any],
+    executor: Optional[Executor] = None,
+    workers: Optional[int] = None,
+    batch_pages: Optional[int] = None,
+    on_batch: Optional[Callable[[UnitOfWork, int, int], Awaitable[None]]] = None,
+    tables: bool = True,
+) -> int:
+    """
+    Extrae y guarda el documento por lotes de PDF_CHECKPOINT_PAGES páginas, confirmando cada
+    lote junto con el checkpoint `documents.extracted_pages`. Si se interrumpe, la siguiente
+    llamada retoma desde la página siguiente al checkpoint. `on_batch(uow, extracted_pages,
+    page_count)` corre dentro de la transacción de cada lote; tras confirmarlo se publica el
+    progreso (progress_events). Con `tables=False` solo guarda el texto (modo text_first). El backend de texto sale del tipo de documento
+    (resolve_text_backend). Devuelve las páginas del documento; con más de PDF_MAX_PAGES lanza
+    ExtractionLimitExceeded sin extraer nada.
+
+    Si hay que extraer al menos PDF_PARALLEL_MIN_PAGES páginas, cada lote se reparte entre
+    `workers` procesos de `executor` (page_workers_for); la decisión es una por documento.
+
+    Sin checkpoint pero con páginas ya guardadas (reprocesar un documento procesado) y
+    PDF_INCREMENTAL_REPROCESSING, solo vuelve a extraer las páginas cuya huella o versión del
+    extractor cambió, las que fallaron y, con tablas, las que no las tienen; el resto se
+    conserva. Cada lote reemplaza sus páginas, así que si se interrumpe la siguiente llamada
+    solo rehace lo que siga desactualizado. El checkpoint se fija al final.
+    Libera la conexión mientras extrae; no marca el documento como procesado.
+    """
+    loop = asyncio.get_running_loop()
+    document_id = document["id"]
+    page_count = await loop.run_in_executor(executor, pdf_page_count, document["filepath"])
+    if settings.pdf_max_pages and page_count > settings.pdf_max_pages:
+        raise ExtractionLimitExceeded(f"El PDF tiene {page_count} páginas; el máximo es {settings.pdf_max_pages} (PDF_MAX_PAGES)")
+    text_backend = resolve_text_backend(document.get("document_type"))
+    version = extractor_version(text_backend)
+    batch_pages = batch_pages or settings.pdf_checkpoint_pages
+    start = document.get("extracted_pages") or 0
+    stored: Dict[int, Dict[str, Any]] = {}
+    if start == 0 or start > page_count:
+        start = 0
+        if settings.pdf_incremental_reprocessing:
+            stored = await page_repo.list_page_states(uow, document_id)
+        if stored:
+            # Páginas que ya no existen en el PDF
+            removed = [page for page in stored if page > page_count]
+            await table_repo.delete_by_pages(uow, document_id, removed)
+            await page_repo.delete_pages(uow, document_id, removed)
+        else:
+            # Sin checkpoint válido: se descartan restos de un intento anterior
+            await clear_extraction(uow, document_id)
+    next_table = await table_repo.next_table_index(uow, document_id)
+    await document_repo.set_page_count(uow, document_id, page_count)
+    await uow.commit()
+    await uow.release()
+    if stored:
+        fingerprints = await loop.run_in_executor(executor, page_fingerprints, document["filepath"])
+        outdated = [page for page, fingerprint in enumerate(fingerprints, start=1) if _page_outdated(stored.get(page), fingerprint, version, tables)]
+        ranges = _page_ranges(outdated, batch_pages)
+        done = page_count - len(outdated)
+    else:
+        ranges = [(first, min(first + batch_pages, page_count)) for first in range(start, page_count, batch_pages)]
+        done = start
+    workers = page_workers_for(sum(last - first for first, last in ranges), workers)
+    tables_found = 0
+    batches = iter_page_batches(executor, document["filepath"], ranges, page_count, workers, tables, text_backend)
+    async with aclosing(batches):
+        async for pages in batches:
+            if stored:
+                numbers = [p["page"] for p in pages]
+                await table_repo.delete_by_pages(uow, document_id, numbers)
+                await page_repo.delete_pages(uow, document_id, numbers)
+            else:
+                await document_repo.set_extracted_pages(uow, document_id, pages[-1]["page"])
+            saved = await persist_pages(uow, document_id, document["department_id"], pages, next_table, tables_extracted=tables, version=version)
+            next_table += saved
+            if on_batch is not None:
+                await on_batch(uow, pages[-1]["page"], page_count)
+            await uow.commit()
+            await uow.release()
+            done += len(pages)
+            tables_found += saved
+            progress_events.publish_progress(document, "pages", done, page_count, tables_found)
+    if stored:
+        await document_repo.set_extracted_pages(uow, document_id, page_count)
+        await uow.commit()
+    return page_count
+
+
+@asynccontextmanager
+async def lazy_tables_sandbox() -> AsyncIterator[ExtractionSandbox]:
+    """
+    Sandbox propio de una petición de extracción diferida de tablas: si su PDF supera un límite
+    solo se matan sus procesos, no los de otras peticiones en curso. Como mucho
+    PDF_LAZY_TABLES_WORKERS peticiones extraen a la vez; las demás esperan turno, así que quien
+    llama comprueba antes que haya páginas pendientes y suelta su conexión.
+    """
+    global _lazy_slots
+    if _lazy_slots is None:
+        _lazy_slots = asyncio.Semaphore(max(1, settings.pdf_lazy_tables_workers))
+    async with _lazy_slots:
+        sandbox = ExtractionSandbox()
+        try:
+            yield sandbox
+        finally:
+            sandbox.shutdown()
+
+
+async def persist_page_tables(uow: UnitOfWork, document: Dict[str, Any], page: int, tables: List[Dict[str, Any]]) -> bool:
+    """
+    Guarda las tablas extraídas en diferido de una página, numeradas a continuación de las
+    ya guardadas. False si otra extracción concurrente ya guardó esa página. No hace commit.
+    """
+    if not await page_repo.claim_page_tables(uow, document["id"], page):
+        return False
+    # Serializa la numeración entre extracciones concurrentes de otras páginas del documento
+    await document_repo.lock_document(uow, document["id"])
+    first_index = await table_repo.next_table_index(uow, document["id"])
+    await _persist_tables(uow, document["id"], document["department_id"], tables, first_index)
+    return True
+
+
+async def extract_pending_tables(
+    uow: UnitOfWork,
+    document: Dict[str, Any],
+    page_from: Optional[int] = None,
+    page_to: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    on_batch: Optional[Callable[[UnitOfWork], Awaitable[None]]] = None,
+) -> int:
+    """
+    Extrae y guarda las tablas de las páginas del rango que aún no las tienen (modo
+    text_first), por lotes de PDF_CHECKPOINT_PAGES confirmados uno a uno (publicando el
+    progreso de cada uno), hasta `max_pages` páginas. Extrae en `executor`, el pool del sandbox
+    de quien llama (lazy_tables_sandbox en la API). Si extract_tables falla en una página,
+    el error queda en `document_pages.extraction_error` y la página sigue pendiente para el
+    siguiente intento (esta pasada no vuelve a ella). Devuelve cuántas páginas del rango
+    siguen pendientes.
+    """
+    loop = asyncio.get_running_loop()
+    done = tables_found = 0
+    next_page = page_from
+    while max_pages is None or done < max_pages:
+        limit = settings.pdf_checkpoint_pages if max_pages is None else min(settings.pdf_checkpoint_pages, max_pages - done)
+        pages = await page_repo.list_pending_table_pages(uow, document["id"], next_page, page_to, limit)
+        if not pages:
+            break
+        await uow.release()
+        tables_by_page = await loop.run_in_executor(executor, extract_page_tables, document["filepath"], pages)
+        for page in pages:
+            tables, error = tables_by_page[page]
+            if error is not None:
+                await page_repo.set_page_error(uow, document["id"], page, error)
+            elif await persist_page_tables(uow, document, page, tables):
+                tables_found += len(tables)
+        # Las páginas con error siguen pendientes: la pasada sigue por las siguientes
+        next_page = pages[-1] + 1
+        if on_batch is not None:
+            await on_batch(uow)
+        await uow.commit()
+        done += len(pages)
+        progress_events.publish_progress(document, "tables", done, None, tables_found)
+    return await page_repo.count_pending_table_pages(uow, document["id"], page_from, page_to)
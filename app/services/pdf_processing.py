@@ -1,58 +1,320 @@
-import pdfplumber
-from typing import Dict, Any, List
+import hashlib
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import pdfplumber
+from pdfminer.pdftypes import resolve1
+from pdfplumber.utils import filter_edges
+
+from app.config.settings import settings
+from app.services.table_normalization import normalize_table
+
+# Subir al cambiar la lógica de extracción o normalización: invalida la caché por contenido
+EXTRACTOR_VERSION = "3"
+
+
+# Clasificación previa de cada página (ver triage_page)
+TRIAGE_TABLE = "likely_table"
+TRIAGE_TEXT = "text_only"
+TRIAGE_IMAGE = "image_only"
+
+# Segundos acumulados por etapa en este proceso (ver stage_timings)
+_stage_seconds: Dict[str, float] = {"text": 0.0, "triage": 0.0, "tables": 0.0, "normalization": 0.0}
+
+
+def stage_timings(reset: bool = False) -> Dict[str, float]:
+    """
+    Segundos por etapa de las extracciones hechas en este proceso: text (con pdfplumber incluye
+    parsear la página), triage, tables (extract_tables) y normalization. Lo que extraen los
+    procesos del pool por páginas se acumula en cada proceso, no aquí.
+    """
+    timings = dict(_stage_seconds)
+    if reset:
+        for stage in _stage_seconds:
+            _stage_seconds[stage] = 0.0
+    return timings
+
+
+def triage_page(page) -> str:
+    """
+    Clasifica la página por su geometría, sin buscar tablas. extract_tables usa la estrategia
+    "lines" de pdfplumber: una celda necesita al menos dos bordes horizontales y dos verticales
+    (líneas, lados de rectángulos o curvas), así que sin ellos no puede devolver ninguna tabla
+    y saltarla no pierde nada. Las palabras alineadas en columnas sin bordes no forman tablas
+    con esa estrategia.
+    """
+    edges = page.edges
+    if len(filter_edges(edges, "h")) >= 2 and len(filter_edges(edges, "v")) >= 2:
+        return TRIAGE_TABLE
+    if not page.chars and page.images:
+        return TRIAGE_IMAGE
+    return TRIAGE_TEXT
+
+
+def page_fingerprint(page) -> str:
+    """
+    SHA-256 de los content streams de la página tal como están en el archivo (sin decodificar:
+    decodificarlos costaría más que extraer el texto con pypdfium2), su tamaño y su rotación.
+    Cambia si cambia lo que se dibuja en la página; los recursos a los que apuntan (imágenes,
+    fuentes) no entran. Hay que calcularla antes de extraer el texto: pdfminer descarta los
+    bytes originales al decodificar (si otra página ya decodificó un stream compartido, se usa
+    el contenido decodificado y, como mucho, la página se vuelve a extraer sin necesidad).
+    """
+    digest = hashlib.sha256(repr((page.page_obj.mediabox, page.page_obj.rotate)).encode())
+    for ref in page.page_obj.contents:
+        stream = resolve1(ref)
+        digest.update(stream.rawdata if stream.rawdata is not None else stream.get_data())
+    return digest.hexdigest()
+
+
+def _extract_tables(page, page_number: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Tablas normalizadas y, si extract_tables falló, el error (la página queda sin tablas)."""
+    started = time.perf_counter()
+    error = None
+    try:
+        raw_tables = page.extract_tables() or []
+    except Exception as e:
+        raw_tables, error = [], f"{type(e).__name__}: {e}"[:500]
+    extracted = time.perf_counter()
+    tables = [normalize_table(tbl, page_number) for tbl in raw_tables]
+    _stage_seconds["tables"] += extracted - started
+    _stage_seconds["normalization"] += time.perf_counter() - extracted
+    return tables, error
+
+
+def _page_tables(page, page_number: int) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
+    """Tablas de la página, solo si la clasificación previa dice que puede tenerlas (PDF_TABLE_TRIAGE)."""
+    if not settings.pdf_table_triage:
+        return (TRIAGE_TABLE, *_extract_tables(page, page_number))
+    started = time.perf_counter()
+    triage = triage_page(page)
+    _stage_seconds["triage"] += time.perf_counter() - started
+    if triage != TRIAGE_TABLE:
+        return triage, [], None
+    return (triage, *_extract_tables(page, page_number))
+
+
+class PdfplumberText:
+    """Texto con el análisis de layout de pdfplumber (Python puro): el backend por defecto."""
+
+    def __init__(self, file_path: str):
+        pass
+
+    def page_text(self, index: int, page) -> str:
+        return page.extract_text() or ""
+
+    def close(self) -> None:
+        pass
+
+
+class PdfiumText:
+    """
+    Texto nativo de PDFium (pypdfium2, dependencia de pdfplumber): muchas veces más rápido.
+    Sin tablas, de pdfplumber solo se usa la huella de la página. PDFium no es thread-safe:
+    se usa dentro de los procesos del pool, no en hilos.
+    """
+
+    def __init__(self, file_path: str):
+        import pypdfium2
+        self.pdf = pypdfium2.PdfDocument(file_path)
+
+    def page_text(self, index: int, page) -> str:
+        pdf_page = self.pdf[index]
+        textpage = pdf_page.get_textpage()
+        try:
+            return textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n")
+        finally:
+            textpage.close()
+            pdf_page.close()
+
+    def close(self) -> None:
+        self.pdf.close()
+
+
+# Backends de texto; las tablas siempre las detecta pdfplumber
+TEXT_BACKENDS = {"pdfplumber": PdfplumberText, "pypdfium2": PdfiumText}
+
+
+def resolve_text_backend(document_type: Optional[str] = None) -> str:
+    """Backend de texto del tipo de documento (PDF_TEXT_BACKEND_BY_TYPE) o PDF_TEXT_BACKEND."""
+    return settings.pdf_text_backend_by_type.get(document_type or "", settings.pdf_text_backend)
 
 
-def _normalize_cell(value: Any) -> str:
-    if value is None:
-        return ""
-    if isinstance(value, (int, float)):
-        return str(value)
-    return str(value).strip()
+def extractor_version(text_backend: str = "pdfplumber") -> str:
+    """Versión para la caché por contenido: el texto depende del backend."""
+    return EXTRACTOR_VERSION if text_backend == "pdfplumber" else f"{EXTRACTOR_VERSION}+{text_backend}"
 
 
-def _detect_headers(rows: List[List[str]]) -> Dict[str, Any]:
+def _extract_page(page, page_number: int, fingerprint: str, text: str, tables: bool = True) -> Dict[str, Any]:
     """
-    Heurística simple: si la primera fila tiene todas las celdas no vacías y al menos 2 columnas,
-    se considera header y se devuelve como nombres de columnas.
+    Texto ya extraído y, si `tables`, tablas de la página (extract_tables es lo más costoso).
+    `triage` registra la clasificación previa; con `tables=False` no se calcula. `fingerprint`
+    (page_fingerprint) permite reprocesar solo las páginas que cambian; `error`, solo presente
+    si extract_tables falló, hace que la página se vuelva a extraer al reprocesar.
     """
-    if not rows:
-        return {"headers": None, "body": rows}
-    first = rows[0]
-    non_empty = sum(1 for c in first if c and c.strip())
-    if non_empty >= max(2, int(len(first) * 0.6)):
-        headers = [c.strip() if c else f"col_{i}" for i, c in enumerate(first)]
-        body = rows[1:]
-        return {"headers": headers, "body": body}
-    return {"headers": None, "body": rows}
+    page_entry: Dict[str, Any] = {"page": page_number, "fingerprint": fingerprint, "text_blocks": [], "tables": []}
+    if text.strip():
+        page_entry["text_blocks"].append(text)
+    if tables:
+        page_entry["triage"], page_entry["tables"], error = _page_tables(page, page_number)
+        if error is not None:
+            page_entry["error"] = error
+    return page_entry
 
 
-def extract_pdf_content(file_path: str) -> Dict[str, Any]:
+def release_page(pdf, page) -> None:
+    """
+    Libera lo que queda en memoria de una página ya extraída: la caché de objetos de la página y,
+    con PDF_MEMORY_BOUNDED, los objetos que pdfminer guarda del documento hasta cerrarlo (las
+    imágenes de un escaneado incluidas), así la memoria no crece con el número de páginas.
+    """
+    page.close()
+    if settings.pdf_memory_bounded:
+        # pdfminer vuelve a parsear bajo demanda lo que se necesite (las fuentes tienen su propia caché).
+        # Son cachés privadas de PDFDocument (versión fijada en requirements.txt): si una versión
+        # las renombra, la extracción sigue funcionando y scripts/check_extraction.py detecta que
+        # la memoria vuelve a crecer con las páginas
+        for cache in ("_cached_objs", "_parsed_objs"):
+            objects = getattr(pdf.doc, cache, None)
+            if objects is not None:
+                objects.clear()
+
+
+def _iter_range(file_path: str, start: int, stop: int, tables: bool = True, text_backend: str = "pdfplumber") -> Iterator[Dict[str, Any]]:
+    """
+    Páginas [start, stop) (base 0) en este proceso. pdfplumber se abre siempre, para la huella
+    de cada página, pero sin tablas y con pypdfium2 no analiza el layout.
+    """
+    text_source = TEXT_BACKENDS[text_backend](file_path)
+    pdf = pdfplumber.open(file_path)
+    try:
+        for i in range(start, stop):
+            page = pdf.pages[i]
+            fingerprint = page_fingerprint(page)
+            started = time.perf_counter()
+            text = text_source.page_text(i, page)
+            _stage_seconds["text"] += time.perf_counter() - started
+            yield _extract_page(page, i + 1, fingerprint, text, tables)
+            release_page(pdf, page)
+    finally:
+        text_source.close()
+        pdf.close()
+
+
+def _extract_page_range(file_path: str, start: int, stop: int, tables: bool = True, text_backend: str = "pdfplumber") -> List[Dict[str, Any]]:
+    """Páginas [start, stop) (base 0). Cada proceso del pool abre el archivo por su cuenta."""
+    return list(_iter_range(file_path, start, stop, tables, text_backend))
+
+
+def extract_page_tables(file_path: str, pages: List[int]) -> Dict[int, Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """
+    Solo las tablas de las páginas pedidas (base 1), para la extracción diferida: (tablas, error)
+    por página, como _extract_tables. Con error las tablas vienen vacías y la página debe seguir pendiente.
+    """
+    result = {}
+    with pdfplumber.open(file_path) as pdf:
+        for page_number in pages:
+            page = pdf.pages[page_number - 1]
+            _, tables, error = _page_tables(page, page_number)
+            result[page_number] = (tables, error)
+            release_page(pdf, page)
+    return result
+
+
+def _page_chunks(start: int, stop: int, workers: int, chunk_pages: int) -> List[Tuple[int, int]]:
+    # Por defecto ~4 bloques por proceso: reparte mejor páginas de coste desigual
+    size = chunk_pages or max(1, math.ceil((stop - start) / (workers * 4)))
+    return [(first, min(first + size, stop)) for first in range(start, stop, size)]
+
+
+def batch_chunks(start: int, stop: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Bloques en que se reparte un lote [start, stop) del worker entre `workers` procesos: uno por
+    proceso (o de PDF_PARALLEL_CHUNK_PAGES); el lote siguiente ya ocupa los procesos que acaban antes.
+    """
+    size = settings.pdf_parallel_chunk_pages or max(1, math.ceil((stop - start) / max(1, workers)))
+    return _page_chunks(start, stop, workers, size)
+
+
+def resolve_page_workers(workers: Optional[int] = None) -> int:
+    """Procesos para extracción por páginas: argumento, PDF_PARALLEL_WORKERS o núcleos disponibles."""
+    workers = workers if workers is not None else settings.pdf_parallel_workers
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def page_workers_for(pages: int, workers: Optional[int] = None, min_pages: Optional[int] = None) -> int:
+    """Procesos con que extraer `pages` páginas de un documento: 1 (secuencial) por debajo de PDF_PARALLEL_MIN_PAGES."""
+    workers = resolve_page_workers(workers)
+    min_pages = settings.pdf_parallel_min_pages if min_pages is None else min_pages
+    return workers if workers > 1 and pages >= max(2, min_pages) else 1
+
+
+def pdf_page_count(file_path: str) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def page_fingerprints(file_path: str) -> List[str]:
+    """Huella de cada página, en orden, sin extraer texto ni tablas (ver page_fingerprint)."""
+    fingerprints = []
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages:
+            fingerprints.append(page_fingerprint(page))
+            release_page(pdf, page)
+    return fingerprints
+
+
+def iter_pages(file_path: str, start: int = 0, stop: Optional[int] = None, workers: Optional[int] = None, min_pages: Optional[int] = None, tables: bool = True, text_backend: str = "pdfplumber", page_count: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Genera el resultado de cada página de [start, stop) (base 0) en orden, sin acumular el
+    documento. Con `workers` > 1 y al menos `min_pages` páginas (PDF_PARALLEL_MIN_PAGES)
+    reparte bloques de páginas en un pool de procesos, con como mucho 2 bloques por proceso
+    en vuelo; el resultado es idéntico al de la extracción secuencial. Con `tables=False`
+    solo extrae texto; `text_backend` elige cómo (ver TEXT_BACKENDS). `page_count`, si ya se
+    conoce, evita volver a abrir el PDF para contarlas.
+    """
+    page_count = pdf_page_count(file_path) if page_count is None else page_count
+    stop = page_count if stop is None else min(stop, page_count)
+    workers = page_workers_for(stop - start, workers, min_pages)
+    if workers <= 1:
+        yield from _iter_range(file_path, start, stop, tables, text_backend)
+        return
+    chunks = iter(_page_chunks(start, stop, workers, settings.pdf_parallel_chunk_pages))
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        in_flight = deque(pool.submit(_extract_page_range, file_path, first, last, tables, text_backend) for first, last in islice(chunks, workers * 2))
+        while in_flight:
+            entries = in_flight.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                in_flight.append(pool.submit(_extract_page_range, file_path, *chunk, tables, text_backend))
+            yield from entries
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_page_range(file_path: str, start: int, stop: int, workers: Optional[int] = None, tables: bool = True, text_backend: str = "pdfplumber", page_count: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Páginas [start, stop) de un lote para persistir por bloques (ver extraction_store.iter_page_batches)."""
+    return list(iter_pages(file_path, start, stop, workers, tables=tables, text_backend=text_backend, page_count=page_count))
+
+
+def extract_pdf_content(file_path: str, workers: Optional[int] = None, min_pages: Optional[int] = None, text_backend: Optional[str] = None) -> Dict[str, Any]:
+    """Documento completo en memoria (formato legacy con la colección plana de tablas)."""
     result: Dict[str, Any] = {
         "summary": "processed",
         "generated_at": datetime.utcnow().isoformat(),
         "pages": [],
-        "tables": []  # colección plana (legacy)
+        "tables": [],  # colección plana (legacy)
+        "triage": {TRIAGE_TABLE: 0, TRIAGE_TEXT: 0, TRIAGE_IMAGE: 0},
     }
-    with pdfplumber.open(file_path) as pdf:
-        for page_index, page in enumerate(pdf.pages):
-            page_entry: Dict[str, Any] = {"page": page_index + 1, "text_blocks": [], "tables": []}
-            text = page.extract_text() or ""
-            if text.strip():
-                page_entry["text_blocks"].append(text)
-            try:
-                raw_tables = page.extract_tables() or []
-            except Exception:
-                raw_tables = []
-            for tbl in raw_tables:
-                normalized = [[_normalize_cell(cell) for cell in row] for row in tbl]
-                header_info = _detect_headers(normalized)
-                entry = {
-                    "page": page_index + 1,
-                    "headers": header_info["headers"],
-                    "rows": header_info["body"]
-                }
-                page_entry["tables"].append(entry)
-                result["tables"].append(entry)
-            result["pages"].append(page_entry)
+    for page_entry in iter_pages(file_path, workers=workers, min_pages=min_pages, text_backend=text_backend or settings.pdf_text_backend):
+        result["pages"].append(page_entry)
+        result["tables"].extend(page_entry["tables"])
+        result["triage"][page_entry["triage"]] += 1
     return result
@@ -0,0 +1,159 @@
+"""
+Eventos de procesamiento para los streams SSE (GET /documents/events y
+/documents/{id}/events): cambios de estado del documento y progreso por lotes (páginas
+extraídas de un total y tablas encontradas). Pub/sub en memoria del proceso: la extracción
+publica y cada conexión SSE recibe lo de su documento o departamento sin consultar la base.
+
+El worker es otro proceso: con PROGRESS_EVENTS_URL reenvía lo que publica, por lotes y sin
+bloquear la extracción, al endpoint de ingesta de la API (POST /documents/events/ingest con
+PROGRESS_EVENTS_TOKEN), que lo vuelve a publicar allí. Si el envío falla los eventos se
+pierden: GET /documents/{id}/status sigue siendo la fuente de verdad.
+
+Limitación: todo vive en un proceso. Con varios workers de uvicorn o varias réplicas de la API,
+cada POST de ingesta llega a uno solo y los clientes SSE conectados a los demás no reciben los
+eventos del worker (ni los que publiquen esos otros procesos). Los streams requieren servir la
+API con un único proceso; si no, los clientes deben consultar /status.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import httpx
+
+from app.config.settings import settings
+
+logger = logging.getLogger("docsflow.progress")
+
+# Eventos por petición de reenvío a la API y pendientes de reenviar como mucho
+_FORWARD_BATCH = 100
+_FORWARD_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """Cola de eventos de una conexión SSE: de un documento, de un departamento o de todos."""
+
+    def __init__(self, document_id: Optional[int] = None, department_id: Optional[int] = None):
+        self.document_id = document_id
+        self.department_id = department_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.progress_events_queue_size))
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.document_id is not None and event.get("document_id") != self.document_id:
+            return False
+        return self.department_id is None or event.get("department_id") == self.department_id
+
+    def put(self, event: Dict[str, Any]) -> None:
+        _put_latest(self.queue, event)
+
+
+def _put_latest(queue: asyncio.Queue, event: Any) -> None:
+    # Consumidor lento: se descarta el evento más antiguo; el progreso siguiente trae el acumulado
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+_subscriptions: Set[Subscription] = set()
+_forward_queue: Optional[asyncio.Queue] = None
+_forward_task: Optional[asyncio.Task] = None
+
+
+@asynccontextmanager
+async def subscribe(document_id: Optional[int] = None, department_id: Optional[int] = None) -> AsyncIterator[Subscription]:
+    subscription = Subscription(document_id, department_id)
+    _subscriptions.add(subscription)
+    try:
+        yield subscription
+    finally:
+        _subscriptions.discard(subscription)
+
+
+def publish(event: Dict[str, Any], forward: bool = True) -> None:
+    """Entrega el evento a las suscripciones que coinciden y, si el reenvío está activo, a la API."""
+    for subscription in list(_subscriptions):
+        if subscription.matches(event):
+            subscription.put(event)
+    if forward and _forward_queue is not None:
+        _put_latest(_forward_queue, event)
+
+
+def status_event(document: Dict[str, Any], status: str, error_message: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "type": "status",
+        "document_id": document["id"],
+        "department_id": document.get("department_id"),
+        "status": status,
+        "error_message": error_message,
+        "at": datetime.utcnow().isoformat(),
+    }
+
+
+def publish_status(document: Dict[str, Any], status: str, error_message: Optional[str] = None) -> None:
+    """Cambio de estado del documento (pending, processing, processed, error, deleted); tras el commit."""
+    publish(status_event(document, status, error_message))
+
+
+def publish_progress(document: Dict[str, Any], stage: str, pages_done: int, page_count: Optional[int], tables_found: int) -> None:
+    """
+    Progreso tras confirmar un lote. `stage` "pages" (extracción, `page_count` el total) o
+    "tables" (tablas diferidas, sin total); `tables_found` cuenta las tablas guardadas en esta pasada.
+    """
+    publish({
+        "type": "progress",
+        "document_id": document["id"],
+        "department_id": document.get("department_id"),
+        "stage": stage,
+        "pages_done": pages_done,
+        "page_count": page_count,
+        "tables_found": tables_found,
+        "at": datetime.utcnow().isoformat(),
+    })
+
+
+async def _forward_loop(queue: asyncio.Queue, url: str, token: str) -> None:
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        stopping = False
+        while not stopping:
+            events: List[Dict[str, Any]] = []
+            item = await queue.get()
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                events.append(item)
+                if len(events) >= _FORWARD_BATCH or queue.empty():
+                    break
+                item = queue.get_nowait()
+            if not events:
+                continue
+            try:
+                response = await client.post(url, json={"events": events}, headers={"X-Progress-Token": token})
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.warning("no se pudieron reenviar %s eventos de progreso a %s: %s", len(events), url, e)
+
+
+def start_forwarding() -> bool:
+    """Reenvía lo publicado en este proceso a PROGRESS_EVENTS_URL (el worker). False si no está configurado."""
+    global _forward_queue, _forward_task
+    if not settings.progress_events_url or _forward_task is not None:
+        return False
+    _forward_queue = asyncio.Queue(maxsize=_FORWARD_QUEUE_SIZE)
+    _forward_task = asyncio.create_task(_forward_loop(_forward_queue, settings.progress_events_url, settings.progress_events_token))
+    return True
+
+
+async def stop_forwarding(timeout: float = 5.0) -> None:
+    """Envía lo pendiente (como mucho `timeout` segundos) y detiene el reenvío."""
+    global _forward_queue, _forward_task
+    if _forward_task is None:
+        return
+    queue, task = _forward_queue, _forward_task
+    _forward_queue, _forward_task = None, None
+    _put_latest(queue, None)
+    try:
+        await asyncio.wait_for(task, timeout)
+    except asyncio.TimeoutError:
+        logger.warning("reenvío de eventos de progreso cancelado con %s pendientes", queue.qsize())
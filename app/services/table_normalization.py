@@ -0,0 +1,205 @@
+"""
+Normalización vectorizada (NumPy) de las tablas extraídas: recorta las celdas, detecta headers e
+infiere el tipo de cada columna (integer, decimal, percent, date, text) con el valor tipado de
+cada celda junto al texto original. Cada paso opera sobre la tabla entera, no celda a celda.
+
+- decimal incluye importes con símbolo de moneda ("$4,750.00", "€ 1.234,56", "(300.00)").
+  Separadores: si aparecen "," y ".", el último es el decimal; una sola "," seguida de
+  exactamente tres dígitos es de miles; varios "." son de miles.
+- percent guarda el número del porcentaje ("10%" -> 10.0).
+- date acepta AAAA-MM-DD, AAAA/MM/DD, DD/MM/AAAA y DD-MM-AAAA (día primero) y guarda la fecha ISO.
+Una columna es de un tipo solo si todas sus celdas no vacías lo son; si no, text.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+COLUMN_TYPES = ("integer", "decimal", "percent", "date", "text")
+NUMERIC_TYPES = ("integer", "decimal", "percent")
+_CURRENCY_SYMBOLS = ("US$", "$", "€", "£", "USD", "EUR")
+# Enteros desde aquí no caben sin pérdida en DOUBLE (value_num): la columna queda como text
+_MAX_EXACT_INTEGER = 2 ** 53
+# Códigos de los caracteres que pueden aparecer en un número (0 es el relleno de _chars)
+_NUMBER_CODES = np.array(sorted({0, *map(ord, "0123456789.,+-()% \u00a0" + "".join(_CURRENCY_SYMBOLS))}), dtype=np.uint32)
+
+
+def _cell_matrix(raw_rows: Sequence[Sequence[Any]]) -> np.ndarray:
+    """Celdas como matriz de texto recortado ("" para None); las filas cortas se completan con ""."""
+    width = max((len(r) for r in raw_rows), default=0)
+    grid = np.full((len(raw_rows), width), "", dtype=object)
+    for i, row in enumerate(raw_rows):
+        grid[i, :len(row)] = row
+    grid[np.equal(grid, None)] = ""
+    return np.char.strip(grid.astype(str))
+
+
+def _chars(values: np.ndarray) -> np.ndarray:
+    """Vista (n, ancho) carácter a carácter de un vector de texto; el relleno es ""."""
+    values = np.ascontiguousarray(values, dtype=str)
+    width = values.dtype.itemsize // 4
+    return values.view("U1").reshape(values.size, width)
+
+
+def _detect_headers(cells: np.ndarray) -> Optional[np.ndarray]:
+    """La primera fila es header si tiene al menos 2 celdas (y el 60%) no vacías; las vacías pasan a col_N."""
+    first = cells[0]
+    if np.count_nonzero(first != "") < max(2, int(first.size * 0.6)):
+        return None
+    return np.where(first != "", first, np.char.add("col_", np.arange(first.size).astype(str)))
+
+
+def _replace(values: np.ndarray, old: str, new: str, where: Optional[np.ndarray] = None) -> np.ndarray:
+    """np.char.replace solo sobre las celdas que lo necesitan (el reemplazo nunca alarga el texto)."""
+    hit = np.char.find(values, old) >= 0
+    if where is not None:
+        hit &= where
+    if hit.any():
+        values = values.copy()
+        values[hit] = np.char.replace(values[hit], old, new)
+    return values
+
+
+def _parse_numbers(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """Número de cada texto y de qué clase es (máscaras); `valid` False si no es un número."""
+    # Solo se parsean las celdas con caracteres que pueden formar un número
+    codes = _chars(values).view(np.uint32)
+    candidate = np.all(np.isin(codes, _NUMBER_CODES, kind="table"), axis=1) & np.any((codes >= ord("0")) & (codes <= ord("9")), axis=1)
+    parsed = _parse_candidates(values[candidate])
+    result = {
+        "valid": np.zeros(values.shape, dtype=bool),
+        "numbers": np.zeros(values.shape, dtype=np.float64),
+        "percent": np.zeros(values.shape, dtype=bool),
+        "fraction": np.zeros(values.shape, dtype=bool),
+    }
+    for key, column in parsed.items():
+        result[key][candidate] = column
+    return result
+
+
+def _parse_candidates(values: np.ndarray) -> Dict[str, np.ndarray]:
+    percent = np.char.endswith(values, "%")
+    s = np.char.strip(np.char.rstrip(values, "%"))
+    parens = np.char.startswith(s, "(") & np.char.endswith(s, ")")
+    if parens.any():
+        s[parens] = np.char.strip(s[parens], "()")
+    currency = np.zeros(values.shape, dtype=bool)
+    for symbol in _CURRENCY_SYMBOLS:
+        currency |= np.char.find(s, symbol) >= 0
+        s = _replace(s, symbol, "")
+    s = _replace(_replace(s, " ", ""), "\u00a0", "")
+    signs = np.char.count(s, "-") + np.char.count(s, "+")
+    negative = np.char.startswith(s, "-") ^ parens
+    s = np.char.lstrip(s, "+-")
+
+    last_comma, last_dot = np.char.rfind(s, ","), np.char.rfind(s, ".")
+    n_comma, n_dot = np.char.count(s, ","), np.char.count(s, ".")
+    length = np.char.str_len(s)
+    comma_decimal = (last_comma > last_dot) & ((n_dot > 0) | ((n_comma == 1) & (length - last_comma - 1 != 3)))
+    # Quitar separadores de miles y dejar "." como decimal
+    s = _replace(s, ".", "", comma_decimal | (n_dot > 1))
+    s = _replace(s, ",", ".", comma_decimal)
+    s = _replace(s, ",", "", ~comma_decimal)
+
+    chars = _chars(s)
+    digits = (chars >= "0") & (chars <= "9")
+    dots = np.count_nonzero(chars == ".", axis=1)
+    valid = (
+        np.all(digits | (chars == ".") | (chars == ""), axis=1)
+        & np.any(digits, axis=1)
+        & (dots <= 1)
+        & (signs <= 1)
+        & ~(parens & (signs > 0))
+        # "1.2.3" no es un número con puntos de miles
+        & ~(~comma_decimal & (n_dot > 1) & (length - last_dot - 1 != 3))
+    )
+    numbers = np.zeros(values.shape, dtype=np.float64)
+    numbers[valid] = s[valid].astype(np.float64)
+    numbers[negative] *= -1
+    return {
+        "valid": valid,
+        "numbers": numbers,
+        "percent": percent,
+        "fraction": (dots > 0) | currency,
+    }
+
+
+def _parse_dates(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """Fecha ISO de cada texto con formato de fecha; `valid` False si no lo es o no existe (31/02)."""
+    chars = _chars(values)
+    if chars.shape[1] < 10:
+        return {"valid": np.zeros(values.shape, dtype=bool), "iso": np.full(values.shape, "", dtype="U10")}
+    chars = chars[:, :10]
+    # Dígitos como enteros a partir del código de cada carácter
+    codes = np.ascontiguousarray(chars).view(np.uint32).astype(np.int64) - ord("0")
+    digit = (codes >= 0) & (codes <= 9)
+    sep = (chars == "-") | (chars == "/")
+    length_ok = np.char.str_len(values) == 10
+
+    year_first = length_ok & sep[:, 4] & (chars[:, 4] == chars[:, 7]) & np.all(digit[:, [0, 1, 2, 3, 5, 6, 8, 9]], axis=1)
+    day_first = length_ok & sep[:, 2] & (chars[:, 2] == chars[:, 5]) & np.all(digit[:, [0, 1, 3, 4, 6, 7, 8, 9]], axis=1)
+
+    def number(cols: List[int]) -> np.ndarray:
+        return codes[:, cols] @ (10 ** np.arange(len(cols) - 1, -1, -1))
+
+    year = np.where(year_first, number([0, 1, 2, 3]), number([6, 7, 8, 9]))
+    month = np.where(year_first, number([5, 6]), number([3, 4]))
+    day = np.where(year_first, number([8, 9]), number([0, 1]))
+    valid = (year_first | day_first) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31) & (year >= 1)
+    # Día inexistente en el mes: al sumarlo la fecha se sale del mes
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype("datetime64[M]")
+    dates = months.astype("datetime64[D]") + np.where(valid, day - 1, 0)
+    valid &= dates.astype("datetime64[M]") == months
+    iso = np.full(values.shape, "", dtype="U10")
+    iso[valid] = np.datetime_as_string(dates[valid], unit="D")
+    return {"valid": valid, "iso": iso}
+
+
+def _infer_columns(body: np.ndarray) -> tuple:
+    """Tipo de cada columna y matriz de valores tipados (None donde no aplica)."""
+    n_rows, n_cols = body.shape
+    typed = np.full(body.shape, None, dtype=object)
+    if n_rows == 0:
+        return ["text"] * n_cols, typed
+    present = body != ""
+    flat = body.ravel()
+    nums = {k: v.reshape(body.shape) for k, v in _parse_numbers(flat).items()}
+    dates = {k: v.reshape(body.shape) for k, v in _parse_dates(flat).items()}
+
+    def all_present(mask: np.ndarray) -> np.ndarray:
+        return np.all(mask | ~present, axis=0) & np.any(present, axis=0)
+
+    is_date = all_present(dates["valid"])
+    is_number = all_present(nums["valid"])
+    is_percent = is_number & all_present(nums["percent"])
+    is_plain = is_number & all_present(~nums["percent"])
+    whole = is_plain & all_present(~nums["fraction"])
+    is_integer = whole & np.all((np.abs(nums["numbers"]) < _MAX_EXACT_INTEGER) | ~present, axis=0)
+    # Enteros demasiado grandes (cuentas, referencias) no pasan a decimal con el valor redondeado
+    is_decimal = is_plain & ~whole
+
+    types = np.select([is_date, is_integer, is_decimal, is_percent], ["date", "integer", "decimal", "percent"], "text")
+    number_cols = is_integer | is_decimal | is_percent
+    typed[:, number_cols] = np.where(present[:, number_cols], nums["numbers"][:, number_cols], None)
+    typed[:, is_integer] = np.where(present[:, is_integer], nums["numbers"][:, is_integer].astype(np.int64), None)
+    typed[:, is_date] = np.where(present[:, is_date], dates["iso"][:, is_date], None)
+    return types.tolist(), typed
+
+
+def normalize_table(raw_rows: Sequence[Sequence[Any]], page_number: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Tabla de extract_tables normalizada: {page, headers, rows, column_types, values}. `values`
+    tiene la forma de `rows`, con números (int en columnas integer), fechas ISO o None.
+    """
+    if not raw_rows:
+        return {"page": page_number, "headers": None, "rows": [], "column_types": [], "values": []}
+    cells = _cell_matrix(raw_rows)
+    headers = _detect_headers(cells)
+    body = cells[1:] if headers is not None else cells
+    types, typed = _infer_columns(body)
+    return {
+        "page": page_number,
+        "headers": headers.tolist() if headers is not None else None,
+        "rows": body.tolist(),
+        "column_types": types,
+        "values": typed.tolist(),
+    }
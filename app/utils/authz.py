@@ -12,13 +12,13 @@ def ensure_user_can_access_document(user: dict, document: dict) -> None:
         ensure_operator_can_access_document(user.get("department_id"), document.get("department_id"))
 
 
-def require_admin(current_user=Depends(get_current_user)):
+async def require_admin(current_user=Depends(get_current_user)):
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Solo administradores")
     return current_user
 
 
-def require_operator(current_user=Depends(get_current_user)):
+async def require_operator(current_user=Depends(get_current_user)):
     if current_user.get("role") != "operador":
         raise HTTPException(status_code=403, detail="Solo operadores")
     return current_user
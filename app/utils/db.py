@@ -1,18 +1,115 @@
-import mysql.connector
-from mysql.connector import Error
+import asyncio
+import time
+from contextlib import asynccontextmanager
+import aiomysql
 from app.config.settings import settings
 
-def get_db_connection():
+
+class PoolTimeout(Exception):
+    """No se obtuvo una conexión libre del pool dentro del tiempo de espera."""
+
+
+# Pool asíncrono (aiomysql) usado por los repositorios, los endpoints y el worker
+_async_pool: aiomysql.Pool | None = None
+_async_pool_lock = asyncio.Lock()
+_async_stats = {"acquired": 0, "ping_failures": 0, "timeouts": 0, "wait_seconds": 0.0}
+
+
+async def get_async_pool() -> aiomysql.Pool:
+    global _async_pool
+    if _async_pool is None:
+        async with _async_pool_lock:
+            if _async_pool is None:
+                _async_pool = await aiomysql.create_pool(
+                    host=settings.db_host,
+                    user=settings.db_user,
+                    password=settings.db_password,
+                    db=settings.db_name,
+                    port=settings.db_port,
+                    minsize=1,
+                    maxsize=settings.db_pool_size,
+                    pool_recycle=settings.db_pool_recycle_seconds,
+                    autocommit=False,
+                )
+    return _async_pool
+
+
+def _uses_sqlite() -> bool:
+    return settings.db_backend == "sqlite"
+
+
+async def init_async_pool() -> None:
+    if _uses_sqlite():
+        from app.utils import sqlite_db
+        await sqlite_db.get_pool()
+        return
+    await get_async_pool()
+
+
+async def close_async_pool() -> None:
+    global _async_pool
+    if _uses_sqlite():
+        from app.utils import sqlite_db
+        await sqlite_db.close_pool()
+        return
+    if _async_pool is not None:
+        _async_pool.close()
+        await _async_pool.wait_closed()
+        _async_pool = None
+
+
+def async_pool_stats() -> dict:
+    if _uses_sqlite():
+        from app.utils import sqlite_db
+        return {"backend": "sqlite", **sqlite_db.pool_stats()}
+    pool = _async_pool
+    if pool is None:
+        return {"size": settings.db_pool_size, "opened": 0, "idle": 0, "in_use": 0, **_async_stats}
+    return {
+        "size": pool.maxsize,
+        "opened": pool.size,
+        "idle": pool.freesize,
+        "in_use": pool.size - pool.freesize,
+        **_async_stats,
+    }
+
+
+def acquire():
+    """Conexión del backend configurado (DB_BACKEND): MySQL (aiomysql) o SQLite (aiosqlite)."""
+    if _uses_sqlite():
+        from app.utils import sqlite_db
+        return sqlite_db.acquire()
+    return _acquire_mysql()
+
+
+@asynccontextmanager
+async def _acquire_mysql():
+    """
+    Entrega una conexión aiomysql del pool y la devuelve al salir.
+    Al liberar se hace rollback: aiomysql cierra (en vez de reutilizar) las conexiones
+    que vuelven con una transacción abierta, y un SELECT ya abre una con autocommit=False.
+    """
+    pool = await get_async_pool()
+    started = time.monotonic()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), timeout=settings.db_pool_timeout_seconds)
+    except asyncio.TimeoutError:
+        _async_stats["timeouts"] += 1
+        raise PoolTimeout(f"Sin conexiones libres tras {settings.db_pool_timeout_seconds}s (tamaño {pool.maxsize})")
+    _async_stats["acquired"] += 1
+    _async_stats["wait_seconds"] += time.monotonic() - started
     try:
-        connection = mysql.connector.connect(
-            host=settings.db_host,
-            user=settings.db_user,
-            password=settings.db_password,
-            database=settings.db_name,
-            port=settings.db_port
-        )
-        if connection.is_connected():
-            return connection
-    except Error as e:
-        print(f"Error al conectar a la base de datos: {e}")
-        return None
+        if settings.db_pool_pre_ping:
+            try:
+                await conn.ping(reconnect=True)
+            except aiomysql.Error:
+                _async_stats["ping_failures"] += 1
+                raise
+        yield conn
+    finally:
+        try:
+            if not conn.closed:
+                await conn.rollback()
+        except aiomysql.Error:
+            conn.close()
+        pool.release(conn)
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from datetime import datetime
 
@@ -13,3 +14,16 @@ def build_upload_path(department_id: int, original_filename: str) -> str:
 def write_bytes(filepath: str, data: bytes) -> None:
     with open(filepath, "wb") as f:
         f.write(data)
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 del contenido: clave de la caché de extracción (app/services/extraction_cache.py)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_hash(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,88 @@
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from app.config.settings import settings
+
+TOTAL_MODES = ("exact", "approx")
+_COUNT_CACHE_MAX_ENTRIES = 1024
+_count_cache: Dict[Tuple, Tuple[float, int]] = {}
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"t": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["t"])
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """Cursor opaco con la clave de orden (p. ej. timestamp, id) de la última fila de la página."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) < 2:
+            raise ValueError("cursor")
+        return tuple(_decode_value(v) for v in values)
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def keyset_condition(cursor: Tuple[Any, ...], *columns: str) -> Tuple[str, List[Any]]:
+    """
+    Condición (y parámetros) para la página siguiente con ORDER BY <columns...> DESC;
+    la última columna suele ser el id. Se expande a ORs en lugar de (a, b) < (x, y)
+    para que MySQL lo resuelva como rango sobre el índice.
+    """
+    if len(cursor) != len(columns):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    branches = []
+    params: List[Any] = []
+    for i, column in enumerate(columns):
+        equals = [f"{c} = %s" for c in columns[:i]]
+        branches.append("(" + " AND ".join(equals + [f"{column} < %s"]) + ")")
+        params.extend(cursor[: i + 1])
+    return "(" + " OR ".join(branches) + ")", params
+
+
+def split_page(rows: List[dict], limit: int, *sort_keys: str) -> Tuple[List[dict], Optional[str]]:
+    """
+    Los repositorios se consultan con `limit + 1`: si sobra una fila hay página siguiente
+    y el cursor se construye con la última fila devuelta (claves de orden + id).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    last = items[-1]
+    return items, encode_cursor(*(last[k] for k in sort_keys), last["id"])
+
+
+async def resolve_total(mode: Optional[str], cache_key: Tuple, count: Callable[[], Awaitable[int]]) -> Optional[int]:
+    """
+    `exact`: ejecuta el COUNT(*). `approx`: reutiliza el último COUNT(*) para los mismos
+    filtros durante `count_cache_ttl_seconds`. Sin modo no se cuenta.
+    """
+    if mode is None:
+        return None
+    now = time.monotonic()
+    if mode == "approx":
+        cached = _count_cache.get(cache_key)
+        if cached and cached[0] > now:
+            return cached[1]
+    total = await count()
+    if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+        _count_cache.pop(next(iter(_count_cache)))
+    _count_cache[cache_key] = (now + settings.count_cache_ttl_seconds, total)
+    return total
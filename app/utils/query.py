@@ -1,4 +1,8 @@
-from typing import List, Tuple
+from typing import Any, List, Sequence, Tuple
+from app.config.settings import settings
+
+# Tokens del tokenizador trigram de FTS5 (backend SQLite)
+SQLITE_TRIGRAM_SIZE = 3
 
 
 def build_where(filters: List[str]) -> str:
@@ -10,3 +14,51 @@ def build_where(filters: List[str]) -> str:
 def paginate_sql(limit: int, offset: int) -> str:
     return f" ORDER BY 1 DESC LIMIT {int(limit)} OFFSET {int(offset)}"
 
+
+
+async def bulk_insert(cursor, table: str, columns: Sequence[str], rows: Sequence[Sequence[Any]], batch_size: int) -> int:
+    """
+    INSERT multi-fila (`VALUES (...), (...)`) en bloques de `batch_size` filas: un viaje
+    al servidor por bloque en lugar de uno por fila. No hace commit.
+    """
+    if not rows:
+        return 0
+    placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    size = max(1, batch_size)
+    for start in range(0, len(rows), size):
+        chunk = rows[start:start + size]
+        await cursor.execute(prefix + ", ".join([placeholder] * len(chunk)), tuple(v for row in chunk for v in row))
+    return len(rows)
+
+
+def for_update() -> str:
+    """Bloqueo de filas en SELECT (MySQL); SQLite ya serializa las escrituras con su bloqueo de base."""
+    return "" if settings.db_backend == "sqlite" else " FOR UPDATE"
+
+
+def fulltext_min_length() -> int:
+    """Longitud mínima de q para usar el índice de texto completo (más corto: solo LIKE)."""
+    return SQLITE_TRIGRAM_SIZE if settings.db_backend == "sqlite" else settings.search_ngram_token_size
+
+
+def fulltext_match(table: str, column: str) -> str:
+    """
+    Condición con un placeholder (frase entre comillas): FULLTEXT ngram en MySQL;
+    en SQLite la tabla FTS5 `<table>_fts` (tokenizador trigram) sincronizada por triggers.
+    """
+    if settings.db_backend == "sqlite":
+        return f"{table}.id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH %s)"
+    return f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE)"
+
+
+def fulltext_ranked(table: str, column: str) -> Tuple[str, str]:
+    """
+    (expresión de relevancia, FROM) para ordenar por relevancia (mayor es mejor); lleva un
+    placeholder con la frase, antes que los de WHERE. En SQLite el rank de FTS5 se obtiene
+    con una sola consulta al índice unida por rowid, no con una subconsulta por fila.
+    """
+    if settings.db_backend == "sqlite":
+        ranked = f"(SELECT rowid AS fts_id, -rank AS fts_relevance FROM {table}_fts WHERE {table}_fts MATCH %s)"
+        return "fts.fts_relevance", f"{table} JOIN {ranked} fts ON fts.fts_id = {table}.id"
+    return f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE)", table
@@ -0,0 +1,135 @@
+import json
+import logging
+import sys
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from aiomysql import DictCursor
+from app.config.settings import settings
+
+# Límites superiores (ms) de los buckets del histograma; lo que los supera cae en "+Inf"
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MAX_SQL_LENGTH = 2000
+RECENT_SLOW_QUERIES = 100
+
+logger = logging.getLogger("docsflow.slow_query")
+
+_stats: Dict[str, Dict[str, Any]] = {}
+_recent_slow: deque = deque(maxlen=RECENT_SLOW_QUERIES)
+# Módulos que solo envuelven la ejecución: el origen es el primer frame fuera de ellos
+_WRAPPER_MODULES = {__name__, "app.utils.uow", "app.utils.query", "contextlib"}
+
+
+def configure_slow_query_log() -> None:
+    """Si hay `slow_query_log_path`, el log de consultas lentas se escribe (también) en ese archivo."""
+    if not settings.slow_query_log_path or any(isinstance(h, logging.FileHandler) for h in logger.handlers):
+        return
+    handler = logging.FileHandler(settings.slow_query_log_path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def _call_site() -> str:
+    """`<módulo>.<función>` del código que lanzó la consulta (p. ej. document_repo.search_documents)."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _WRAPPER_MODULES:
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "desconocido"
+
+
+def _record(site: str, elapsed_ms: float, rows: int) -> None:
+    entry = _stats.get(site)
+    if entry is None:
+        entry = _stats[site] = {"calls": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0, "buckets": [0] * (len(BUCKETS_MS) + 1)}
+    entry["calls"] += 1
+    entry["rows"] += max(rows, 0)
+    entry["total_ms"] += elapsed_ms
+    entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+    for i, bound in enumerate(BUCKETS_MS):
+        if elapsed_ms <= bound:
+            entry["buckets"][i] += 1
+            break
+    else:
+        entry["buckets"][-1] += 1
+
+
+async def _explain(conn, sql: str, args) -> Optional[list]:
+    try:
+        async with conn.cursor(DictCursor) as cursor:
+            prefix = "EXPLAIN QUERY PLAN " if settings.db_backend == "sqlite" else "EXPLAIN "
+            await cursor.execute(prefix + sql, args)
+            return list(await cursor.fetchall())
+    except Exception as e:
+        return [{"error": str(e)}]
+
+
+async def _log_slow(conn, site: str, sql: str, args, elapsed_ms: float, rows: int, explainable: bool) -> None:
+    entry = {"site": site, "elapsed_ms": round(elapsed_ms, 2), "rows": rows, "sql": " ".join(sql.split())[:MAX_SQL_LENGTH]}
+    if explainable and settings.slow_query_explain and sql.lstrip()[:6].upper() == "SELECT":
+        entry["explain"] = await _explain(conn, sql, args)
+    _recent_slow.append({"at": time.time(), **entry})
+    logger.warning("consulta lenta %s", json.dumps(entry, default=str, ensure_ascii=False))
+
+
+class InstrumentedCursor:
+    """
+    Envuelve un cursor aiomysql: mide cada execute/executemany (latencia, filas y origen)
+    y registra en el log de consultas lentas las que superan `slow_query_threshold_ms`.
+    El resto de atributos (fetch*, lastrowid, ...) se delegan al cursor original.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def _timed(self, method, sql: str, args, explainable: bool):
+        site = _call_site()
+        started = time.perf_counter()
+        try:
+            return await method(sql, args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            rows = self._cursor.rowcount
+            _record(site, elapsed_ms, rows)
+            if elapsed_ms >= settings.slow_query_threshold_ms:
+                await _log_slow(self._cursor.connection, site, sql, args, elapsed_ms, rows, explainable)
+
+    async def execute(self, query: str, args=None):
+        return await self._timed(self._cursor.execute, query, args, explainable=True)
+
+    async def executemany(self, query: str, args):
+        return await self._timed(self._cursor.executemany, query, args, explainable=False)
+
+
+def query_stats() -> Dict[str, Any]:
+    """Por origen: llamadas, filas, latencia media/máxima e histograma acumulado por bucket."""
+    result = {}
+    for site, entry in sorted(_stats.items(), key=lambda kv: kv[1]["total_ms"], reverse=True):
+        histogram, cumulative = {}, 0
+        for bound, count in zip([*map(str, BUCKETS_MS), "+Inf"], entry["buckets"]):
+            cumulative += count
+            histogram[bound] = cumulative
+        result[site] = {
+            "calls": entry["calls"],
+            "rows": entry["rows"],
+            "total_ms": round(entry["total_ms"], 2),
+            "mean_ms": round(entry["total_ms"] / entry["calls"], 2),
+            "max_ms": round(entry["max_ms"], 2),
+            "histogram_ms": histogram,
+        }
+    return result
+
+
+def recent_slow_queries() -> list:
+    return list(_recent_slow)
+
+
+def reset_query_stats() -> None:
+    _stats.clear()
+    _recent_slow.clear()
@@ -0,0 +1,220 @@
+"""
+Backend SQLite (aiosqlite) con la misma interfaz que el pool aiomysql de app.utils.db:
+`acquire()` entrega una conexión con `cursor(DictCursor | Cursor)`, `commit()` y `rollback()`,
+y los cursores aceptan el SQL de los repositorios (placeholders `%s`, NOW()).
+Pensado para benchmarks y perfiles sin servidor MySQL (DB_BACKEND=sqlite).
+"""
+import asyncio
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+import aiosqlite
+from aiomysql import DictCursor
+from app.config.settings import settings
+from app.utils.db import PoolTimeout
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent.parent / "database" / "sqlite_schema.sql"
+
+_pool: Optional["SQLitePool"] = None
+_pool_lock = asyncio.Lock()
+
+
+def _now() -> str:
+    # Mismo formato que CURRENT_TIMESTAMP de SQLite (UTC)
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def translate(query: str) -> str:
+    """Placeholders de MySQL (%s) a los de sqlite3 (?)."""
+    return query.replace("%s", "?")
+
+
+class SQLiteCursor:
+    """Cursor con resultados en memoria (como los de aiomysql) y filas dict o tupla."""
+
+    def __init__(self, conn: "SQLiteConnection", dictionary: bool):
+        self.connection = conn
+        self._dictionary = dictionary
+        self._rows: list = []
+        self._pos = 0
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def _convert(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self.description, row)}
+
+    async def execute(self, query: str, args=None):
+        cursor = await self.connection.raw.execute(translate(query), tuple(args or ()))
+        try:
+            self.description = cursor.description
+            self._rows = list(await cursor.fetchall()) if cursor.description else []
+            self._pos = 0
+            self.rowcount = len(self._rows) if cursor.description else cursor.rowcount
+            self.lastrowid = cursor.lastrowid
+        finally:
+            await cursor.close()
+        return self.rowcount
+
+    async def executemany(self, query: str, args):
+        cursor = await self.connection.raw.executemany(translate(query), [tuple(a) for a in args])
+        try:
+            self.description = None
+            self._rows = []
+            self.rowcount = cursor.rowcount
+        finally:
+            await cursor.close()
+        return self.rowcount
+
+    async def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return self._convert(row)
+
+    async def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return [self._convert(r) for r in rows]
+
+    async def close(self) -> None:
+        self._rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class SQLiteConnection:
+    def __init__(self, raw: aiosqlite.Connection):
+        self.raw = raw
+
+    def cursor(self, cursor_class=None) -> SQLiteCursor:
+        return SQLiteCursor(self, dictionary=cursor_class is not None and issubclass(cursor_class, DictCursor))
+
+    async def commit(self) -> None:
+        await self.raw.commit()
+
+    async def rollback(self) -> None:
+        await self.raw.rollback()
+
+    async def close(self) -> None:
+        await self.raw.close()
+
+
+async def _connect(path: str) -> SQLiteConnection:
+    raw = await aiosqlite.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+    await raw.create_function("NOW", 0, _now, deterministic=False)
+    await raw.execute("PRAGMA foreign_keys = ON")
+    await raw.execute(f"PRAGMA busy_timeout = {int(settings.db_pool_timeout_seconds * 1000)}")
+    if path != ":memory:":
+        await raw.execute("PRAGMA journal_mode = WAL")
+        await raw.execute("PRAGMA synchronous = NORMAL")
+    return SQLiteConnection(raw)
+
+
+async def ensure_schema(conn: SQLiteConnection) -> bool:
+    """Crea el esquema (database/sqlite_schema.sql) si la base está vacía. True si lo creó."""
+    cursor = await conn.raw.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents'")
+    exists = await cursor.fetchone()
+    await cursor.close()
+    if exists:
+        return False
+    await conn.raw.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    await conn.raw.commit()
+    return True
+
+
+class SQLitePool:
+    """
+    Pool mínimo de conexiones aiosqlite (cada una con su hilo). Con `:memory:` solo hay
+    una conexión: cada conexión a :memory: sería una base distinta.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.maxsize = 1 if path == ":memory:" else max(1, size)
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._opened = 0
+        self._lock = asyncio.Lock()
+        self.stats = {"acquired": 0, "timeouts": 0, "wait_seconds": 0.0}
+
+    async def _get(self) -> SQLiteConnection:
+        async with self._lock:
+            if self._idle.empty() and self._opened < self.maxsize:
+                conn = await _connect(self.path)
+                if self._opened == 0:
+                    await ensure_schema(conn)
+                self._opened += 1
+                return conn
+        return await self._idle.get()
+
+    async def acquire(self, timeout: float) -> SQLiteConnection:
+        started = time.monotonic()
+        try:
+            conn = await asyncio.wait_for(self._get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        self.stats["acquired"] += 1
+        self.stats["wait_seconds"] += time.monotonic() - started
+        return conn
+
+    def release(self, conn: SQLiteConnection) -> None:
+        self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            await self._idle.get_nowait().close()
+            self._opened -= 1
+
+    def snapshot(self) -> dict:
+        idle = self._idle.qsize()
+        return {"size": self.maxsize, "opened": self._opened, "idle": idle, "in_use": self._opened - idle, **self.stats}
+
+
+async def get_pool() -> SQLitePool:
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = SQLitePool(settings.sqlite_path, settings.db_pool_size)
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def pool_stats() -> dict:
+    if _pool is None:
+        return {"size": settings.db_pool_size, "opened": 0, "idle": 0, "in_use": 0}
+    return _pool.snapshot()
+
+
+@asynccontextmanager
+async def acquire():
+    pool = await get_pool()
+    try:
+        conn = await pool.acquire(settings.db_pool_timeout_seconds)
+    except asyncio.TimeoutError:
+        raise PoolTimeout(f"Sin conexiones libres tras {settings.db_pool_timeout_seconds}s (tamaño {pool.maxsize})")
+    try:
+        yield conn
+    finally:
+        try:
+            await conn.rollback()
+        except sqlite3.Error:
+            pass
+        pool.release(conn)
@@ -0,0 +1,59 @@
+from contextlib import asynccontextmanager
+from aiomysql import Cursor, DictCursor
+from app.config.settings import settings
+from app.utils.db import acquire
+from app.utils.query_stats import InstrumentedCursor
+
+
+class UnitOfWork:
+    """
+    Una conexión y una transacción por request. Los repositorios reciben el `uow` y
+    ejecutan sobre su conexión sin hacer commit; quien orquesta (endpoint, servicio o
+    script) decide cuándo confirmar con `commit()`. Lo no confirmado se descarta al cerrar.
+    La conexión se toma del pool de forma perezosa, en el primer cursor.
+    """
+
+    def __init__(self):
+        self._ctx = None
+        self._conn = None
+
+    async def connection(self):
+        if self._conn is None:
+            self._ctx = acquire()
+            self._conn = await self._ctx.__aenter__()
+        return self._conn
+
+    @asynccontextmanager
+    async def cursor(self, dictionary: bool = False):
+        conn = await self.connection()
+        async with conn.cursor(DictCursor if dictionary else Cursor) as cursor:
+            yield InstrumentedCursor(cursor) if settings.query_stats_enabled else cursor
+
+    async def commit(self) -> None:
+        if self._conn is not None:
+            await self._conn.commit()
+
+    async def rollback(self) -> None:
+        if self._conn is not None:
+            await self._conn.rollback()
+
+    async def release(self) -> None:
+        """Devuelve la conexión al pool (descartando lo no confirmado); se vuelve a pedir si hace falta."""
+        if self._ctx is not None:
+            ctx, self._ctx, self._conn = self._ctx, None, None
+            await ctx.__aexit__(None, None, None)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+
+async def get_uow():
+    """Dependencia FastAPI: un UnitOfWork por request, liberado al terminar."""
+    uow = UnitOfWork()
+    try:
+        yield uow
+    finally:
+        await uow.release()
@@ -0,0 +1,285 @@
+"""
+Worker de extracción: toma jobs de processing_jobs y extrae los PDFs por lotes de páginas
+en un pool de procesos (CPU-bound, fuera del proceso de la API), guardando cada lote con
+su checkpoint para que un reintento retome donde quedó.
+
+    python -m app.worker                      # servicio: procesa hasta SIGTERM/SIGINT
+    python -m app.worker --concurrency 4
+    python -m app.worker --drain              # procesa lo pendiente y termina
+
+Al recibir SIGTERM/SIGINT deja de tomar jobs y espera a los que están en curso
+(hasta --shutdown-timeout); los que no terminan vuelven a la cola sin contar el intento.
+
+Cada job corre en un ExtractionSandbox propio (uno por unidad de concurrencia) con límites de
+tiempo, memoria y páginas: si los supera se matan sus procesos y el documento queda en 'error'
+con el motivo, sin reintentos. Los procesos se renuevan cada WORKER_RECYCLE_AFTER_DOCUMENTS.
+
+Los cambios de estado y el progreso por lotes se publican en progress_events y, con
+PROGRESS_EVENTS_URL, se reenvían a la API para sus streams SSE.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+from concurrent.futures.process import BrokenProcessPool
+
+from app.config.settings import settings
+from app.repositories import document_repo, job_repo
+from app.services import progress_events
+from app.services.extraction_cache import apply_cached, store_document
+from app.services.extraction_sandbox import ExtractionLimitExceeded, ExtractionSandbox
+from app.services.extraction_store import extract_pending_tables, stream_extraction
+from app.utils.db import close_async_pool, init_async_pool
+from app.utils.files import file_content_hash
+from app.utils.uow import UnitOfWork
+
+logger = logging.getLogger("docsflow.worker")
+
+_STALE_ERROR = "El worker que procesaba el documento dejó de responder y se agotaron los intentos"
+
+
+class Worker:
+    def __init__(self, concurrency: int, poll_interval: float, drain: bool):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.drain = drain
+        # El pool de cada sandbox es también el pool por páginas de su job: se reparten los núcleos entre los jobs
+        self.page_workers = settings.pdf_parallel_workers or max(1, (os.cpu_count() or 1) // concurrency)
+        self.stopping = asyncio.Event()
+        self.running: dict[int, asyncio.Task] = {}
+        self.sandboxes = [
+            ExtractionSandbox(max_workers=self.page_workers, max_documents=settings.worker_recycle_after_documents or None)
+            for _ in range(concurrency)
+        ]
+        self.free_sandboxes: asyncio.Queue = asyncio.Queue()
+        for sandbox in self.sandboxes:
+            self.free_sandboxes.put_nowait(sandbox)
+
+    async def process(self, job: dict) -> None:
+        # claim() nunca toma más jobs que sandboxes libres
+        sandbox = self.free_sandboxes.get_nowait()
+        try:
+            await self.process_document(job, sandbox)
+        except Exception:
+            # Solo si falla el propio manejo del error (p. ej. sin base): el job vuelve con su lease
+            logger.exception("job %s: error no controlado", job["id"])
+        finally:
+            self.free_sandboxes.put_nowait(sandbox)
+
+    async def process_document(self, job: dict, sandbox: ExtractionSandbox) -> None:
+        # Las pasadas de tablas diferidas no cambian el estado del documento (ya está processed)
+        tables_job = job["mode"] == "tables"
+        text_only = job["mode"] == "text_first"
+        async with UnitOfWork() as uow:
+            doc = {"id": job["document_id"]}
+            try:
+                found = await document_repo.get_document(uow, job["document_id"])
+                if found is None:
+                    await job_repo.mark_failed(uow, {**job, "attempts": job["max_attempts"]}, "Documento eliminado", 0)
+                    await uow.commit()
+                    return
+                doc = found
+                await self.ensure_content_hash(uow, doc, sandbox)
+                if await apply_cached(uow, doc):
+                    await job_repo.mark_done(uow, job["id"])
+                    await uow.commit()
+                    progress_events.publish_status(doc, "processed")
+                    logger.info("job %s: documento %s procesado desde caché", job["id"], doc["id"])
+                    return
+                if tables_job:
+                    await self.process_tables(uow, job, doc, sandbox)
+                    return
+                await document_repo.mark_processing(uow, doc["id"])
+                await uow.commit()
+                await uow.release()
+                progress_events.publish_status(doc, "processing")
+                # Guarda por lotes con checkpoint: un reintento retoma desde la última página confirmada
+                await sandbox.run(stream_extraction(
+                    uow, doc, sandbox.executor, self.page_workers,
+                    on_batch=lambda batch_uow, *_: job_repo.heartbeat(batch_uow, job["id"]),
+                    tables=not text_only,
+                ))
+                await document_repo.mark_processed(uow, doc["id"])
+                await job_repo.mark_done(uow, job["id"])
+                if text_only and settings.pdf_background_tables:
+                    await job_repo.enqueue(uow, doc["id"], job["max_attempts"], "tables", settings.pdf_background_tables_delay_seconds)
+                await uow.commit()
+                progress_events.publish_status(doc, "processed")
+                logger.info("job %s: documento %s procesado%s (intento %s)", job["id"], doc["id"], " (solo texto)" if text_only else "", job["attempts"])
+                if not text_only:
+                    await self.cache(uow, doc)
+            except asyncio.CancelledError:
+                await uow.rollback()
+                await job_repo.release(uow, job["id"])
+                if not tables_job:
+                    await document_repo.mark_pending(uow, doc["id"])
+                await uow.commit()
+                if not tables_job:
+                    progress_events.publish_status(doc, "pending")
+                raise
+            except ExtractionLimitExceeded as e:
+                # Reintentar daría lo mismo: falla definitivo
+                await uow.rollback()
+                await job_repo.mark_failed(uow, {**job, "attempts": job["max_attempts"]}, str(e), 0)
+                await document_repo.mark_error(uow, doc["id"], str(e))
+                await uow.commit()
+                progress_events.publish_status(doc, "error", str(e))
+                logger.warning("job %s: documento %s descartado: %s", job["id"], doc["id"], e)
+            except Exception as e:
+                # Incluye lo previo a la extracción (lectura del documento, hash, caché): sin esto el
+                # job quedaría 'running' hasta que venza su lease
+                await uow.rollback()
+                retry = await job_repo.mark_failed(uow, job, str(e), settings.job_retry_backoff_seconds)
+                if not tables_job:
+                    if retry:
+                        await document_repo.mark_pending(uow, doc["id"])
+                    else:
+                        await document_repo.mark_error(uow, doc["id"], str(e))
+                await uow.commit()
+                if not tables_job:
+                    progress_events.publish_status(doc, "pending" if retry else "error", str(e))
+                logger.warning("job %s: error en intento %s/%s (%s): %s", job["id"], job["attempts"], job["max_attempts"], "se reintentará" if retry else "definitivo", e)
+
+    async def ensure_content_hash(self, uow: UnitOfWork, doc: dict, sandbox: ExtractionSandbox) -> None:
+        """Documentos subidos antes de la caché por contenido: calcula y guarda su hash."""
+        if doc.get("content_hash") or not os.path.exists(doc["filepath"]):
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            doc["content_hash"] = await loop.run_in_executor(sandbox.executor, file_content_hash, doc["filepath"])
+        except (OSError, MemoryError, BrokenProcessPool) as e:
+            # Sin hash solo se pierde la caché; la extracción aplica sus propios límites
+            logger.warning("documento %s: no se pudo calcular el hash de contenido: %r", doc["id"], e)
+            return
+        await document_repo.set_content_hash(uow, doc["id"], doc["content_hash"])
+
+    async def process_tables(self, uow: UnitOfWork, job: dict, doc: dict, sandbox: ExtractionSandbox) -> None:
+        """Pasada de baja prioridad de un documento text_first: el documento sigue 'processed' aunque falle."""
+        try:
+            pending = await sandbox.run(extract_pending_tables(
+                uow, doc, executor=sandbox.executor,
+                on_batch=lambda batch_uow: job_repo.heartbeat(batch_uow, job["id"]),
+            ))
+            await job_repo.mark_done(uow, job["id"])
+            await uow.commit()
+            if pending:
+                # Fallos de extract_tables: quedan pendientes (con el error en la página) para /tables
+                logger.warning("job %s: %s páginas del documento %s siguen sin tablas por errores de extracción", job["id"], pending, doc["id"])
+            else:
+                logger.info("job %s: tablas del documento %s extraídas", job["id"], doc["id"])
+                await self.cache(uow, doc)
+        except asyncio.CancelledError:
+            await uow.rollback()
+            await job_repo.release(uow, job["id"])
+            await uow.commit()
+            raise
+        except ExtractionLimitExceeded as e:
+            # Las páginas quedan pendientes: la API las intentará bajo demanda con sus propios límites
+            await uow.rollback()
+            await job_repo.mark_failed(uow, {**job, "attempts": job["max_attempts"]}, str(e), 0)
+            await uow.commit()
+            logger.warning("job %s: tablas diferidas del documento %s descartadas: %s", job["id"], doc["id"], e)
+        except Exception as e:
+            await uow.rollback()
+            retry = await job_repo.mark_failed(uow, job, str(e), settings.job_retry_backoff_seconds)
+            await uow.commit()
+            logger.warning("job %s: error en tablas diferidas, intento %s/%s (%s): %s", job["id"], job["attempts"], job["max_attempts"], "se reintentará" if retry else "definitivo", e)
+
+    async def cache(self, uow: UnitOfWork, doc: dict) -> None:
+        # Fuera de la transacción del documento: un fallo al cachear no lo deja sin procesar
+        try:
+            if await store_document(uow, doc):
+                await uow.commit()
+        except Exception as e:
+            await uow.rollback()
+            logger.warning("documento %s: no se pudo guardar en la caché de extracción: %s", doc["id"], e)
+
+    async def claim(self) -> list:
+        free = self.concurrency - len(self.running)
+        if free <= 0:
+            return []
+        async with UnitOfWork() as uow:
+            recovered = await job_repo.requeue_stale(uow, settings.job_lease_seconds)
+            documents = []
+            for job in recovered:
+                # Las pasadas de tablas diferidas no cambian el estado del documento (ya está processed)
+                if job["mode"] == "tables":
+                    continue
+                doc = await document_repo.get_document(uow, job["document_id"])
+                if doc is None:
+                    continue
+                if job["failed"]:
+                    await document_repo.mark_error(uow, doc["id"], _STALE_ERROR)
+                else:
+                    await document_repo.mark_pending(uow, doc["id"])
+                documents.append((doc, job["failed"]))
+            jobs = await job_repo.claim(uow, self.worker_id, free)
+            await uow.commit()
+        for doc, failed in documents:
+            progress_events.publish_status(doc, "error" if failed else "pending", _STALE_ERROR if failed else None)
+        if recovered:
+            failed = sum(job["failed"] for job in recovered)
+            logger.warning("%s jobs con lease vencido: %s vueltos a la cola, %s fallidos", len(recovered), len(recovered) - failed, failed)
+        return jobs
+
+    async def queue_empty(self) -> bool:
+        async with UnitOfWork() as uow:
+            return not await job_repo.has_pending(uow)
+
+    async def run(self) -> None:
+        logger.info("worker %s: concurrencia %s%s", self.worker_id, self.concurrency, " (drain)" if self.drain else "")
+        while not self.stopping.is_set():
+            for job in await self.claim():
+                task = asyncio.create_task(self.process(job))
+                self.running[job["id"]] = task
+                task.add_done_callback(lambda _, job_id=job["id"]: self.running.pop(job_id, None))
+            if self.drain and not self.running and await self.queue_empty():
+                break
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def shutdown(self, timeout: float) -> None:
+        if self.running:
+            logger.info("esperando %s jobs en curso (máx. %ss)", len(self.running), timeout)
+            _, pending = await asyncio.wait(list(self.running.values()), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        for sandbox in self.sandboxes:
+            sandbox.shutdown()
+
+
+async def main_async(args) -> None:
+    await init_async_pool()
+    if progress_events.start_forwarding():
+        logger.info("reenviando eventos de progreso a %s", settings.progress_events_url)
+    worker = Worker(args.concurrency, args.poll_interval, args.drain)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stopping.set)
+    try:
+        await worker.run()
+    finally:
+        await worker.shutdown(args.shutdown_timeout)
+        await progress_events.stop_forwarding()
+        await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency, help="Procesos de extracción en paralelo")
+    parser.add_argument("--poll-interval", type=float, default=settings.worker_poll_interval_seconds)
+    parser.add_argument("--shutdown-timeout", type=float, default=settings.worker_shutdown_timeout_seconds)
+    parser.add_argument("--drain", action="store_true", help="Procesar lo pendiente (incluidos reintentos) y terminar")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark de carga para `GET /documents/` a alta concurrencia.
+
+Mide req/s y latencias (p50/p95/p99) contra un servidor ya levantado. Para comparar
+antes/después, ejecutar contra cada versión con una etiqueta distinta y luego comparar:
+
+    uvicorn app.main:application --workers 1 --port 8000
+    python -m benchmarks.bench_api_list_documents --label sync  --output bench_sync.json
+    python -m benchmarks.bench_api_list_documents --label async --output bench_async.json
+    python -m benchmarks.bench_api_list_documents --compare bench_sync.json bench_async.json
+
+Sin servidor ni MySQL: `--in-process` llama a la app ASGI en el mismo proceso; con
+DB_BACKEND=sqlite la base es un archivo local (sembrarlo antes con bench_document_search --seed):
+
+    DB_BACKEND=sqlite python -m benchmarks.bench_document_search --seed 100000
+    DB_BACKEND=sqlite python -m benchmarks.bench_api_list_documents --in-process --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from benchmarks.common import summarize_ms, write_json
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    resp = await client.post("/auth/login", json={"email": email, "password": password})
+    resp.raise_for_status()
+    return resp.json()["access_token"]
+
+
+def _client(base_url: str, concurrency: int, in_process: bool) -> httpx.AsyncClient:
+    if in_process:
+        from app.main import application
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=application), base_url="http://bench", timeout=60)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+
+
+async def run(base_url: str, token: str | None, email: str, password: str, concurrency: int, total: int, limit: int, in_process: bool = False) -> dict:
+    async with _client(base_url, concurrency, in_process) as client:
+        if not token:
+            token = await _login(client, email, password)
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies: list[float] = []
+        errors = 0
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def worker():
+            nonlocal errors
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                try:
+                    resp = await client.get("/documents/", params={"limit": limit}, headers=headers)
+                    if resp.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    if in_process:
+        from app.utils.db import close_async_pool
+        await close_async_pool()
+    return {
+        "endpoint": "GET /documents/",
+        "target": f"in-process ({os.getenv('DB_BACKEND', 'mysql')})" if in_process else base_url,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(total / elapsed, 1) if elapsed else 0.0,
+        **summarize_ms(latencies),
+    }
+
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+    print(f"{'métrica':<12}{before.get('label', 'antes'):>14}{after.get('label', 'después'):>14}{'cambio':>10}")
+    for key in ("req_per_s", "p50_ms", "p95_ms", "p99_ms", "errors"):
+        a, b = before.get(key, 0), after.get(key, 0)
+        change = f"{(b - a) / a * 100:+.1f}%" if a else "-"
+        print(f"{key:<12}{a:>14}{b:>14}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("BENCH_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--token", default=os.getenv("BENCH_TOKEN"))
+    parser.add_argument("--email", default=os.getenv("BENCH_EMAIL", "admin@docsflow.com"))
+    parser.add_argument("--password", default=os.getenv("BENCH_PASSWORD", "admin123"))
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--in-process", action="store_true", help="Llamar a la app ASGI en este proceso en lugar de a --base-url")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"), help="Comparar dos resultados guardados")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = asyncio.run(run(args.base_url, args.token, args.email, args.password, args.concurrency, args.requests, args.limit, args.in_process))
+    result["label"] = args.label
+    print(json.dumps(result, indent=2))
+    if args.output:
+        write_json(args.output, result)
+
+
+if __name__ == "__main__":
+    main()
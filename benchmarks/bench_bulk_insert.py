@@ -0,0 +1,117 @@
+"""
+Micro-benchmark de inserción de resultados de extracción (filas/s) en una base local.
+
+Compara una fila por INSERT (con commit por fila, como antes, y en una sola transacción)
+contra `table_repo.insert_tables` con INSERTs multi-fila para varios tamaños de bloque.
+Usa un documento temporal que se borra al terminar.
+
+    python -m benchmarks.bench_bulk_insert --tables 300 --rows 40 --cols 6
+    python -m benchmarks.bench_bulk_insert --batch-sizes 100 500 1000 5000 --output bulk.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.repositories import table_repo
+from app.services.extraction_store import clear_extraction
+from app.utils.db import close_async_pool
+from app.utils.uow import UnitOfWork
+from benchmarks.common import write_json
+
+
+def synthetic_tables(n_tables: int, n_rows: int, n_cols: int, rng: random.Random) -> list:
+    return [
+        {
+            "page": t // 2 + 1,
+            "headers": [f"col_{c}" for c in range(n_cols)],
+            "rows": [[f"{rng.randint(0, 99999)}.{rng.randint(0, 99):02d}" for _ in range(n_cols)] for _ in range(n_rows)],
+        }
+        for t in range(n_tables)
+    ]
+
+
+async def _create_document(uow: UnitOfWork) -> int:
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT id, COALESCE(department_id, (SELECT MIN(id) FROM departments)) FROM users ORDER BY id LIMIT 1")
+        uploader, department_id = await cursor.fetchone()
+        await cursor.execute(
+            "INSERT INTO documents (filename, uploaded_by, department_id, filepath, status) "
+            "VALUES ('bench_bulk_insert.pdf', %s, %s, 'uploads/bench/bench_bulk_insert.pdf', 'processed')",
+            (uploader, department_id),
+        )
+        document_id = cursor.lastrowid
+    await uow.commit()
+    return document_id
+
+
+async def _row_by_row(uow: UnitOfWork, document_id: int, tables: list, commit_each: bool) -> int:
+    table_rows, cells = table_repo._table_rows(document_id, tables)
+    table_sql = f"INSERT INTO extracted_tables ({', '.join(table_repo.TABLE_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)"
+    cell_sql = f"INSERT INTO extracted_table_cells ({', '.join(table_repo.CELL_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)"
+    for sql, rows in ((table_sql, table_rows), (cell_sql, cells)):
+        for row in rows:
+            async with uow.cursor() as cursor:
+                await cursor.execute(sql, row)
+            if commit_each:
+                await uow.commit()
+    return len(table_rows) + len(cells)
+
+
+async def _measure(uow: UnitOfWork, document_id: int, label: str, insert) -> dict:
+    started = time.perf_counter()
+    rows = await insert()
+    await uow.commit()
+    elapsed = time.perf_counter() - started
+    await clear_extraction(uow, document_id)
+    await uow.commit()
+    result = {"mode": label, "rows": rows, "elapsed_s": round(elapsed, 3), "rows_per_s": round(rows / elapsed, 1) if elapsed else 0.0}
+    print(f"{label:<16}{rows:>10} filas {result['elapsed_s']:>9}s {result['rows_per_s']:>12} filas/s")
+    return result
+
+
+async def run(tables: list, batch_sizes: list, skip_commit_each: bool) -> dict:
+    results = []
+    async with UnitOfWork() as uow:
+        document_id = await _create_document(uow)
+        try:
+            if not skip_commit_each:
+                results.append(await _measure(uow, document_id, "fila+commit", lambda: _row_by_row(uow, document_id, tables, True)))
+            results.append(await _measure(uow, document_id, "fila", lambda: _row_by_row(uow, document_id, tables, False)))
+            for size in batch_sizes:
+                results.append(await _measure(uow, document_id, f"bloque={size}", lambda: table_repo.insert_tables(uow, document_id, tables, size)))
+        finally:
+            await uow.rollback()
+            await clear_extraction(uow, document_id)
+            async with uow.cursor() as cursor:
+                await cursor.execute("DELETE FROM documents WHERE id = %s", (document_id,))
+            await uow.commit()
+    return {"tables": len(tables), "results": results}
+
+
+async def main_async(args) -> None:
+    try:
+        tables = synthetic_tables(args.tables, args.rows, args.cols, random.Random(args.random_seed))
+        result = await run(tables, args.batch_sizes, args.skip_commit_each)
+        print(json.dumps(result, indent=2))
+        if args.output:
+            write_json(args.output, result)
+    finally:
+        await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--cols", type=int, default=6)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 500, 1000, 5000])
+    parser.add_argument("--skip-commit-each", action="store_true", help="Omitir el modo con commit por fila (el más lento)")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
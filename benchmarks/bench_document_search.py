@@ -0,0 +1,116 @@
+"""
+Benchmark de `GET /documents/search?q=` a nivel de repositorio sobre una tabla grande.
+
+Compara la consulta anterior (`filename LIKE '%q%'` + ORDER BY uploaded_at) contra
+`document_repo.search_documents` (índice FULLTEXT ngram + ranking), con y sin filtro
+de departamento. Requiere la migración 0001_documents_filename_fulltext aplicada.
+
+    python -m benchmarks.bench_document_search --seed 1000000      # una vez
+    python -m benchmarks.bench_document_search --repeat 20 --output search.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.repositories import document_repo
+from app.utils.db import close_async_pool
+from app.utils.uow import UnitOfWork
+from benchmarks.common import summarize_ms, write_json
+
+WORDS = ["factura", "extracto", "nomina", "contrato", "reporte", "orden_compra", "cotizacion", "balance", "inventario", "recibo"]
+DEFAULT_QUERIES = ["factura", "2024", "nomina_00", "compra_2023", "zz_no_existe"]
+SEED_BATCH = 5000
+
+LEGACY_SQL = (
+    "SELECT * FROM documents WHERE {dept}filename LIKE %s "
+    "ORDER BY uploaded_at DESC LIMIT %s OFFSET 0"
+)
+
+
+async def seed(total: int, rng: random.Random) -> None:
+    async with UnitOfWork() as uow:
+        async with uow.cursor() as cursor:
+            await cursor.execute("SELECT id FROM departments")
+            departments = [r[0] for r in await cursor.fetchall()]
+            await cursor.execute("SELECT id FROM users ORDER BY id LIMIT 1")
+            uploader = (await cursor.fetchone())[0]
+        inserted = 0
+        while inserted < total:
+            batch = []
+            for _ in range(min(SEED_BATCH, total - inserted)):
+                n = inserted + len(batch)
+                name = f"{rng.choice(WORDS)}_{rng.randint(2019, 2025)}_{n:07d}.pdf"
+                batch.append((name, uploader, rng.choice(departments), f"uploads/bench/{name}", rng.choice(["factura", "reporte", None])))
+            async with uow.cursor() as cursor:
+                await cursor.executemany(
+                    "INSERT INTO documents (filename, uploaded_by, department_id, filepath, document_type, status) "
+                    "VALUES (%s, %s, %s, %s, %s, 'pending')",
+                    batch,
+                )
+            await uow.commit()
+            inserted += len(batch)
+            print(f"sembrados {inserted}/{total}")
+
+
+async def _time(fn, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def run(queries: list, repeat: int, limit: int, department_id: int | None) -> dict:
+    results = []
+    async with UnitOfWork() as uow:
+        async with uow.cursor() as cursor:
+            await cursor.execute("SELECT COUNT(*) FROM documents")
+            rows = (await cursor.fetchone())[0]
+        for q in queries:
+            async def legacy():
+                dept = "department_id = %s AND " if department_id is not None else ""
+                params = ([department_id] if department_id is not None else []) + [f"%{q}%", limit]
+                async with uow.cursor() as cursor:
+                    await cursor.execute(LEGACY_SQL.format(dept=dept), tuple(params))
+                    await cursor.fetchall()
+
+            async def indexed():
+                await document_repo.search_documents(uow, q=q, department_id=department_id, limit=limit)
+
+            before = summarize_ms(await _time(legacy, repeat))
+            after = summarize_ms(await _time(indexed, repeat))
+            results.append({"q": q, "like": before, "fulltext": after})
+            print(f"{q!r:<16} LIKE p50={before['p50_ms']:>9}ms  FULLTEXT p50={after['p50_ms']:>9}ms")
+    return {"rows": rows, "department_id": department_id, "limit": limit, "repeat": repeat, "queries": results}
+
+
+async def main_async(args) -> None:
+    try:
+        if args.seed:
+            await seed(args.seed, random.Random(args.random_seed))
+            return
+        result = await run(args.queries, args.repeat, args.limit, args.department_id)
+        print(json.dumps(result, indent=2))
+        if args.output:
+            write_json(args.output, result)
+    finally:
+        await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="Insertar N documentos sintéticos y salir")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--queries", nargs="+", default=DEFAULT_QUERIES)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=21)
+    parser.add_argument("--department-id", type=int)
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
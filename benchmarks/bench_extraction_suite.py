@@ -0,0 +1,162 @@
+"""
+Rendimiento de la extracción sobre un corpus sintético (scripts/generate_sample_pdf.py --corpus).
+
+Cada PDF se extrae con extract_pdf_content en un proceso nuevo (el pico de RSS es solo de esa
+extracción) y se serializa como lo guarda la caché por contenido (encode_pages). Informa
+páginas/s, tablas/s, pico de RSS y el tiempo por etapa: texto (con pdfplumber incluye parsear
+la página), clasificación previa, extract_tables, normalización y serialización. Las etapas se
+miden con --workers 1 (con el pool por páginas se acumulan en los procesos hijos).
+
+El JSON de --output lleva el commit, los ajustes de extracción y la especificación del corpus;
+con --compare se comparan páginas/s por PDF con una ejecución anterior (mismo corpus y semilla).
+
+    python -m benchmarks.bench_extraction_suite --pages 10 100 --tables-per-page 1 3 --output suite.json
+    python -m benchmarks.bench_extraction_suite --corpus-dir /tmp/docsflow_corpus_x --compare suite.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from app.config.settings import settings
+from app.services.extraction_cache import encode_pages
+from app.services.pdf_processing import EXTRACTOR_VERSION, extract_pdf_content, stage_timings
+from benchmarks.common import peak_rss_mb, write_json
+from scripts.generate_sample_pdf import generate_corpus
+
+STAGES = ("text", "triage", "tables", "normalization", "serialization")
+
+
+def _extract(path: str, workers: int) -> dict:
+    """Corre en un proceso nuevo por PDF y pasada."""
+    stage_timings(reset=True)
+    started = time.perf_counter()
+    content = extract_pdf_content(path, workers=workers)
+    extracted = time.perf_counter()
+    payload = encode_pages(content["pages"])
+    serialized = time.perf_counter()
+    return {
+        "pages": len(content["pages"]),
+        "tables": len(content["tables"]),
+        "elapsed_s": serialized - started,
+        "stages_s": {**stage_timings(), "serialization": serialized - extracted},
+        "payload_bytes": len(payload),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure(spec: dict, workers: int, repeat: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    best = None
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            run = pool.submit(_extract, spec["path"], workers).result()
+        if best is None or run["elapsed_s"] < best["elapsed_s"]:
+            best = run
+    elapsed = best["elapsed_s"]
+    row = {
+        "pdf": spec["name"],
+        "spec": {k: v for k, v in spec.items() if k not in ("name", "path")},
+        "pages": best["pages"],
+        "tables": best["tables"],
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(best["pages"] / elapsed, 2) if elapsed else 0.0,
+        "tables_per_s": round(best["tables"] / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(best["peak_rss_mb"], 1),
+        "payload_kb": round(best["payload_bytes"] / 1024, 1),
+        "stages_s": {stage: round(best["stages_s"].get(stage, 0.0), 3) for stage in STAGES},
+    }
+    shares = "  ".join(f"{stage} {row['stages_s'][stage] / elapsed:>5.1%}" for stage in STAGES) if elapsed else ""
+    print(f"{spec['name']:<36} {row['pages']:>5} págs {row['tables']:>5} tablas  {row['pages_per_s']:>7.2f} págs/s  "
+          f"{row['tables_per_s']:>7.2f} tablas/s  RSS {row['peak_rss_mb']:>6.1f} MB  {shares}")
+    return row
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def compare(previous_path: str, results: list) -> None:
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {r["pdf"]: r for r in previous["results"]}
+    print(f"\nComparación con {previous_path} (commit {previous.get('commit')}):")
+    for row in results:
+        old = before.get(row["pdf"])
+        if old is None or not old["pages_per_s"]:
+            print(f"{row['pdf']:<36} sin referencia")
+            continue
+        change = row["pages_per_s"] / old["pages_per_s"] - 1
+        print(f"{row['pdf']:<36} {old['pages_per_s']:>7.2f} -> {row['pages_per_s']:>7.2f} págs/s  {change:>+7.1%}  "
+              f"RSS {old['peak_rss_mb']:>6.1f} -> {row['peak_rss_mb']:>6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-dir", help="Corpus ya generado (con corpus.json); si no, se genera en un directorio temporal")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--tables-per-page", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=5)
+    parser.add_argument("--text-paragraphs", type=int, default=2)
+    parser.add_argument("--ruling", nargs="+", choices=["ruled", "unruled"], default=["ruled", "unruled"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="Procesos por extracción (1 = secuencial, mide las etapas)")
+    parser.add_argument("--repeat", type=int, default=1, help="Pasadas por PDF (se toma la más rápida)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior")
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus_dir:
+            with open(os.path.join(args.corpus_dir, "corpus.json"), encoding="utf-8") as f:
+                corpus = json.load(f)
+        else:
+            corpus = generate_corpus(tmp, args.pages, args.tables_per_page, args.rows, args.cols,
+                                     args.text_paragraphs, args.ruling, args.seed)
+        results = [measure(spec, args.workers, args.repeat) for spec in corpus]
+
+    pages = sum(r["pages"] for r in results)
+    tables = sum(r["tables"] for r in results)
+    elapsed = sum(r["elapsed_s"] for r in results)
+    totals = {
+        "pages": pages,
+        "tables": tables,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 2) if elapsed else 0.0,
+        "tables_per_s": round(tables / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": max((r["peak_rss_mb"] for r in results), default=0.0),
+        "stages_s": {stage: round(sum(r["stages_s"][stage] for r in results), 3) for stage in STAGES},
+    }
+    print(f"\nTotal: {pages} págs, {tables} tablas en {elapsed:.2f}s  {totals['pages_per_s']:.2f} págs/s  "
+          f"{totals['tables_per_s']:.2f} tablas/s  RSS máx {totals['peak_rss_mb']:.1f} MB")
+    if args.compare:
+        compare(args.compare, results)
+    if args.output:
+        write_json(args.output, {
+            "commit": _git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "settings": {
+                "extractor_version": EXTRACTOR_VERSION,
+                "workers": args.workers,
+                "pdf_table_triage": settings.pdf_table_triage,
+                "pdf_text_backend": settings.pdf_text_backend,
+                "pdf_memory_bounded": settings.pdf_memory_bounded,
+            },
+            "totals": totals,
+            "results": results,
+        })
+
+
+if __name__ == "__main__":
+    main()
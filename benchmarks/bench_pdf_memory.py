@@ -0,0 +1,113 @@
+"""
+Memoria de la extracción por documento, con y sin PDF_MEMORY_BOUNDED.
+
+Cada PDF se extrae como lo hace el worker (iter_pages secuencial, página a página y sin
+acumular el resultado) en un proceso nuevo por medición, dos veces: sin trazar, para el tiempo
+y el pico de RSS, y con tracemalloc, para el pico de memoria de Python y lo que sigue retenido
+antes de cerrar el PDF. pdfminer es Python puro, así que tracemalloc ve casi todo; lo nativo
+(pypdfium2, NumPy) solo aparece en el RSS. Los PDFs sintéticos son extractos con tabla por
+página y escaneados (una imagen JPEG de ruido por página, que no se comprime).
+
+Con --max-peak-mb sale con error si alguna extracción en modo acotado supera ese pico: sirve
+como prueba de regresión.
+
+    python -m benchmarks.bench_pdf_memory --pages 30 120
+    python -m benchmarks.bench_pdf_memory --pdf samples/sample_invoice.pdf --max-peak-mb 40
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config.settings import settings
+from app.services.pdf_processing import iter_pages
+from benchmarks.bench_pdf_parallel import build_statement_pdf
+from benchmarks.common import peak_rss_mb, write_json
+from scripts.generate_sample_pdf import build_scanned_pdf
+
+
+def _measure(path: str, bounded: bool, traced: bool) -> dict:
+    """Corre en un proceso nuevo: el pico de RSS y de tracemalloc son solo de esta extracción."""
+    settings.pdf_memory_bounded = bounded
+    if traced:
+        tracemalloc.start()
+    started = time.perf_counter()
+    pages = retained = 0
+    for _ in iter_pages(path, workers=1):
+        pages += 1
+        if traced:
+            # Lo que queda vivo entre páginas: con el modo acotado no debería crecer
+            retained = tracemalloc.get_traced_memory()[0]
+    elapsed = time.perf_counter() - started
+    result = {"pages": pages, "elapsed_s": elapsed, "max_rss_mb": peak_rss_mb()}
+    if traced:
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        result["retained_mb"] = retained / (1024 * 1024)
+        tracemalloc.stop()
+    return result
+
+
+def _run(path: str, bounded: bool, traced: bool) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(_measure, path, bounded, traced).result()
+
+
+def measure(path: str, label: str) -> list:
+    results = []
+    for bounded in (False, True):
+        timing, traced = _run(path, bounded, traced=False), _run(path, bounded, traced=True)
+        row = {
+            "pdf": label,
+            "size_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+            "pages": timing["pages"],
+            "memory_bounded": bounded,
+            "elapsed_s": round(timing["elapsed_s"], 3),
+            "max_rss_mb": round(timing["max_rss_mb"], 1),
+            "peak_mb": round(traced["peak_mb"], 2),
+            "retained_mb": round(traced["retained_mb"], 2),
+        }
+        print(f"{label:<28} {row['pages']:>5} págs  {'acotado' if bounded else 'normal ':<8} {row['elapsed_s']:>7.2f}s  "
+              f"RSS máx {row['max_rss_mb']:>7.1f} MB  pico Python {row['peak_mb']:>7.2f} MB  retenido {row['retained_mb']:>7.2f} MB")
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[30, 120], help="Páginas de los PDFs sintéticos")
+    parser.add_argument("--pdf", nargs="*", help="PDFs existentes (por defecto, samples/*.pdf)")
+    parser.add_argument("--max-peak-mb", type=float, help="Falla si el pico de tracemalloc en modo acotado supera este valor")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    args = parser.parse_args()
+
+    results = []
+    for path in args.pdf if args.pdf is not None else sorted(glob.glob("samples/*.pdf")):
+        results.extend(measure(path, os.path.basename(path)))
+    rng = random.Random(args.random_seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_pages in args.pages:
+            path = os.path.join(tmp, f"extracto_{n_pages}.pdf")
+            build_statement_pdf(path, n_pages, 35, rng)
+            results.extend(measure(path, f"extracto {n_pages} págs"))
+            path = os.path.join(tmp, f"escaneado_{n_pages}.pdf")
+            build_scanned_pdf(path, n_pages, rng)
+            results.extend(measure(path, f"escaneado {n_pages} págs"))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        write_json(args.output, results)
+    if args.max_peak_mb is not None:
+        over = [r for r in results if r["memory_bounded"] and r["peak_mb"] > args.max_peak_mb]
+        if over:
+            raise SystemExit(f"Pico de memoria por encima de {args.max_peak_mb} MB en: {', '.join(r['pdf'] for r in over)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Speedup de la extracción por páginas en paralelo frente a la secuencial según el número de páginas.
+
+Genera extractos bancarios sintéticos (una tabla de movimientos por página) en un directorio
+temporal, extrae cada uno en modo secuencial y con el pool por páginas, y verifica que ambos
+resultados sean idénticos (salvo `generated_at`).
+
+    python -m benchmarks.bench_pdf_parallel --pages 10 50 200 500 --workers 4
+    python -m benchmarks.bench_pdf_parallel --pdf samples/extracto.pdf --workers 2 4 8
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.services.pdf_processing import extract_pdf_content
+from benchmarks.common import write_json
+
+
+def build_statement_pdf(path: str, n_pages: int, rows_per_page: int, rng: random.Random) -> None:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    story = []
+    balance = 10000.0
+    for page in range(n_pages):
+        story.append(Paragraph(f"EXTRACTO DE CUENTA - Hoja {page + 1} de {n_pages}", styles["Heading2"]))
+        data = [["Fecha", "Concepto", "Referencia", "Importe", "Saldo"]]
+        for row in range(rows_per_page):
+            amount = round(rng.uniform(-900, 1200), 2)
+            balance += amount
+            data.append([f"2024-{page % 12 + 1:02d}-{row % 28 + 1:02d}", f"Movimiento {page * rows_per_page + row}",
+                         f"REF{rng.randint(100000, 999999)}", f"{amount:,.2f}", f"{balance:,.2f}"])
+        table = Table(data)
+        table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.grey)]))
+        story.append(table)
+        story.append(PageBreak())
+    SimpleDocTemplate(path, pagesize=A4).build(story)
+
+
+def _timed(path: str, workers: int) -> tuple:
+    started = time.perf_counter()
+    content = extract_pdf_content(path, workers=workers, min_pages=0)
+    elapsed = time.perf_counter() - started
+    content.pop("generated_at")
+    return elapsed, json.dumps(content, sort_keys=True)
+
+
+def measure(path: str, n_pages: int, workers_list: list) -> list:
+    serial_s, serial_json = _timed(path, 1)
+    print(f"{n_pages:>6} págs  secuencial {serial_s:>8.2f}s")
+    results = [{"pages": n_pages, "workers": 1, "elapsed_s": round(serial_s, 3), "speedup": 1.0, "identical": True}]
+    for workers in workers_list:
+        elapsed, parallel_json = _timed(path, workers)
+        identical = parallel_json == serial_json
+        speedup = serial_s / elapsed if elapsed else 0.0
+        print(f"{n_pages:>6} págs  {workers:>2} procesos {elapsed:>8.2f}s  x{speedup:.2f}{'' if identical else '  ¡RESULTADO DISTINTO!'}")
+        results.append({"pages": n_pages, "workers": workers, "elapsed_s": round(elapsed, 3), "speedup": round(speedup, 2), "identical": identical})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200], help="Páginas de los PDFs sintéticos")
+    parser.add_argument("--rows-per-page", type=int, default=35)
+    parser.add_argument("--pdf", help="Medir un PDF existente en lugar de los sintéticos")
+    parser.add_argument("--workers", type=int, nargs="+", default=[os.cpu_count() or 2])
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    args = parser.parse_args()
+
+    results = []
+    if args.pdf:
+        import pdfplumber
+        with pdfplumber.open(args.pdf) as pdf:
+            n_pages = len(pdf.pages)
+        results.extend(measure(args.pdf, n_pages, args.workers))
+    else:
+        rng = random.Random(args.random_seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            for n_pages in args.pages:
+                path = os.path.join(tmp, f"extracto_{n_pages}.pdf")
+                build_statement_pdf(path, n_pages, args.rows_per_page, rng)
+                results.extend(measure(path, n_pages, args.workers))
+    result = {"cpu_count": os.cpu_count(), "results": results}
+    print(json.dumps(result, indent=2))
+    if args.output:
+        write_json(args.output, result)
+    if not all(r["identical"] for r in results):
+        raise SystemExit("La extracción en paralelo no coincide con la secuencial")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Tiempo ahorrado por la clasificación previa de páginas (PDF_TABLE_TRIAGE) y su efecto en las
+tablas encontradas.
+
+Extrae cada PDF de forma secuencial con y sin clasificación y compara: tiempo, porcentaje de
+páginas en las que se saltó extract_tables y recall (tablas de la extracción completa que
+también aparecen con clasificación, comparando página, headers y filas). Los PDFs sintéticos
+mezclan páginas con tabla con bordes, texto corrido con el título subrayado, columnas
+alineadas sin bordes e imagen escaneada sin texto.
+
+    python -m benchmarks.bench_pdf_triage --pages 40 200 --table-ratio 0.25
+    python -m benchmarks.bench_pdf_triage --pdf samples/sample_invoice.pdf samples/otro.pdf
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.config.settings import settings
+from app.services.pdf_processing import TRIAGE_TABLE, extract_pdf_content
+from benchmarks.common import write_json
+
+WORDS = "cuenta saldo importe período cliente factura pago cargo abono comisión transferencia recibo".split()
+
+
+def _scan_image(rng: random.Random) -> io.BytesIO:
+    from PIL import Image, ImageDraw
+
+    img = Image.new("L", (850, 1100), 255)
+    draw = ImageDraw.Draw(img)
+    for y in range(80, 1040, 28):
+        draw.rectangle([60, y, 60 + rng.randint(300, 760), y + 10], fill=rng.randint(40, 110))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    buf.seek(0)
+    return buf
+
+
+def build_mixed_pdf(path: str, n_pages: int, table_ratio: float, rng: random.Random) -> None:
+    """Una fracción `table_ratio` de páginas con tabla con bordes; el resto reparte los otros tres tipos."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import HRFlowable, Image, PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    width, height = A4
+    story = []
+    for page in range(n_pages):
+        kind = "table" if rng.random() < table_ratio else rng.choice(["prose", "columns", "scan"])
+        if kind == "scan":
+            story.append(Image(_scan_image(rng), width=width - 144, height=height - 160))
+            story.append(PageBreak())
+            continue
+        story.append(Paragraph(f"Informe mensual - página {page + 1}", styles["Heading2"]))
+        if kind == "prose":
+            # Subrayado del título: bordes que no llegan a formar celdas
+            story.append(HRFlowable(width="100%", thickness=0.5))
+            for _ in range(8):
+                story.append(Paragraph(" ".join(rng.choice(WORDS) for _ in range(90)), styles["BodyText"]))
+        else:
+            data = [["Fecha", "Concepto", "Importe", "Saldo"]]
+            data += [[f"2024-03-{r + 1:02d}", rng.choice(WORDS).capitalize(), f"{rng.uniform(-500, 900):,.2f}", f"{rng.uniform(0, 9000):,.2f}"] for r in range(30)]
+            table = Table(data)
+            if kind == "table":
+                table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.grey)]))
+            story.append(table)
+        story.append(PageBreak())
+    SimpleDocTemplate(path, pagesize=A4).build(story)
+
+
+def _extract(path: str, triage: bool) -> tuple:
+    settings.pdf_table_triage = triage
+    started = time.perf_counter()
+    content = extract_pdf_content(path, workers=1)
+    return time.perf_counter() - started, content
+
+
+def _table_keys(content: dict) -> list:
+    return [json.dumps([t["page"], t["headers"], t["rows"]]) for t in content["tables"]]
+
+
+def measure(path: str, label: str, repeat: int) -> dict:
+    # Alterna el orden y se queda con el mínimo: la primera pasada paga la caché en frío
+    base_s = triage_s = float("inf")
+    for i in range(repeat):
+        for triage in ((False, True) if i % 2 == 0 else (True, False)):
+            elapsed, content = _extract(path, triage)
+            if triage:
+                triage_s, triaged = min(triage_s, elapsed), content
+            else:
+                base_s, base = min(base_s, elapsed), content
+    pages = len(triaged["pages"])
+    skipped = pages - triaged["triage"][TRIAGE_TABLE]
+    expected, found = _table_keys(base), set(_table_keys(triaged))
+    recall = sum(1 for key in expected if key in found) / len(expected) if expected else 1.0
+    saved = 1 - triage_s / base_s if base_s else 0.0
+    print(f"{label:<28} {pages:>5} págs  sin clasificar {base_s:>7.2f}s  con clasificación {triage_s:>7.2f}s  "
+          f"ahorro {saved:>6.1%}  saltadas {skipped / pages if pages else 0:>6.1%}  recall {recall:.3f}")
+    return {
+        "pdf": label,
+        "pages": pages,
+        "triage": triaged["triage"],
+        "skip_rate": round(skipped / pages, 3) if pages else 0.0,
+        "baseline_s": round(base_s, 3),
+        "triage_s": round(triage_s, 3),
+        "time_saved": round(saved, 3),
+        "tables_baseline": len(expected),
+        "tables_triage": len(triaged["tables"]),
+        "recall": round(recall, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[40, 200], help="Páginas de los PDFs sintéticos")
+    parser.add_argument("--table-ratio", type=float, default=0.25, help="Fracción de páginas con tabla con bordes")
+    parser.add_argument("--pdf", nargs="*", help="PDFs existentes (por defecto, samples/*.pdf)")
+    parser.add_argument("--repeat", type=int, default=3, help="Pasadas por PDF y modo (se toma la más rápida)")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    args = parser.parse_args()
+
+    results = []
+    for path in args.pdf if args.pdf is not None else sorted(glob.glob("samples/*.pdf")):
+        results.append(measure(path, os.path.basename(path), args.repeat))
+    rng = random.Random(args.random_seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_pages in args.pages:
+            path = os.path.join(tmp, f"mixto_{n_pages}.pdf")
+            build_mixed_pdf(path, n_pages, args.table_ratio, rng)
+            results.append(measure(path, f"sintético {n_pages} págs", args.repeat))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        write_json(args.output, {"table_ratio": args.table_ratio, "results": results})
+    if any(r["recall"] < 1.0 for r in results):
+        raise SystemExit("La clasificación previa perdió tablas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Payload de la caché por contenido: msgpack + zstd (EXTRACTION_STORAGE_FORMAT=msgpack-zstd, con
+varios niveles) frente a JSON + zlib, sobre documentos grandes. Mide tamaño, tiempo de
+codificación y de decodificación (el mejor de --repeat) y comprueba que cada formato devuelva
+exactamente las mismas páginas.
+
+Los documentos sintéticos tienen por página dos párrafos de texto y una tabla de extracto ya
+normalizada (normalize_table), como las que guarda el worker; con --pdf se miden además las
+páginas extraídas de PDFs reales.
+
+    python -m benchmarks.bench_result_storage --pages 500 2000 --rows 40
+    python -m benchmarks.bench_result_storage --pages --pdf samples/sample_invoice.pdf
+"""
+import argparse
+import json
+import random
+import time
+
+from app.config.settings import settings
+from app.services.extraction_cache import encode_pages, decode_pages
+from app.services.pdf_processing import extract_pdf_content
+from app.services.table_normalization import normalize_table
+from benchmarks.bench_table_normalization import build_table
+from benchmarks.common import write_json
+from scripts.generate_sample_pdf import WORDS
+
+FORMATS = (("json-zlib", None), ("msgpack-zstd", 1), ("msgpack-zstd", 3), ("msgpack-zstd", 9))
+
+
+def build_pages(n_pages: int, rows: int, rng: random.Random) -> list:
+    pages = []
+    for page in range(1, n_pages + 1):
+        text = "\n".join(" ".join(rng.choice(WORDS) for _ in range(60)) for _ in range(2))
+        pages.append({
+            "page": page,
+            "text_blocks": [text],
+            "triage": "tables",
+            "tables": [normalize_table(build_table(rows, rng), page)],
+        })
+    return pages
+
+
+def _timed(fn, arg, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def measure(label: str, pages: list, repeat: int) -> list:
+    raw_bytes = len(json.dumps(pages, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    print(f"{label}: {len(pages)} págs, JSON sin comprimir {raw_bytes / 1024:.0f} KB")
+    results = []
+    for storage_format, level in FORMATS:
+        if level is not None:
+            settings.extraction_zstd_level = level
+        encode_s, payload = _timed(lambda p: encode_pages(p, storage_format), pages, repeat)
+        decode_s, decoded = _timed(decode_pages, payload, repeat)
+        name = storage_format if level is None else f"{storage_format}:{level}"
+        row = {
+            "document": label,
+            "pages": len(pages),
+            "format": name,
+            "raw_json_kb": round(raw_bytes / 1024, 1),
+            "payload_kb": round(len(payload) / 1024, 1),
+            "ratio": round(raw_bytes / len(payload), 2),
+            "encode_ms": round(encode_s * 1000, 2),
+            "decode_ms": round(decode_s * 1000, 2),
+            "identical": decoded == pages,
+        }
+        print(f"  {name:<16} {row['payload_kb']:>9.1f} KB  x{row['ratio']:>5.2f}  codificar {row['encode_ms']:>8.1f} ms  "
+              f"decodificar {row['decode_ms']:>8.1f} ms{'' if row['identical'] else '  ¡RESULTADO DISTINTO!'}")
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="*", default=[500, 2000], help="Páginas de los documentos sintéticos")
+    parser.add_argument("--rows", type=int, default=40, help="Filas de la tabla de cada página")
+    parser.add_argument("--pdf", nargs="*", default=[], help="PDFs reales cuyas páginas extraídas se miden también")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    args = parser.parse_args()
+
+    level = settings.extraction_zstd_level
+    rng = random.Random(args.random_seed)
+    results = []
+    try:
+        for n_pages in args.pages:
+            results.extend(measure(f"sintético {n_pages} págs", build_pages(n_pages, args.rows, rng), args.repeat))
+        for path in args.pdf:
+            results.extend(measure(path, extract_pdf_content(path)["pages"], args.repeat))
+    finally:
+        settings.extraction_zstd_level = level
+    if args.output:
+        write_json(args.output, results)
+    if not all(r["identical"] for r in results):
+        raise SystemExit("Algún formato no devuelve las mismas páginas")
+
+
+if __name__ == "__main__":
+    main()
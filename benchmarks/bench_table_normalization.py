@@ -0,0 +1,165 @@
+"""
+Normalización de tablas: versión vectorizada (app/services/table_normalization.py) frente a una
+implementación celda a celda en Python con las mismas reglas, sobre tablas sintéticas de
+extracto (fecha, concepto, referencia, importe, IVA %, cantidad) de distinto número de filas.
+Comprueba además que ambas den exactamente el mismo resultado, también en unos casos límite
+(enteros que no caben en DOUBLE).
+
+    python -m benchmarks.bench_table_normalization --rows 100 1000 10000 50000
+"""
+import argparse
+import calendar
+import json
+import random
+import re
+import time
+
+from app.services.table_normalization import normalize_table
+from benchmarks.common import write_json
+
+_DATE_RE = re.compile(r"^(?:(\d{4})([-/])(\d{2})\2(\d{2})|(\d{2})([-/])(\d{2})\6(\d{4}))$")
+_CURRENCY = ("US$", "$", "€", "£", "USD", "EUR")
+
+
+def _py_number(value: str):
+    """(número, es_porcentaje, tiene_decimales_o_moneda) o None; mismas reglas que _parse_numbers."""
+    percent = value.endswith("%")
+    s = value.rstrip("%").strip()
+    parens = s.startswith("(") and s.endswith(")")
+    if parens:
+        s = s.strip("()")
+    currency = False
+    for symbol in _CURRENCY:
+        currency |= symbol in s
+        s = s.replace(symbol, "")
+    s = s.replace(" ", "").replace(" ", "")
+    signs = s.count("-") + s.count("+")
+    negative = s.startswith("-") != parens
+    s = s.lstrip("+-")
+    last_comma, last_dot = s.rfind(","), s.rfind(".")
+    comma_decimal = last_comma > last_dot and (s.count(".") > 0 or (s.count(",") == 1 and len(s) - last_comma - 1 != 3))
+    if comma_decimal:
+        s = s.replace(".", "").replace(",", ".")
+    else:
+        multi_dot = s.count(".") > 1
+        if multi_dot and len(s) - last_dot - 1 != 3:
+            return None
+        s = s.replace(",", "")
+        if multi_dot:
+            s = s.replace(".", "")
+    if signs > 1 or (parens and signs) or not re.fullmatch(r"\d*\.?\d*", s) or not re.search(r"\d", s):
+        return None
+    number = float(s)
+    return (-number if negative else number), percent, "." in s or currency
+
+
+def _py_date(value: str):
+    m = _DATE_RE.match(value)
+    if not m:
+        return None
+    year, month, day = (int(m[1]), int(m[3]), int(m[4])) if m[1] else (int(m[8]), int(m[7]), int(m[5]))
+    if not (1 <= month <= 12 and year >= 1 and 1 <= day <= calendar.monthrange(year, month)[1]):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def normalize_python(raw_rows):
+    rows = [["" if c is None else str(c).strip() for c in row] for row in raw_rows]
+    width = max((len(r) for r in rows), default=0)
+    rows = [r + [""] * (width - len(r)) for r in rows]
+    headers = None
+    if rows and sum(1 for c in rows[0] if c) >= max(2, int(width * 0.6)):
+        headers = [c if c else f"col_{i}" for i, c in enumerate(rows[0])]
+        rows = rows[1:]
+    types, values = [], [[None] * width for _ in rows]
+    for col in range(width):
+        cells = [(i, r[col]) for i, r in enumerate(rows) if r[col] != ""]
+        dates = [_py_date(v) for _, v in cells]
+        nums = [_py_number(v) for _, v in cells]
+        if cells and all(dates):
+            kind, parsed = "date", dates
+        elif cells and all(nums) and all(n[1] for n in nums):
+            kind, parsed = "percent", [n[0] for n in nums]
+        elif cells and all(nums) and not any(n[1] for n in nums) and any(n[2] for n in nums):
+            kind, parsed = "decimal", [n[0] for n in nums]
+        elif cells and all(nums) and not any(n[1] for n in nums) and all(abs(n[0]) < 2 ** 53 for n in nums):
+            kind, parsed = "integer", [int(n[0]) for n in nums]
+        else:
+            # Incluye enteros que no caben sin pérdida en DOUBLE (cuentas, referencias)
+            kind, parsed = "text", [None] * len(cells)
+        types.append(kind)
+        for (i, _), value in zip(cells, parsed):
+            values[i][col] = value
+    return {"headers": headers, "rows": rows, "column_types": types if rows or headers else [], "values": values}
+
+
+# Casos límite que las tablas sintéticas no cubren; deben dar lo mismo en las dos implementaciones
+EDGE_CASES = [
+    [["A", "B"], ["12345678901234567890", "1"]],
+    [["Cuenta", "Saldo"], ["9007199254740992", "1.5"], ["9007199254740991", "-2"]],
+    [["Cuenta", "Saldo"], ["-9007199254740993", "1,234.50"], [None, "12345678901234567890"]],
+    [["Importe", "Total"], ["12345678901234567890", "3"], ["1.25", "$4"]],
+]
+
+
+def build_table(n_rows: int, rng: random.Random) -> list:
+    table = [["Fecha", "Concepto", "Referencia", "Importe", "IVA", "Cantidad"]]
+    for i in range(n_rows):
+        amount = rng.uniform(-5000, 9000)
+        table.append([
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024" if i % 50 else None,
+            f"  Movimiento {i} ",
+            f"REF{rng.randint(100000, 999999)}",
+            f"(${-amount:,.2f})" if amount < 0 else f"${amount:,.2f}",
+            rng.choice(["0%", "10%", "12.5 %", "21%"]),
+            str(rng.randint(1, 500)),
+        ])
+    return table
+
+
+def _timed(fn, table, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(table)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    args = parser.parse_args()
+
+    edge_failures = []
+    for table in EDGE_CASES:
+        expected, got = normalize_python(table), normalize_table(table)
+        if json.dumps({k: got[k] for k in expected}) != json.dumps(expected):
+            edge_failures.append(table)
+            print(f"caso límite distinto: {table}\n  python {expected}\n  numpy  {got}")
+    print(f"{len(EDGE_CASES) - len(edge_failures)}/{len(EDGE_CASES)} casos límite idénticos")
+
+    rng = random.Random(args.random_seed)
+    results = []
+    for n_rows in args.rows:
+        table = build_table(n_rows, rng)
+        py_s, expected = _timed(normalize_python, table, args.repeat)
+        np_s, got = _timed(normalize_table, table, args.repeat)
+        got = {k: got[k] for k in expected}
+        identical = json.dumps(got) == json.dumps(expected)
+        cells = n_rows * len(table[0])
+        print(f"{n_rows:>7} filas  python {py_s * 1000:>9.1f} ms  numpy {np_s * 1000:>9.1f} ms  "
+              f"x{py_s / np_s:.1f}  {cells / np_s / 1e6:.2f} M celdas/s{'' if identical else '  ¡RESULTADO DISTINTO!'}")
+        results.append({"rows": n_rows, "cells": cells, "python_ms": round(py_s * 1000, 2), "numpy_ms": round(np_s * 1000, 2),
+                        "speedup": round(py_s / np_s, 2), "column_types": got["column_types"], "identical": identical})
+    if args.output:
+        write_json(args.output, results)
+    if edge_failures or not all(r["identical"] for r in results):
+        raise SystemExit("La normalización vectorizada no coincide con la de referencia")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Backends de texto (TEXT_BACKENDS): páginas por segundo y parecido del texto obtenido.
+
+Extrae solo el texto (`tables=False`, como el modo text_first) de cada PDF con cada backend y
+compara con pdfplumber, página a página, sobre el texto normalizado (espacios colapsados):
+porcentaje de páginas idénticas y similitud media y mínima por palabras (difflib).
+
+    python -m benchmarks.bench_text_backends --pages 40 200
+    python -m benchmarks.bench_text_backends --pdf samples/sample_invoice.pdf --repeat 5
+"""
+import argparse
+import difflib
+import glob
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.pdf_processing import TEXT_BACKENDS, iter_pages
+from benchmarks.bench_pdf_parallel import build_statement_pdf
+from benchmarks.bench_pdf_triage import build_mixed_pdf
+from benchmarks.common import write_json
+
+REFERENCE = "pdfplumber"
+
+
+def _texts(path: str, backend: str, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pages = list(iter_pages(path, workers=1, tables=False, text_backend=backend))
+        best = min(best, time.perf_counter() - started)
+    return best, [" ".join(" ".join(p["text_blocks"]).split()) for p in pages]
+
+
+def _similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a.split(), b.split(), autojunk=False).ratio()
+
+
+def measure(path: str, label: str, repeat: int) -> list:
+    ref_s, ref = _texts(path, REFERENCE, repeat)
+    results = []
+    for backend in TEXT_BACKENDS:
+        elapsed, texts = (ref_s, ref) if backend == REFERENCE else _texts(path, backend, repeat)
+        ratios = [_similarity(a, b) for a, b in zip(ref, texts)]
+        row = {
+            "pdf": label,
+            "backend": backend,
+            "pages": len(texts),
+            "elapsed_s": round(elapsed, 3),
+            "pages_per_s": round(len(texts) / elapsed, 1) if elapsed else 0.0,
+            "speedup": round(ref_s / elapsed, 1) if elapsed else 0.0,
+            "identical_pages": round(sum(1 for r in ratios if r == 1.0) / len(ratios), 3) if ratios else 1.0,
+            "similarity_mean": round(statistics.fmean(ratios), 4) if ratios else 1.0,
+            "similarity_min": round(min(ratios), 4) if ratios else 1.0,
+        }
+        print(f"{label:<28} {backend:<11} {row['pages_per_s']:>8.1f} págs/s  x{row['speedup']:<6} "
+              f"idénticas {row['identical_pages']:>6.1%}  similitud media {row['similarity_mean']:.4f}  mín {row['similarity_min']:.4f}")
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[40, 200], help="Páginas de los PDFs sintéticos")
+    parser.add_argument("--pdf", nargs="*", help="PDFs existentes (por defecto, samples/*.pdf)")
+    parser.add_argument("--repeat", type=int, default=3, help="Pasadas por PDF y backend (se toma la más rápida)")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el resultado como JSON")
+    args = parser.parse_args()
+
+    results = []
+    for path in args.pdf if args.pdf is not None else sorted(glob.glob("samples/*.pdf")):
+        results.extend(measure(path, os.path.basename(path), args.repeat))
+    rng = random.Random(args.random_seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_pages in args.pages:
+            path = os.path.join(tmp, f"extracto_{n_pages}.pdf")
+            build_statement_pdf(path, n_pages, 35, rng)
+            results.extend(measure(path, f"extracto {n_pages} págs", args.repeat))
+            path = os.path.join(tmp, f"mixto_{n_pages}.pdf")
+            build_mixed_pdf(path, n_pages, 0.25, rng)
+            results.extend(measure(path, f"mixto {n_pages} págs", args.repeat))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        write_json(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+-- Búsqueda por subcadena en nombres de archivo (GET /documents/search?q=): índice FULLTEXT
+-- con parser ngram. Configurar antes el servidor (my.cnf):
+--   ngram_token_size=2            -- debe coincidir con SEARCH_NGRAM_TOKEN_SIZE en .env
+--   innodb_ft_enable_stopword=OFF -- con ngram, las stopwords eliminan n-gramas válidos
+CREATE FULLTEXT INDEX ft_documents_filename ON documents(filename) WITH PARSER ngram;
@@ -0,0 +1,14 @@
+-- Índice invertido de celdas de tablas extraídas (token -> celda) para GET /tables/search.
+-- Los documentos ya procesados se indexan después con: python -m scripts.reindex_table_cells
+CREATE TABLE table_cell_tokens (
+    token VARCHAR(64) NOT NULL,
+    department_id INT NOT NULL,
+    document_id INT NOT NULL,
+    table_index INT NOT NULL,
+    row_index INT NOT NULL,
+    col_index INT NOT NULL,
+    page INT NULL,
+    PRIMARY KEY (token, department_id, document_id, table_index, row_index, col_index),
+    FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_table_cell_tokens_document_id ON table_cell_tokens(document_id);
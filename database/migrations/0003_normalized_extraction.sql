@@ -0,0 +1,30 @@
+-- Almacenamiento normalizado de extracciones: una fila por tabla en extracted_tables, una por
+-- celda no vacía en extracted_table_cells (row_index = -1: headers) y el texto por página en
+-- document_pages. Los resultados antiguos (un blob JSON por documento en `content`) se pasan
+-- al formato nuevo con: python -m scripts.migrate_extraction_blobs
+-- Cuando termine sin pendientes, la columna legacy puede eliminarse:
+--   ALTER TABLE extracted_tables DROP COLUMN content;
+ALTER TABLE extracted_tables
+    MODIFY content JSON NULL,
+    ADD COLUMN page INT NULL AFTER table_index,
+    ADD COLUMN row_count INT NOT NULL DEFAULT 0 AFTER page,
+    ADD COLUMN col_count INT NOT NULL DEFAULT 0 AFTER row_count,
+    ADD COLUMN has_headers BOOLEAN NOT NULL DEFAULT FALSE AFTER col_count;
+CREATE INDEX idx_extracted_tables_document_table ON extracted_tables(document_id, table_index);
+CREATE INDEX idx_extracted_tables_document_page ON extracted_tables(document_id, page);
+CREATE TABLE extracted_table_cells (
+    document_id INT NOT NULL,
+    table_index INT NOT NULL,
+    row_index INT NOT NULL,
+    col_index INT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (document_id, table_index, row_index, col_index),
+    FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE
+);
+CREATE TABLE document_pages (
+    document_id INT NOT NULL,
+    page INT NOT NULL,
+    text MEDIUMTEXT NOT NULL,
+    PRIMARY KEY (document_id, page),
+    FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE
+);
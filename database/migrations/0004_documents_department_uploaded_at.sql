@@ -0,0 +1,4 @@
+-- GET /documents/ de operadores: WHERE department_id = ? ORDER BY uploaded_at DESC, id DESC.
+-- El índice de una columna queda cubierto por el compuesto (también para la FK).
+CREATE INDEX idx_documents_department_uploaded_at ON documents(department_id, uploaded_at);
+DROP INDEX idx_documents_department_id ON documents;
@@ -0,0 +1,2 @@
+-- GET /documents/?document_type= dentro de un departamento, mismo orden por uploaded_at.
+CREATE INDEX idx_documents_department_type_uploaded_at ON documents(department_id, document_type, uploaded_at);
@@ -0,0 +1,2 @@
+-- get_valid_token: WHERE token = ? AND used = FALSE AND expires_at > NOW() resuelto solo con el índice.
+CREATE INDEX idx_password_reset_tokens_token_used_expires ON password_reset_tokens(token, used, expires_at);
@@ -0,0 +1,2 @@
+-- GET /users/: WHERE role = ? [AND department_id = ?] ORDER BY created_at DESC, id DESC.
+CREATE INDEX idx_users_role_department_created_at ON users(role, department_id, created_at);
@@ -0,0 +1,3 @@
+-- GET /documents/ de administradores (sin filtro de departamento): ORDER BY uploaded_at DESC, id DESC LIMIT n
+-- se resuelve leyendo el índice hacia atrás en lugar de ordenar toda la tabla.
+CREATE INDEX idx_documents_uploaded_at ON documents(uploaded_at);
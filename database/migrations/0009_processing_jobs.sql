@@ -0,0 +1,18 @@
+-- Cola durable de extracción: POST /documents/{id}/process encola y `python -m app.worker` procesa.
+-- Los tiempos de la cola (run_after, locked_at, finished_at) los escribe la aplicación en UTC.
+CREATE TABLE processing_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    document_id INT NOT NULL,
+    status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_after DATETIME NOT NULL,
+    locked_by VARCHAR(128) NULL DEFAULT NULL,
+    locked_at DATETIME NULL DEFAULT NULL,
+    last_error VARCHAR(512) NULL DEFAULT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at DATETIME NULL DEFAULT NULL,
+    FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_processing_jobs_status_run_after ON processing_jobs(status, run_after);
+CREATE INDEX idx_processing_jobs_document_status ON processing_jobs(document_id, status);
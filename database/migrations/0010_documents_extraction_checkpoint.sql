@@ -0,0 +1,5 @@
+-- Extracción por lotes con checkpoint: páginas del PDF y páginas ya guardadas (1..extracted_pages).
+-- El worker confirma cada lote junto con extracted_pages y un reintento retoma desde ahí.
+ALTER TABLE documents
+    ADD COLUMN page_count INT NULL DEFAULT NULL,
+    ADD COLUMN extracted_pages INT NOT NULL DEFAULT 0;
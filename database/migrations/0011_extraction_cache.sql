@@ -0,0 +1,17 @@
+-- Caché de extracción por contenido: documentos con el mismo SHA-256 reutilizan el resultado
+-- de la misma versión del extractor (pdf_processing.EXTRACTOR_VERSION) sin volver a parsear.
+ALTER TABLE documents ADD COLUMN content_hash CHAR(64) NULL DEFAULT NULL;
+CREATE INDEX idx_documents_content_hash ON documents(content_hash);
+CREATE TABLE extraction_cache (
+    content_hash CHAR(64) NOT NULL,
+    extractor_version VARCHAR(32) NOT NULL,
+    page_count INT NOT NULL,
+    payload LONGBLOB NOT NULL,
+    size_bytes INT NOT NULL,
+    hits INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL,
+    last_used_at DATETIME NOT NULL,
+    PRIMARY KEY (content_hash, extractor_version)
+);
+-- Desalojo LRU cuando el total supera EXTRACTION_CACHE_MAX_MB
+CREATE INDEX idx_extraction_cache_last_used_at ON extraction_cache(last_used_at);
@@ -0,0 +1,5 @@
+-- Procesamiento text_first: el texto de todas las páginas primero y las tablas de cada página
+-- bajo demanda (GET /tables/{id}, export) o en un job 'tables' de baja prioridad.
+-- Las páginas ya guardadas tienen sus tablas extraídas.
+ALTER TABLE document_pages ADD COLUMN tables_extracted BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE processing_jobs ADD COLUMN mode ENUM('full', 'text_first', 'tables') NOT NULL DEFAULT 'full' AFTER document_id;
@@ -0,0 +1,8 @@
+-- Tipos inferidos por columna (app/services/table_normalization.py) y valor tipado de cada
+-- celda junto al texto: las consultas numéricas o por fecha no vuelven a parsear `value`.
+-- column_types: tipos separados por comas en orden de columna (integer, decimal, percent, date, text).
+ALTER TABLE extracted_tables ADD COLUMN column_types VARCHAR(2048) NULL AFTER has_headers;
+-- integer, decimal y percent ("10%" -> 10) en value_num; date en value_date
+ALTER TABLE extracted_table_cells
+    ADD COLUMN value_num DOUBLE NULL AFTER value,
+    ADD COLUMN value_date DATE NULL AFTER value_num;
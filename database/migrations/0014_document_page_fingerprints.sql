@@ -0,0 +1,8 @@
+-- Reprocesado incremental: huella de cada página (SHA-256 de sus content streams), versión del
+-- extractor con que se extrajo y error de extract_tables si falló. Al reprocesar solo se vuelven
+-- a extraer las páginas cuya huella o versión cambió o que fallaron.
+-- Las páginas ya guardadas quedan sin huella: su primer reprocesado las extrae todas.
+ALTER TABLE document_pages
+    ADD COLUMN fingerprint CHAR(64) NULL AFTER text,
+    ADD COLUMN extractor_version VARCHAR(32) NULL AFTER fingerprint,
+    ADD COLUMN extraction_error VARCHAR(512) NULL AFTER tables_extracted;
@@ -0,0 +1,165 @@
+-- Esquema equivalente a db_schema.sql + database/migrations para el backend SQLite (DB_BACKEND=sqlite).
+-- Se aplica solo al abrir una base vacía (app/utils/sqlite_db.py); los cambios de esquema
+-- nuevos deben reflejarse aquí además de en una migración de MySQL.
+
+CREATE TABLE departments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    role TEXT NOT NULL DEFAULT 'operador' CHECK (role IN ('admin', 'operador')),
+    department_id INTEGER NULL REFERENCES departments(id),
+    is_blocked BOOLEAN NOT NULL DEFAULT FALSE,
+    failed_attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    blocked_at TIMESTAMP NULL DEFAULT NULL,
+    unblocked_at TIMESTAMP NULL DEFAULT NULL
+);
+
+-- ON UPDATE CURRENT_TIMESTAMP de MySQL
+CREATE TRIGGER users_updated_at AFTER UPDATE ON users
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename VARCHAR(255) NOT NULL,
+    uploaded_by INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    department_id INTEGER NOT NULL REFERENCES departments(id),
+    uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    filepath VARCHAR(512) NOT NULL,
+    document_type VARCHAR(100) NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'processed', 'error')),
+    processed_at TIMESTAMP NULL DEFAULT NULL,
+    error_message VARCHAR(512) NULL DEFAULT NULL,
+    last_attempt_at TIMESTAMP NULL DEFAULT NULL,
+    page_count INTEGER NULL DEFAULT NULL,
+    extracted_pages INTEGER NOT NULL DEFAULT 0,
+    content_hash CHAR(64) NULL DEFAULT NULL
+);
+
+-- Equivalente del índice FULLTEXT ngram: FTS5 con tokenizador trigram sobre filename
+CREATE VIRTUAL TABLE documents_fts USING fts5(filename, content='documents', content_rowid='id', tokenize='trigram');
+
+CREATE TRIGGER documents_fts_insert AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts (rowid, filename) VALUES (NEW.id, NEW.filename);
+END;
+
+CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, filename) VALUES ('delete', OLD.id, OLD.filename);
+END;
+
+CREATE TRIGGER documents_fts_update AFTER UPDATE OF filename ON documents BEGIN
+    INSERT INTO documents_fts (documents_fts, rowid, filename) VALUES ('delete', OLD.id, OLD.filename);
+    INSERT INTO documents_fts (rowid, filename) VALUES (NEW.id, NEW.filename);
+END;
+
+CREATE TABLE extracted_tables (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    table_index INTEGER NOT NULL,
+    page INTEGER NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    col_count INTEGER NOT NULL DEFAULT 0,
+    has_headers BOOLEAN NOT NULL DEFAULT FALSE,
+    column_types VARCHAR(2048) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE extracted_table_cells (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    table_index INTEGER NOT NULL,
+    row_index INTEGER NOT NULL,
+    col_index INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    value_num DOUBLE NULL,
+    value_date DATE NULL,
+    PRIMARY KEY (document_id, table_index, row_index, col_index)
+) WITHOUT ROWID;
+
+CREATE TABLE document_pages (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    fingerprint CHAR(64) NULL,
+    extractor_version VARCHAR(32) NULL,
+    tables_extracted BOOLEAN NOT NULL DEFAULT TRUE,
+    extraction_error VARCHAR(512) NULL,
+    PRIMARY KEY (document_id, page)
+) WITHOUT ROWID;
+
+CREATE TABLE table_cell_tokens (
+    token VARCHAR(64) NOT NULL COLLATE NOCASE, -- tokens en minúsculas: NOCASE permite resolver LIKE 'x%' por rango
+    department_id INTEGER NOT NULL,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    table_index INTEGER NOT NULL,
+    row_index INTEGER NOT NULL,
+    col_index INTEGER NOT NULL,
+    page INTEGER NULL,
+    PRIMARY KEY (token, department_id, document_id, table_index, row_index, col_index)
+) WITHOUT ROWID;
+
+CREATE TABLE password_reset_tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    token VARCHAR(255) NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    used BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE processing_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    mode TEXT NOT NULL DEFAULT 'full' CHECK (mode IN ('full', 'text_first', 'tables')),
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP NOT NULL,
+    locked_by VARCHAR(128) NULL DEFAULT NULL,
+    locked_at TIMESTAMP NULL DEFAULT NULL,
+    last_error VARCHAR(512) NULL DEFAULT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL DEFAULT NULL
+);
+
+CREATE TABLE extraction_cache (
+    content_hash CHAR(64) NOT NULL,
+    extractor_version VARCHAR(32) NOT NULL,
+    page_count INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL,
+    last_used_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (content_hash, extractor_version)
+);
+
+CREATE INDEX idx_documents_uploaded_by ON documents(uploaded_by);
+CREATE INDEX idx_documents_type ON documents(document_type);
+CREATE INDEX idx_documents_department_uploaded_at ON documents(department_id, uploaded_at);
+CREATE INDEX idx_documents_department_type_uploaded_at ON documents(department_id, document_type, uploaded_at);
+CREATE INDEX idx_documents_uploaded_at ON documents(uploaded_at);
+CREATE INDEX idx_extracted_tables_document_table ON extracted_tables(document_id, table_index);
+CREATE INDEX idx_extracted_tables_document_page ON extracted_tables(document_id, page);
+CREATE INDEX idx_table_cell_tokens_document_id ON table_cell_tokens(document_id);
+CREATE INDEX idx_users_department_id ON users(department_id);
+CREATE INDEX idx_users_role_department_created_at ON users(role, department_id, created_at);
+CREATE INDEX idx_password_reset_tokens_token_used_expires ON password_reset_tokens(token, used, expires_at);
+CREATE INDEX idx_processing_jobs_status_run_after ON processing_jobs(status, run_after);
+CREATE INDEX idx_processing_jobs_document_status ON processing_jobs(document_id, status);
+CREATE INDEX idx_documents_content_hash ON documents(content_hash);
+CREATE INDEX idx_extraction_cache_last_used_at ON extraction_cache(last_used_at);
+
+INSERT INTO departments (name) VALUES ('Finanzas'), ('Compras'), ('Talento Humano');
+
+INSERT INTO users (email, password_hash, role, department_id, is_blocked) VALUES (
+    'admin@docsflow.com', '$2a$12$S/pW4HmWw3KexqfC.oXh7esPqPth5cJQs6blwi9586PXM1384YN4K', 'admin', NULL, FALSE
+);
@@ -0,0 +1,119 @@
+"""
+Regresión de la extracción sobre el corpus sintético (scripts/generate_sample_pdf.py --corpus):
+termina con código 1 si la extracción por páginas en paralelo no devuelve exactamente lo mismo
+que la secuencial o si la memoria de una extracción supera el presupuesto.
+
+- Paralelo: cada PDF se extrae con iter_pages secuencial, con el pool por páginas de iter_pages
+  y como lo hace el worker (iter_page_batches: lotes de --batch-pages repartidos entre los
+  procesos de un mismo pool), con tablas y pdfplumber y con solo texto y pypdfium2. --workers no
+  depende de los núcleos disponibles (comprueba el resultado, no la velocidad).
+- Memoria: cada PDF del corpus, más uno escaneado de --scanned-pages páginas (imágenes que
+  pdfminer retiene hasta cerrar el documento), se extrae con PDF_MEMORY_BOUNDED en un proceso
+  nuevo; lo que crece el pico de RSS durante la extracción no puede pasar de --max-rss-growth-mb.
+  Sin el modo acotado el escaneado de 200 páginas crece ~35 MB; con él, ~3 MB.
+
+No necesita base de datos.
+
+    python -m scripts.check_extraction
+    python -m scripts.check_extraction --pages 10 120 --workers 4 --batch-pages 25 --max-rss-growth-mb 15
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from app.config.settings import settings
+from app.services.extraction_store import iter_page_batches
+from app.services.pdf_processing import iter_pages, pdf_page_count
+from benchmarks.common import peak_rss_mb
+from scripts.generate_sample_pdf import build_scanned_pdf, generate_corpus
+
+MODES = (("full", True, "pdfplumber"), ("text_first", False, "pypdfium2"))
+
+
+async def _worker_pages(path: str, workers: int, batch_pages: int, tables: bool, text_backend: str) -> List[Dict[str, Any]]:
+    page_count = pdf_page_count(path)
+    ranges = [(first, min(first + batch_pages, page_count)) for first in range(0, page_count, batch_pages)]
+    pages: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async for batch in iter_page_batches(pool, path, ranges, page_count, workers, tables, text_backend):
+            pages.extend(batch)
+    return pages
+
+
+def _first_difference(expected: List[Dict[str, Any]], actual: List[Dict[str, Any]]) -> str:
+    if len(expected) != len(actual):
+        return f"{len(actual)} páginas en lugar de {len(expected)}"
+    for serial, other in zip(expected, actual):
+        if serial != other:
+            keys = sorted(k for k in set(serial) | set(other) if serial.get(k) != other.get(k))
+            return f"página {serial['page']}: difiere {', '.join(keys)}"
+    return ""
+
+
+def check_parallel(corpus: List[Dict[str, Any]], workers: int, batch_pages: int) -> int:
+    failures = 0
+    for spec in corpus:
+        for mode, tables, text_backend in MODES:
+            serial = list(iter_pages(spec["path"], workers=1, tables=tables, text_backend=text_backend))
+            variants = (
+                ("iter_pages", list(iter_pages(spec["path"], workers=workers, min_pages=0, tables=tables, text_backend=text_backend))),
+                ("worker", asyncio.run(_worker_pages(spec["path"], workers, batch_pages, tables, text_backend))),
+            )
+            for name, pages in variants:
+                difference = _first_difference(serial, pages)
+                print(f"{'FALLA' if difference else 'ok':<6}{spec['name']:<36} {mode:<10} {name:<10} {difference}")
+                failures += bool(difference)
+    return failures
+
+
+def _rss_growth(path: str) -> float:
+    """Corre en un proceso nuevo: MB que sube el pico de RSS mientras se extrae el PDF como el worker."""
+    settings.pdf_memory_bounded = True
+    before = peak_rss_mb()
+    for _ in iter_pages(path, workers=1):
+        pass
+    return peak_rss_mb() - before
+
+
+def check_memory(paths: List[str], max_growth_mb: float) -> int:
+    failures = 0
+    ctx = multiprocessing.get_context("spawn")
+    for path in paths:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            growth = pool.submit(_rss_growth, path).result()
+        over = growth > max_growth_mb
+        print(f"{'FALLA' if over else 'ok':<6}{os.path.basename(path):<36} memoria  pico de RSS +{growth:.1f} MB (máx. {max_growth_mb:g})")
+        failures += over
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[12, 60], help="Páginas de los PDFs del corpus")
+    parser.add_argument("--tables-per-page", type=int, nargs="+", default=[1])
+    parser.add_argument("--workers", type=int, default=3, help="Procesos del pool por páginas")
+    parser.add_argument("--batch-pages", type=int, default=7, help="Páginas por lote en la extracción del worker")
+    parser.add_argument("--scanned-pages", type=int, default=200, help="Páginas del PDF escaneado de la comprobación de memoria")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=20.0, help="Presupuesto de memoria de una extracción")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = generate_corpus(tmp, args.pages, args.tables_per_page, seed=args.seed)
+        scanned = os.path.join(tmp, f"escaneado_{args.scanned_pages}p.pdf")
+        build_scanned_pdf(scanned, args.scanned_pages, random.Random(args.seed))
+        parallel_failures = check_parallel(corpus, args.workers, args.batch_pages)
+        memory_failures = check_memory([spec["path"] for spec in corpus] + [scanned], args.max_rss_growth_mb)
+    print(f"{parallel_failures} extracciones en paralelo distintas de la secuencial" if parallel_failures else "La extracción en paralelo coincide con la secuencial")
+    print(f"{memory_failures} extracciones por encima del presupuesto de memoria" if memory_failures else "Ninguna extracción supera el presupuesto de memoria")
+    sys.exit(1 if parallel_failures or memory_failures else 0)
+
+
+if __name__ == "__main__":
+    main()
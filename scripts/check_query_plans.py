@@ -0,0 +1,236 @@
+"""
+Regresión de planes: ejecuta las consultas calientes de los repositorios, pasa cada SELECT,
+UPDATE y DELETE por EXPLAIN y termina con código 1 si alguna recorre una tabla o un índice
+completos (type = ALL o index en MySQL; "SCAN <tabla>" en EXPLAIN QUERY PLAN de SQLite).
+
+Por defecto no necesita base: crea una SQLite nueva desde database/sqlite_schema.sql en un
+directorio temporal y siembra un documento de cada tipo de fila (tablas, tokens, páginas,
+jobs en cola y con el lease vencido) para que claim y requeue_stale lleguen a sus UPDATE.
+Sin estadísticas (ANALYZE), SQLite elige siempre el índice que encaja con la consulta, así
+que el plan no depende del volumen.
+
+--live comprueba la base configurada (DB_BACKEND). En MySQL, con tablas casi vacías el
+optimizador prefiere recorrerlas enteras aunque exista el índice: ejecutarlo sobre una base
+migrada y con volumen (p. ej. tras `python -m benchmarks.bench_document_search --seed 100000`).
+Nada se confirma: los UPDATE de claim y requeue_stale se descartan al terminar.
+
+    python -m scripts.check_query_plans [--verbose]
+    python -m scripts.migrate && python -m scripts.check_query_plans --live
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from app.config.settings import settings
+from app.repositories import document_repo, job_repo, page_repo, password_reset_repo, table_repo, user_repo
+from app.utils.db import close_async_pool
+from app.utils.uow import UnitOfWork
+
+
+class RecordingUnitOfWork(UnitOfWork):
+    """UnitOfWork que además guarda (consulta, sentencia, parámetros) de cada SELECT, UPDATE o DELETE ejecutado con `label`."""
+
+    def __init__(self):
+        super().__init__()
+        self.label = ""
+        self.statements: List[Tuple[str, str, Any]] = []
+        self._per_label: Dict[str, int] = {}
+
+    def record(self, query: str, args) -> None:
+        # Una consulta puede ejecutar varias sentencias (claim: SELECT, UPDATE y get_job)
+        n = self._per_label[self.label] = self._per_label.get(self.label, 0) + 1
+        self.statements.append((self.label if n == 1 else f"{self.label} #{n}", query, args))
+
+    @asynccontextmanager
+    async def cursor(self, dictionary: bool = False):
+        async with super().cursor(dictionary) as cursor:
+            yield _RecordingCursor(cursor, self)
+
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+# Recorren uploaded_at en orden y paran en el LIMIT: ahí el recorrido del índice es el plan esperado
+INDEX_WALKS = {"documents.list (admin)", "documents.list (admin, cursor)"}
+
+
+class _RecordingCursor:
+    def __init__(self, cursor, uow: RecordingUnitOfWork):
+        self._cursor = cursor
+        self._uow = uow
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def execute(self, query: str, args=None):
+        if self._uow.label and query.lstrip()[:6].upper() in EXPLAINABLE:
+            self._uow.record(query, args)
+        return await self._cursor.execute(query, args)
+
+
+async def seed_fixture(uow: UnitOfWork) -> None:
+    """Filas mínimas sobre el esquema recién creado (departamentos y admin ya vienen sembrados)."""
+    now = datetime.utcnow().replace(microsecond=0)
+    stale = now - timedelta(seconds=settings.job_lease_seconds * 2)
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT id FROM users ORDER BY id LIMIT 1")
+        admin_id = (await cursor.fetchone())[0]
+        await cursor.execute(
+            "INSERT INTO users (email, password_hash, role, department_id) VALUES ('operador@docsflow.com', 'x', 'operador', 1)"
+        )
+        await cursor.execute(
+            "INSERT INTO password_reset_tokens (user_id, token, expires_at) VALUES (%s, 'token', %s)", (admin_id, now + timedelta(hours=1))
+        )
+        document_ids = []
+        for name in ("factura_2024_0001.pdf", "factura_2024_0002.pdf", "reporte_2023_0003.pdf"):
+            await cursor.execute(
+                "INSERT INTO documents (filename, uploaded_by, department_id, filepath, document_type, status) VALUES (%s, %s, 1, %s, 'factura', 'processed')",
+                (name, admin_id, f"uploads/{name}")
+            )
+            document_ids.append(cursor.lastrowid)
+        document_id = document_ids[0]
+        await cursor.execute(
+            "INSERT INTO extracted_tables (document_id, table_index, page, row_count, col_count) VALUES (%s, 0, 1, 1, 2)", (document_id,)
+        )
+        await cursor.executemany(
+            "INSERT INTO extracted_table_cells (document_id, table_index, row_index, col_index, value) VALUES (%s, 0, 0, %s, %s)",
+            [(document_id, 0, "Total IVA"), (document_id, 1, "1200")]
+        )
+        await cursor.executemany(
+            "INSERT INTO table_cell_tokens (token, department_id, document_id, table_index, row_index, col_index, page) VALUES (%s, 1, %s, 0, 0, %s, 1)",
+            [("total", document_id, 0), ("iva", document_id, 0), ("1200", document_id, 1)]
+        )
+        await cursor.execute(
+            "INSERT INTO document_pages (document_id, page, text, tables_extracted) VALUES (%s, 1, 'Total IVA 1200', FALSE)", (document_id,)
+        )
+        # Un job listo para claim y dos con el lease vencido para requeue_stale (uno reintentable y uno agotado)
+        await cursor.executemany(
+            "INSERT INTO processing_jobs (document_id, status, attempts, max_attempts, run_after, locked_by, locked_at) VALUES (%s, %s, %s, 3, %s, %s, %s)",
+            [
+                (document_ids[0], "queued", 0, now, None, None),
+                (document_ids[1], "running", 1, stale, "plans", stale),
+                (document_ids[2], "running", 3, stale, "plans", stale),
+            ]
+        )
+
+
+async def _sample(uow: UnitOfWork, query: str, default: Any) -> Any:
+    async with uow.cursor() as cursor:
+        await cursor.execute(query)
+        row = await cursor.fetchone()
+    return row[0] if row and row[0] is not None else default
+
+
+async def hot_queries(uow: RecordingUnitOfWork) -> None:
+    """Las consultas de los endpoints más usados, con parámetros tomados de la propia base."""
+    department_id = await _sample(uow, "SELECT department_id FROM documents GROUP BY department_id ORDER BY COUNT(*) DESC LIMIT 1", 1)
+    document_type = await _sample(uow, "SELECT document_type FROM documents WHERE document_type IS NOT NULL LIMIT 1", "factura")
+    document_id = await _sample(uow, "SELECT MAX(document_id) FROM extracted_tables", 1)
+    email = await _sample(uow, "SELECT email FROM users LIMIT 1", "admin@docsflow.com")
+    token = await _sample(uow, "SELECT token FROM password_reset_tokens LIMIT 1", "token")
+    cell_token = await _sample(uow, "SELECT token FROM table_cell_tokens LIMIT 1", "total")
+    other_token = await _sample(uow, "SELECT token FROM table_cell_tokens ORDER BY token DESC LIMIT 1", cell_token)
+    uploaded_at = await _sample(uow, "SELECT MAX(uploaded_at) FROM documents", None)
+    keyset = (uploaded_at, 2 ** 31 - 1) if uploaded_at else None
+
+    checks = [
+        ("documents.list (admin)", lambda: document_repo.list_documents(uow, limit=21)),
+        ("documents.list (admin, cursor)", lambda: document_repo.list_documents(uow, limit=21, cursor=keyset)),
+        ("documents.list (departamento)", lambda: document_repo.list_documents(uow, limit=21, department_id=department_id)),
+        ("documents.list (departamento, cursor)", lambda: document_repo.list_documents(uow, limit=21, department_id=department_id, cursor=keyset)),
+        ("documents.list (departamento, tipo)", lambda: document_repo.list_documents(uow, limit=21, department_id=department_id, document_type=document_type)),
+        ("documents.count (departamento)", lambda: document_repo.count_documents(uow, department_id=department_id)),
+        ("documents.search", lambda: document_repo.search_documents(uow, q="factura", department_id=department_id, limit=21)),
+        ("users.by_email", lambda: user_repo.get_user_by_email(uow, email)),
+        ("users.list (rol, departamento)", lambda: user_repo.list_users(uow, limit=21, role="operador", department_id=department_id)),
+        ("password_reset.get_valid_token", lambda: password_reset_repo.get_valid_token(uow, token)),
+        ("tables.get_tables", lambda: table_repo.get_tables(uow, document_id)),
+        ("tables.get_tables (páginas)", lambda: table_repo.get_tables(uow, document_id, page_from=1, page_to=5)),
+        ("tables.search", lambda: table_repo.search(uow, cell_token, department_id=department_id)),
+        ("tables.search (admin)", lambda: table_repo.search(uow, cell_token)),
+        ("tables.search (varios tokens, departamento)", lambda: table_repo.search(uow, f"{other_token} {cell_token} {cell_token[:2]}", department_id=department_id)),
+        ("tables.search (varios tokens, admin)", lambda: table_repo.search(uow, f"{other_token} {cell_token[:2]}")),
+        ("pages.list", lambda: page_repo.list_pages(uow, document_id, page_from=1, page_to=5)),
+        ("pages.pending_tables", lambda: page_repo.list_pending_table_pages(uow, document_id, page_from=1, page_to=5)),
+        ("jobs.get_active_job", lambda: job_repo.get_active_job(uow, document_id)),
+        ("jobs.has_pending", lambda: job_repo.has_pending(uow)),
+        ("jobs.requeue_stale", lambda: job_repo.requeue_stale(uow, settings.job_lease_seconds)),
+        ("jobs.claim", lambda: job_repo.claim(uow, "check_query_plans", 4)),
+    ]
+    for label, run in checks:
+        uow.label = label
+        await run()
+
+
+def full_scans(plan: List[dict], index_walk: bool = False) -> List[dict]:
+    """
+    Filas del plan que recorren una tabla entera, o un índice entero (sin condición sobre sus
+    columnas) salvo en las consultas de INDEX_WALKS.
+    """
+    if settings.db_backend == "sqlite":
+        # EXPLAIN QUERY PLAN: "SCAN <tabla>" o "SCAN <tabla> USING INDEX"; las subconsultas materializadas no cuentan
+        pattern = r"SCAN (?!ranked\b|fts\b)\w+" if index_walk else r"SCAN (?!ranked\b|fts\b)\w+( USING (COVERING )?INDEX \w+)?"
+        return [row for row in plan if re.fullmatch(pattern, row["detail"])]
+    # Las tablas derivadas (<derivedN>) se materializan ya filtradas: no cuentan
+    types = ("ALL",) if index_walk else ("ALL", "index")
+    return [row for row in plan if row.get("type") in types and not str(row.get("table", "")).startswith("<")]
+
+
+def _describe(row: dict) -> str:
+    if "detail" in row:
+        return row["detail"]
+    return f"{row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}"
+
+
+async def check(verbose: bool) -> int:
+    failures = 0
+    prefix = "EXPLAIN QUERY PLAN " if settings.db_backend == "sqlite" else "EXPLAIN "
+    async with RecordingUnitOfWork() as uow:
+        await hot_queries(uow)
+        for label, query, args in uow.statements:
+            async with uow.cursor(dictionary=True) as cursor:
+                await cursor.execute(prefix + query, args)
+                plan = await cursor.fetchall()
+            scans = full_scans(plan, index_walk=label in INDEX_WALKS)
+            status = "FALLA" if scans else "ok"
+            print(f"{status:<6}{label}")
+            if scans or verbose:
+                for row in plan:
+                    print(f"        {_describe(row)}")
+            failures += bool(scans)
+    print(f"{failures} consultas con recorrido completo de tabla o índice" if failures else "Ninguna consulta caliente recorre tablas ni índices completos")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="Mostrar el plan de todas las consultas")
+    parser.add_argument("--live", action="store_true", help="Usar la base configurada en lugar de una SQLite nueva")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            if not args.live:
+                async with UnitOfWork() as uow:
+                    await seed_fixture(uow)
+                    await uow.commit()
+            return await check(args.verbose)
+        finally:
+            await close_async_pool()
+
+    if args.live:
+        sys.exit(asyncio.run(run()))
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_backend = "sqlite"
+        settings.sqlite_path = os.path.join(tmp, "check_query_plans.sqlite3")
+        code = asyncio.run(run())
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,23 @@
+"""
+Genera PDFs de prueba.
+
+    python scripts/generate_sample_pdf.py            # samples/comprehensive_sample.pdf
+    python -m scripts.generate_sample_pdf --corpus --pages 10 100 --tables-per-page 1 3 \
+        --rows 20 --cols 6 --text-paragraphs 2 --ruling ruled unruled --seed 42
+
+Con --corpus escribe un corpus sintético (por defecto en un directorio temporal) con un PDF por
+combinación de parámetros y un corpus.json con la especificación de cada uno; con la misma
+semilla el corpus es el mismo. Lo usa benchmarks/bench_extraction_suite.py.
+"""
+import argparse
+import io
+import itertools
+import json
 import os
+import random
+import tempfile
+from typing import Dict, List, Sequence
+
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
@@ -8,6 +27,11 @@ from reportlab.lib.units import inch
 OUTPUT_DIR = os.path.join("samples")
 OUTPUT_PATH = os.path.join(OUTPUT_DIR, "comprehensive_sample.pdf")
 
+WORDS = ("cuenta saldo importe período cliente factura pago cargo abono comisión transferencia recibo "
+         "movimiento contrato servicio vencimiento interés depósito retiro sucursal titular").split()
+# Tipos de columna de las tablas del corpus, en este orden y cíclicos si hay más columnas
+CORPUS_COLUMNS = ("Fecha", "Concepto", "Referencia", "Importe", "IVA", "Cantidad", "Saldo")
+
 def ensure_dirs():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -296,10 +320,110 @@ def build_pdf(path: str):
     doc.build(story)
 
 
+def _corpus_cell(column: str, row: int, rng: random.Random) -> str:
+    if column == "Fecha":
+        return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"
+    if column == "Concepto":
+        return f"{rng.choice(WORDS).capitalize()} {row}"
+    if column == "Referencia":
+        return f"REF{rng.randint(100000, 999999)}"
+    if column == "IVA":
+        return rng.choice(["0%", "10%", "12.5%", "21%"])
+    if column == "Cantidad":
+        return str(rng.randint(1, 500))
+    return f"{rng.uniform(-5000, 9000):,.2f}"
+
+
+def build_corpus_pdf(path: str, n_pages: int, tables_per_page: int = 1, rows: int = 20, cols: int = 5,
+                     text_paragraphs: int = 2, ruled: bool = True, seed: int = 42) -> None:
+    """
+    PDF sintético de `n_pages` páginas, cada una con `text_paragraphs` párrafos de ~60 palabras y
+    `tables_per_page` tablas de `rows` filas (más el header) y `cols` columnas de tipos variados
+    (fecha, texto, importe, porcentaje, entero). `ruled=False` dibuja las tablas sin bordes: la
+    estrategia "lines" de extract_tables no las detecta. Si el contenido de una página no cabe,
+    sigue en la siguiente.
+    """
+    rng = random.Random(seed)
+    styles = getSampleStyleSheet()
+    width = A4[0] - 2 * inch
+    headers = [CORPUS_COLUMNS[i % len(CORPUS_COLUMNS)] for i in range(cols)]
+    story = []
+    for page in range(n_pages):
+        story.append(Paragraph(f"Informe sintético - página {page + 1} de {n_pages}", styles["Heading2"]))
+        for _ in range(text_paragraphs):
+            story.append(Paragraph(" ".join(rng.choice(WORDS) for _ in range(60)), styles["BodyText"]))
+        for _ in range(tables_per_page):
+            data = [headers] + [[_corpus_cell(column, row, rng) for column in headers] for row in range(rows)]
+            table = Table(data, colWidths=[width / cols] * cols)
+            style = [("FONTSIZE", (0, 0), (-1, -1), 7), ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                     ("TOPPADDING", (0, 0), (-1, -1), 1), ("BOTTOMPADDING", (0, 0), (-1, -1), 1)]
+            if ruled:
+                style.append(("GRID", (0, 0), (-1, -1), 0.5, colors.grey))
+            table.setStyle(TableStyle(style))
+            story += [Spacer(1, 8), table]
+        story.append(PageBreak())
+    # invariant: sin fecha ni id aleatorio, la misma semilla da el mismo archivo
+    SimpleDocTemplate(path, pagesize=A4, title="DocsFlow corpus", invariant=True).build(story)
+
+
+def build_scanned_pdf(path: str, n_pages: int, rng: random.Random) -> None:
+    """Páginas escaneadas: una imagen de ruido (~170 KB en JPEG) y una línea de texto."""
+    import numpy as np
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    noise = np.random.default_rng(rng.randint(0, 2 ** 32 - 1))
+    pdf = canvas.Canvas(path, pagesize=A4)
+    for page in range(n_pages):
+        buf = io.BytesIO()
+        Image.fromarray((noise.random((500, 400)) * 255).astype("uint8")).save(buf, format="JPEG", quality=85)
+        buf.seek(0)
+        pdf.drawImage(ImageReader(buf), 40, 60, 515, 720)
+        pdf.drawString(40, 40, f"Extracto escaneado - hoja {page + 1} de {n_pages}")
+        pdf.showPage()
+    pdf.save()
+
+
+def generate_corpus(output_dir: str, page_counts: Sequence[int] = (10, 100), tables_per_page: Sequence[int] = (1,),
+                    rows: int = 20, cols: int = 5, text_paragraphs: int = 2,
+                    ruling: Sequence[str] = ("ruled", "unruled"), seed: int = 42) -> List[Dict]:
+    """Un PDF por combinación de páginas, tablas por página y bordes; escribe y devuelve la especificación (corpus.json)."""
+    os.makedirs(output_dir, exist_ok=True)
+    corpus = []
+    for i, (n_pages, tables, ruled) in enumerate(itertools.product(page_counts, tables_per_page, ruling)):
+        name = f"corpus_{n_pages}p_{tables}t_{rows}x{cols}_{ruled}.pdf"
+        spec = {"name": name, "pages": n_pages, "tables_per_page": tables, "rows": rows, "cols": cols,
+                "text_paragraphs": text_paragraphs, "ruled": ruled == "ruled", "seed": seed + i}
+        build_corpus_pdf(os.path.join(output_dir, name), n_pages, tables, rows, cols, text_paragraphs, spec["ruled"], spec["seed"])
+        corpus.append({**spec, "path": os.path.join(output_dir, name)})
+    with open(os.path.join(output_dir, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(corpus, f, indent=2, ensure_ascii=False)
+    return corpus
+
+
 def main():
-    ensure_dirs()
-    build_pdf(OUTPUT_PATH)
-    print(f"PDF generado: {OUTPUT_PATH}")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", action="store_true", help="Generar el corpus sintético en lugar de la muestra")
+    parser.add_argument("--output-dir", help="Directorio del corpus (por defecto, uno temporal nuevo)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--tables-per-page", type=int, nargs="+", default=[1])
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=5)
+    parser.add_argument("--text-paragraphs", type=int, default=2, help="Párrafos de ~60 palabras por página")
+    parser.add_argument("--ruling", nargs="+", choices=["ruled", "unruled"], default=["ruled", "unruled"])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not args.corpus:
+        ensure_dirs()
+        build_pdf(OUTPUT_PATH)
+        print(f"PDF generado: {OUTPUT_PATH}")
+        return
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix="docsflow_corpus_")
+    corpus = generate_corpus(output_dir, args.pages, args.tables_per_page, args.rows, args.cols,
+                             args.text_paragraphs, args.ruling, args.seed)
+    print(f"{len(corpus)} PDFs generados en {output_dir} (especificación en corpus.json)")
 
 
 if __name__ == "__main__":
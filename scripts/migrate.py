@@ -0,0 +1,121 @@
+"""
+Aplica en orden las migraciones versionadas de database/migrations (NNNN_descripcion.sql)
+que aún no figuran en schema_migrations. Parte de una base creada con db_schema.sql
+(el esquema de la v1.0.1: todo cambio posterior es una migración).
+
+    python -m scripts.migrate              # aplicar pendientes
+    python -m scripts.migrate --status     # listar aplicadas / pendientes
+    python -m scripts.migrate --to 0003    # aplicar hasta esa versión (incluida)
+
+MySQL confirma implícitamente cada DDL: una migración que falla a medias no queda
+registrada y hay que revisarla a mano antes de relanzar.
+"""
+import argparse
+import asyncio
+import hashlib
+import re
+from pathlib import Path
+from typing import List, NamedTuple
+
+from app.utils.db import close_async_pool
+from app.utils.uow import UnitOfWork
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "database" / "migrations"
+_FILENAME_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    path: Path
+    checksum: str
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILENAME_RE.match(path.name)
+        if not match:
+            raise SystemExit(f"Nombre de migración inválido: {path.name} (esperado NNNN_descripcion.sql)")
+        checksum = hashlib.sha256(path.read_bytes()).hexdigest()
+        migrations.append(Migration(match.group(1), match.group(2), path, checksum))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise SystemExit("Hay versiones de migración duplicadas")
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """Sentencias separadas por ';' al final de línea, sin comentarios '--'."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = [s.strip().rstrip(";").strip() for s in "\n".join(lines).split(";\n")]
+    return [s for s in statements if s]
+
+
+async def _ensure_table(uow: UnitOfWork) -> None:
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR(16) PRIMARY KEY, name VARCHAR(255) NOT NULL, checksum CHAR(64) NOT NULL, "
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+
+
+async def applied_migrations(uow: UnitOfWork) -> dict:
+    await _ensure_table(uow)
+    async with uow.cursor() as cursor:
+        await cursor.execute("SELECT version, checksum FROM schema_migrations")
+        return dict(await cursor.fetchall())
+
+
+async def apply(uow: UnitOfWork, migration: Migration) -> None:
+    for statement in split_statements(migration.path.read_text(encoding="utf-8")):
+        async with uow.cursor() as cursor:
+            await cursor.execute(statement)
+    async with uow.cursor() as cursor:
+        await cursor.execute(
+            "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+            (migration.version, migration.name, migration.checksum),
+        )
+    await uow.commit()
+
+
+async def migrate(target: str | None, status_only: bool) -> None:
+    migrations = load_migrations()
+    async with UnitOfWork() as uow:
+        applied = await applied_migrations(uow)
+        await uow.commit()
+        for m in migrations:
+            if m.version in applied and applied[m.version] != m.checksum:
+                print(f"AVISO {m.version}_{m.name}: el archivo cambió después de aplicarse")
+        pending = [m for m in migrations if m.version not in applied and (target is None or m.version <= target)]
+        if status_only:
+            for m in migrations:
+                print(f"{'aplicada ' if m.version in applied else 'pendiente'} {m.version}_{m.name}")
+            return
+        if not pending:
+            print("Sin migraciones pendientes")
+            return
+        for m in pending:
+            print(f"aplicando {m.version}_{m.name} ...")
+            await apply(uow, m)
+        print(f"{len(pending)} migraciones aplicadas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", dest="target", help="Última versión a aplicar (p. ej. 0003)")
+    parser.add_argument("--status", action="store_true")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            await migrate(args.target, args.status)
+        finally:
+            await close_async_pool()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
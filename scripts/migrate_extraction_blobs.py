@@ -0,0 +1,66 @@
+"""
+Migra los resultados guardados como un único blob JSON (extracted_tables.content, table_index=0)
+al formato normalizado: una fila por tabla, una por celda, el texto por página y el índice de celdas.
+Cada documento se migra en su propia transacción; se puede relanzar sin duplicar datos.
+
+    python -m scripts.migrate_extraction_blobs [--document-id N] [--dry-run]
+"""
+import argparse
+import asyncio
+import json
+
+from app.services.extraction_store import clear_extraction, persist_extraction
+from app.utils.db import close_async_pool
+from app.utils.uow import UnitOfWork
+
+
+async def migrate(document_id: int | None, dry_run: bool) -> None:
+    async with UnitOfWork() as uow:
+        async with uow.cursor() as cursor:
+            await cursor.execute("SHOW COLUMNS FROM extracted_tables LIKE 'content'")
+            if await cursor.fetchone() is None:
+                print("extracted_tables no tiene la columna legacy 'content': nada que migrar")
+                return
+            query = (
+                "SELECT et.document_id, d.department_id, MAX(et.id) FROM extracted_tables et "
+                "JOIN documents d ON d.id = et.document_id WHERE et.content IS NOT NULL"
+            )
+            params = ()
+            if document_id is not None:
+                query += " AND et.document_id = %s"
+                params = (document_id,)
+            await cursor.execute(query + " GROUP BY et.document_id, d.department_id ORDER BY et.document_id", params)
+            pending = await cursor.fetchall()
+        print(f"documentos con blob legacy: {len(pending)}")
+        for doc_id, department_id, blob_id in pending:
+            async with uow.cursor() as cursor:
+                await cursor.execute("SELECT content FROM extracted_tables WHERE id = %s", (blob_id,))
+                content = (await cursor.fetchone())[0]
+            data = content if isinstance(content, dict) else json.loads(content)
+            if dry_run:
+                print(f"documento {doc_id}: {len(data.get('tables', []))} tablas, {len(data.get('pages', []))} páginas")
+                continue
+            # El blob (y cualquier resto parcial) se borra y se reescribe normalizado en la misma transacción
+            await clear_extraction(uow, doc_id)
+            await persist_extraction(uow, doc_id, department_id, data)
+            await uow.commit()
+            print(f"documento {doc_id}: migrado")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--document-id", type=int)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            await migrate(args.document_id, args.dry_run)
+        finally:
+            await close_async_pool()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Reconstruye table_cell_tokens a partir de las celdas ya guardadas en extracted_table_cells.
+Útil tras crear la tabla en una base existente o si el índice quedó desalineado.
+
+    python -m scripts.reindex_table_cells [--document-id N]
+"""
+import argparse
+import asyncio
+
+from app.repositories import table_repo
+from app.services.cell_index import build_postings
+from app.utils.db import close_async_pool
+from app.utils.uow import UnitOfWork
+
+
+async def reindex(document_id: int | None) -> None:
+    async with UnitOfWork() as uow:
+        async with uow.cursor() as cursor:
+            if document_id is None:
+                await cursor.execute("SELECT DISTINCT d.id, d.department_id FROM documents d JOIN extracted_tables et ON et.document_id = d.id ORDER BY d.id")
+            else:
+                await cursor.execute("SELECT id, department_id FROM documents WHERE id = %s", (document_id,))
+            documents = await cursor.fetchall()
+        for doc_id, department_id in documents:
+            tables = await table_repo.get_tables(uow, doc_id)
+            postings = build_postings(tables)
+            async with uow.cursor() as cursor:
+                await cursor.execute("DELETE FROM table_cell_tokens WHERE document_id = %s", (doc_id,))
+            await table_repo.insert_postings(uow, doc_id, department_id, postings)
+            await uow.commit()
+            print(f"documento {doc_id}: {len(postings)} postings")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--document-id", type=int)
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            await reindex(args.document_id)
+        finally:
+            await close_async_pool()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()